@@ -1,17 +1,85 @@
 import os
+import json
+import time
+from dataclasses import asdict
 from src.utils.chatbot_utils import BuildChatbot
-from src.utils.logger import logging
+from src.components.index_manager import HotSwapChain
+from src.utils.intent_router import IntentRouter
+from src.utils.batch_runner import BatchRunner, read_questions
+from src.utils.metrics import (MetricsCallbackHandler, finish_trace, recent_traces, registry,
+                               request_latency, start_trace)
+from src.utils.shared_state import SharedCache, cache_key
+from src.utils.static_assets import StaticAssets
+from src.utils.admission import AdmissionController, AdmissionRejected
+from src.utils.conversation import FollowUpDetector, set_session
+from src.utils.prefetch import SpeculativePrefetcher
+from src.utils.profiling import RequestProfiler, enter_stage, exit_stage
+from src.utils.logger import logging, restart_logging_after_fork, set_request_id
 from src.utils.exception import Custom_exception
 
-from flask import Flask, request, render_template, jsonify
+from flask import Flask, Response, request, render_template, jsonify, stream_with_context
 
 
 # initializing flask app
 app = Flask(__name__)
 
-# setting up the chatbot(retriever)
+# fingerprinted, precompressed assets from static/dist (python -m src.utils.static_assets build)
+# with immutable caching, and gzip for the page and json responses
+static_assets = StaticAssets(app)
+
+# setting up the chatbot(retriever), rebuilt in the background whenever a new index version is published
 utils = BuildChatbot()
-chatbot = utils.initialize_chatbot()
+chatbot = HotSwapChain(utils.initialize_chatbot).start()
+
+# answers greetings, FAQs and simple catalog lookups without the LLM
+router = IntentRouter.from_catalog()
+
+# answers of repeated questions, shared by all gunicorn workers of the box (ANSWER_CACHE_TTL_SECONDS)
+answer_cache = SharedCache("answers")
+
+# per-client rate limits and a bounded, fair queue in front of the LLM chain (ADMISSION_*)
+admission = AdmissionController()
+
+# bulk question answering with bounded parallelism, in the batch class of the admission control
+batch_runner = BatchRunner(chatbot, admission=admission)
+
+# follow-up questions ("is the second one cheaper?") reuse the session's last retrieval (CONVERSATION_*)
+follow_ups = FollowUpDetector()
+
+
+def _not_retrieved(text: str) -> bool:
+    try:
+        return router.classify(text).answer is not None or follow_ups.is_follow_up(text)
+    except Exception:
+        return False
+
+
+# retrieval started while the user is typing, reused by /chat when the question matches (PREFETCH_*)
+prefetcher = SpeculativePrefetcher(lambda: utils.prefetch_retriever, skip=_not_retrieved,
+                                   overloaded=lambda: admission.snapshot()["waiting"] > 0)
+
+# sampling profiles of the next N /chat requests on demand (/admin/profile, PROFILER_TOKEN)
+request_profiler = RequestProfiler()
+
+
+def init_worker(log_file: str = None):
+    """Called in every gunicorn worker after the fork (gunicorn.conf.py, preload_app)"""
+    restart_logging_after_fork(log_file)
+    chatbot.restart_after_fork()
+
+
+
+def _client() -> str:
+    """Client ip the request is rate limited under (X-Forwarded-For only behind TRUSTED_PROXIES)"""
+    return f"ip:{admission.client_ip(request.remote_addr, request.headers.get('X-Forwarded-For'))}"
+
+
+def _session_id() -> str:
+    """Chat widget session (X-Session-ID) for the conversation, else the client ip"""
+    session = request.headers.get("X-Session-ID")
+    if session:
+        return f"session:{session[:64]}"
+    return _client()
 
 
 
@@ -26,16 +94,200 @@ def home():
 def chat():
     data = request.get_json()
     question = data.get('input', '')
-    logging.info(f"User Input: {question}")
 
-    config = {"configurable": {"session_id": "chat_1"}}
+    start = time.perf_counter()
+    trace = start_trace(request.headers.get("X-Request-ID"))
+    set_request_id(trace.request_id)
+    stage_ident = enter_stage("chat")
+    # per-request payload lines are sampled (LOG_SAMPLE_RATE) and truncated by the logger
+    logging.info(f"User Input: {question}", extra={"sample": True})
+    session = _session_id()
+    # limits and queue lanes go by client ip: a session id is whatever the client sends
+    client = _client()
+    try:
+        admission.check_rate(client)
+        route = router.route(question)
+        if route.answer is not None:
+            trace.attributes["route"] = route.intent
+            request_latency.observe(time.perf_counter() - start, route="router")
+            response = jsonify({"response": route.answer})
+        else:
+            key = cache_key((chatbot.pointer or {}).get("namespace"), " ".join(question.lower().split()))
+            # a follow-up's answer depends on the session's previous question, never shared
+            follow_up = follow_ups.is_follow_up(question)
+            answer = None if follow_up else answer_cache.get(key)
+            if answer is None:
+                # the question is final, a prefetch still running for it is wasted work
+                prefetcher.cancel(session)
+                config = {"configurable": {"session_id": session},
+                          "callbacks": [MetricsCallbackHandler(trace)]}
+
+                with admission.slot(client) as waited:
+                    trace.attributes["queued_ms"] = round(waited * 1000, 3)
+                    set_session(session)
+                    try:
+                        answer = chatbot.invoke({"input": question},
+                                                config=config)['answer']
+                    finally:
+                        set_session(None)
+                if not follow_up:
+                    answer_cache.set(key, answer, answer_cache.shared_state_config.answer_cache_ttl)
+                trace.attributes["route"] = "rag"
+            else:
+                trace.attributes["route"] = "answer_cache"
+
+            router.metrics.record(route.intent, (time.perf_counter() - start) * 1000)
+            request_latency.observe(time.perf_counter() - start, route=trace.attributes["route"])
+            logging.info(f"Chatbot Response: {answer}", extra={"sample": True})
+            response = jsonify({"response": answer})
+
+        response.headers["X-Request-ID"] = trace.request_id
+        return response
+    except AdmissionRejected as e:
+        # fail fast instead of queueing invisibly inside gunicorn until the request times out
+        trace.attributes["route"] = f"rejected_{e.reason}"
+        response = jsonify({"response": "We are getting a lot of messages right now, please try again shortly.",
+                            "retry_after": e.retry_after})
+        response.status_code = e.status
+        response.headers["Retry-After"] = str(e.retry_after)
+        response.headers["X-Request-ID"] = trace.request_id
+        return response
+    finally:
+        logging.info("Chat request completed",
+                     extra={"route": trace.attributes.get("route"),
+                            "latency_ms": round((time.perf_counter() - start) * 1000, 3),
+                            "stage_timings": trace.stage_timings()})
+        finish_trace(trace)
+        set_request_id(None)
+        exit_stage("chat", stage_ident)
+        request_profiler.request_done()
+
+
+
+# speculative retrieval of the partial input, called by the chat widget when the user pauses typing
+@app.route('/chat/prefetch', methods=["POST"])
+def chat_prefetch():
+    data = request.get_json(silent=True) or {}
+    trace = start_trace(request.headers.get("X-Request-ID"))
+    trace.attributes["route"] = "prefetch"
+    stage_ident = enter_stage("prefetch")
+    try:
+        status = prefetcher.prefetch(_session_id(), str(data.get('input', '')), client=_client())
+        trace.attributes["prefetch"] = status
+        response = jsonify({"status": status})
+        if status == "rate_limited":
+            response.status_code = 429
+        return response
+    except Exception as e:
+        # speculative only, /chat retrieves normally
+        logging.error(f"Prefetch failed: {str(e)}")
+        return jsonify({"status": "error"})
+    finally:
+        finish_trace(trace)
+        exit_stage("prefetch", stage_ident)
+
+
+
+def _number_arg(name: str, kind: type):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        return kind(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+
+
+# bulk questions: JSON {"questions": [...]} or [...], or a JSONL body; answers stream back in order as JSONL
+@app.route('/chat/batch', methods=["POST"])
+def chat_batch():
+    # everything is read and checked before the response starts: a 200 can't turn into an error later
+    try:
+        if request.is_json:
+            data = request.get_json()
+            if isinstance(data, list):
+                data = {"questions": data}
+            if not isinstance(data, dict):
+                raise ValueError('Expected {"questions": [...]} or a list of questions')
+            questions = data.get('questions', [])
+            if not isinstance(questions, list) or not all(isinstance(q, str) for q in questions):
+                raise ValueError("questions must be a list of strings")
+            max_concurrency = data.get('max_concurrency')
+            requests_per_second = data.get('requests_per_second')
+        else:
+            questions = list(read_questions(request.stream))
+            max_concurrency = _number_arg('max_concurrency', int)
+            requests_per_second = _number_arg('requests_per_second', float)
+        batch_runner.validate(questions, max_concurrency, requests_per_second)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    session = _session_id()
+
+    def generate():
+        for result in batch_runner.run(questions,
+                                       max_concurrency=max_concurrency,
+                                       requests_per_second=requests_per_second,
+                                       session_id=session):
+            yield json.dumps(asdict(result), ensure_ascii=False) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+
+# prometheus scrape endpoint: stage latency histograms, document / token counts, cache hit rates
+@app.route('/metrics', methods=["GET"])
+def metrics():
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+
+# most recent sampled per-request traces (TRACE_SAMPLE_RATE)
+@app.route('/debug/traces', methods=["GET"])
+def traces():
+    limit = request.args.get('limit', default=20, type=int)
+    return jsonify(list(recent_traces)[-limit:])
+
+
+
+# index version currently served
+@app.route('/index/version', methods=["GET"])
+def index_version():
+    return jsonify(chatbot.pointer or {"namespace": None})
+
+
+
+# running / waiting chain calls of this worker
+@app.route('/admission/status', methods=["GET"])
+def admission_status():
+    return jsonify(admission.snapshot())
+
+
+
+# sampling profile of the next N /chat requests of this worker, written to artifacts/profiles/
+# POST {"requests": 100, "max_seconds": 300, "interval_ms": 10, "memory": true}, GET for the status
+@app.route('/admin/profile', methods=["GET", "POST"])
+def admin_profile():
+    if not request_profiler.profiling_config.token:
+        return jsonify({"error": "profiling is disabled, set PROFILER_TOKEN"}), 404
+    if not request_profiler.authorized(request.headers.get("X-Admin-Token")):
+        return jsonify({"error": "forbidden"}), 403
+    if request.method == "GET":
+        return jsonify(request_profiler.status())
+    data = request.get_json(silent=True) or {}
+    try:
+        status = request_profiler.start(data.get('requests', 100), max_seconds=data.get('max_seconds'),
+                                        interval_ms=data.get('interval_ms'), memory=data.get('memory'))
+    except RuntimeError as e:
+        return jsonify({"error": str(e), **request_profiler.status()}), 409
+    return jsonify(status), 202
 
-    response = chatbot.invoke({"input": question},
-                              config=config) 
 
-    logging.info(f"Chatbot Response: {response['answer']}")
 
-    return jsonify({"response": response['answer']})
+# routing counts, shares and latencies per intent
+@app.route('/router/metrics', methods=["GET"])
+def router_metrics():
+    return jsonify(router.metrics.snapshot())
 
 
 
@@ -0,0 +1,297 @@
+"""
+Ingestion pipeline benchmark at synthetic catalog scale: time and peak memory of
+DataCleaner.clean_data, CSVLoader loading (VectorStoreBuilder.load_data), embedding and
+upsert with the local fake embedder / index (src/utils/fake_services.py).
+
+    python -m benchmarks.ingestion_benchmark --sizes 10000 100000
+    python -m benchmarks.ingestion_benchmark --sizes 1000000 --memory tracemalloc
+    python -m benchmarks.ingestion_benchmark --sizes 100000 --streaming     # + streaming ingestion
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+import threading
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+import pandas as pd
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+THRESHOLDS_PATH = os.path.join(os.path.dirname(__file__), "ingestion_thresholds.json")
+
+# -------- vocabulary of the synthetic catalog --------
+catalog_spec = {
+    'shirts': {
+        'brands': ['Park Avenue', 'Highlander', 'Peter England', 'Allen Solly', 'Van Heusen', 'The Indian Garage Co'],
+        'items': ['Slim Fit Casual Shirt', 'Regular Fit Formal Shirt', 'Checked Cotton Shirt', 'Linen Blend Shirt'],
+        'price_range': (299, 2999),
+        'variants': ['S', 'M', 'L', 'XL', 'XXL'],
+    },
+    'sarees': {
+        'brands': ['SGF11', 'C J Enterprise', 'Sidhidata', 'Mimosa', 'Satrani'],
+        'items': ['Kanjivaram Art Silk Saree', 'Banarasi Soft Silk Saree', 'Georgette Printed Saree', 'Cotton Handloom Saree'],
+        'price_range': (399, 7999),
+        'variants': ['Red', 'Green', 'Navy', 'Maroon', 'Mustard'],
+    },
+    'watches': {
+        'brands': ['Titan', 'Casio', 'Fastrack', 'Sonata', 'Timex', 'Fossil'],
+        'items': ['Analog Black Dial Watch', 'Digital Grey Dial Watch', 'Chronograph Blue Dial Watch', 'Smart Fitness Watch'],
+        'price_range': (499, 14999),
+        'variants': ['Black Strap', 'Silver Metal Strap', 'Brown Leather Strap'],
+    },
+}
+description_words = ("premium comfortable breathable durable lightweight stylish classic modern everyday festive "
+                     "office party wedding casual soft stretch fabric stitching finish design fit wash care").split()
+# ------------------------------------------------------
+
+
+def _rupees(value: int) -> str:
+    return f"₹{value:,}"
+
+
+def generate_catalog(rows: int, seed: int = 42, na_rate: float = 0.03) -> Dict[str, pd.DataFrame]:
+    """Realistic synthetic catalog (same columns as the scraped CSVs plus descriptions / variants)"""
+    rng = random.Random(seed)
+    per_category = {category: [] for category in catalog_spec}
+    categories = list(catalog_spec)
+
+    produced = 0
+    while produced < rows:
+        category = categories[produced % len(categories)]
+        spec = catalog_spec[category]
+        brand = rng.choice(spec['brands'])
+        item = rng.choice(spec['items'])
+        mrp = rng.randint(*spec['price_range'])
+        discount = rng.randint(0, 80)
+        price = max(int(mrp * (100 - discount) / 100), 99)
+        description = " ".join(rng.choices(description_words, k=rng.randint(40, 120)))
+        rating = f"{rng.uniform(2.5, 5.0):.1f} out of 5 stars"
+        rating_count = f"{rng.randint(1, 60000):,}"
+
+        # one row per variant, like the SKU-level hunnit scrape
+        for variant in rng.sample(spec['variants'], k=rng.randint(1, len(spec['variants']))):
+            if produced >= rows:
+                break
+            row = {
+                "Brand Name": brand,
+                "Product Name": f"{brand} {item} ({rng.randint(1000, 9999)})",
+                "Rating": rating,
+                "Rating Count": rating_count,
+                "Selling Price": _rupees(price),
+                "MRP": _rupees(mrp),
+                "Offer": f"({discount}% off)",
+                "VariantTitle": variant,
+                "Description": description,
+            }
+            for column in ("Rating", "Rating Count", "MRP", "Offer"):
+                if rng.random() < na_rate:
+                    row[column] = "na"
+            per_category[category].append(row)
+            produced += 1
+
+    return {category: pd.DataFrame(data) for category, data in per_category.items()}
+
+
+class PeakRSSSampler:
+    """Samples the resident set size from /proc in a background thread (low overhead, Linux only)"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._page_size = os.sysconf("SC_PAGE_SIZE")
+
+    @staticmethod
+    def available() -> bool:
+        return os.path.exists("/proc/self/statm")
+
+    def rss(self) -> int:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * self._page_size
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.baseline = self.rss()
+        self.peak = self.baseline
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.rss())
+
+
+def measure(name: str, func: Callable[[], Any], memory: str) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Run one stage and return its result with timing and peak memory (MB above the stage start).
+    memory: "rss" (sampled process RSS), "tracemalloc" (python allocations, slows the stage) or "none"
+    """
+    peak_mb = None
+    if memory == "tracemalloc":
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peak_mb = round(peak / 1024 / 1024, 2)
+    elif memory == "rss" and PeakRSSSampler.available():
+        with PeakRSSSampler() as sampler:
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+        peak_mb = round((sampler.peak - sampler.baseline) / 1024 / 1024, 2)
+    else:
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+    print(f"  {name:<10} {elapsed:9.2f} s   peak {peak_mb} MB")
+    return result, {"seconds": round(elapsed, 3), "peak_mb": peak_mb}
+
+
+def run_size(rows: int, workdir: str, batch_size: int, memory: str, streaming: bool = False) -> Dict[str, Any]:
+    from src.components.data_cleaning import DataCleaner
+    from src.components.vectorstore_builder import VectorStoreBuilder
+    from src.utils.fake_services import FakeEmbeddings, FakeIndex, FaultProfile
+
+    data_dir = os.path.join(workdir, "data")
+    cleaned_path = os.path.join(workdir, "artifacts", "data_cleaned.csv")
+    os.makedirs(data_dir, exist_ok=True)
+
+    print(f"{rows:,} rows")
+    stages = {}
+
+    catalog, stages["generate"] = measure("generate", lambda: generate_catalog(rows), "none")
+    for category, df in catalog.items():
+        df.to_csv(os.path.join(data_dir, f"data_{category}.csv"), index=False)
+
+    cleaner = DataCleaner()
+    cleaner.data_cleaner_config.input_path = data_dir
+    cleaner.data_cleaner_config.output_path = cleaned_path
+    cleaner.data_cleaner_config.modes_path = os.path.join(workdir, "artifacts", "column_modes.json")
+    _, stages["clean"] = measure("clean", cleaner.clean_data, memory)
+
+    builder = VectorStoreBuilder()
+    documents, stages["load"] = measure("load", lambda: builder.load_data(cleaned_path), memory)
+
+    embeddings = FakeEmbeddings(profile=FaultProfile())
+    texts = [doc.page_content for doc in documents]
+
+    def embed():
+        vectors = []
+        for i in range(0, len(texts), batch_size):
+            vectors.extend(embeddings.embed_documents(texts[i:i + batch_size]))
+        return vectors
+
+    vectors, stages["embed"] = measure("embed", embed, memory)
+
+    index = FakeIndex(profile=FaultProfile())
+
+    def upsert():
+        for i in range(0, len(vectors), batch_size):
+            index.upsert([(f"doc-{j}", vectors[j], documents[j].metadata)
+                          for j in range(i, min(i + batch_size, len(vectors)))])
+
+    _, stages["upsert"] = measure("upsert", upsert, memory)
+
+    result = {"rows": rows, "documents": len(documents), "stages": stages,
+              "total_seconds": round(sum(s["seconds"] for name, s in stages.items() if name != "generate"), 3)}
+    if streaming:
+        result["streaming"] = run_streaming(catalog, workdir, batch_size, cleaner, memory)
+    return result
+
+
+def run_streaming(catalog: Dict[str, pd.DataFrame], workdir: str, batch_size: int, cleaner: Any,
+                  memory: str) -> Dict[str, Any]:
+    """Same rows through StreamingIngestion (overlapping stages), reusing the modes of the batch cleaning"""
+    from src.components.streaming_ingestion import StreamingIngestion, StreamingIngestionConfig
+    from src.utils.fake_services import FakeEmbeddings, FakeIndex, FaultProfile
+
+    config = StreamingIngestionConfig()
+    config.batch_size = batch_size
+    config.write_raw = False
+    config.raw_path = os.path.join(workdir, "data")
+    ingestion = StreamingIngestion(config, embeddings=FakeEmbeddings(profile=FaultProfile()),
+                                   index=FakeIndex(profile=FaultProfile()))
+    ingestion.cleaner = cleaner
+    sources = {f"data_{category}.csv": (row for row in df.to_dict(orient="records"))
+               for category, df in catalog.items()}
+    stats, measured = measure("stream", lambda: ingestion.run(sources, target="live"), memory)
+    print(f"  {'':<10} first documents searchable after {stats['first_upsert_s']} s")
+    return dict(measured, first_upsert_s=stats["first_upsert_s"], upserted=stats["upserted"])
+
+
+def check_thresholds(results: List[Dict[str, Any]], thresholds: Dict[str, Any]) -> List[str]:
+    """Stages over their max seconds / peak MB for a catalog size"""
+    breaches = []
+    for result in results:
+        limits = thresholds.get(str(result["rows"]), {})
+        for stage, limit in limits.items():
+            measured = result["stages"].get(stage)
+            if measured is None:
+                continue
+            if "max_seconds" in limit and measured["seconds"] > limit["max_seconds"]:
+                breaches.append(f"{result['rows']} rows / {stage}: {measured['seconds']} s > {limit['max_seconds']} s")
+            if measured["peak_mb"] is not None and "max_peak_mb" in limit and measured["peak_mb"] > limit["max_peak_mb"]:
+                breaches.append(f"{result['rows']} rows / {stage}: {measured['peak_mb']} MB > {limit['max_peak_mb']} MB")
+    return breaches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ingestion pipeline on synthetic catalogs")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--batch-size", type=int, default=256, help="embedding / upsert batch size")
+    parser.add_argument("--memory", choices=["rss", "tracemalloc", "none"], default="rss",
+                        help="peak memory tracking per stage (tracemalloc is precise but slows the stages)")
+    parser.add_argument("--streaming", action="store_true", help="also time the streaming ingestion mode")
+    parser.add_argument("--thresholds", default=THRESHOLDS_PATH)
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "ingestion.json"))
+    args = parser.parse_args()
+
+    # no API keys needed: the builders run against the in-process fakes
+    os.environ["USE_FAKE_SERVICES"] = "true"
+
+    results = []
+    for rows in args.sizes:
+        workdir = tempfile.mkdtemp(prefix="ingestion_bench_")
+        try:
+            results.append(run_size(rows, workdir, args.batch_size, args.memory, args.streaming))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    thresholds = {}
+    if os.path.exists(args.thresholds):
+        with open(args.thresholds) as f:
+            thresholds = json.load(f)
+    breaches = check_thresholds(results, thresholds)
+
+    report = {"timestamp": datetime.now().isoformat(timespec="seconds"),
+              "batch_size": args.batch_size,
+              "memory": args.memory,
+              "results": results,
+              "breaches": breaches}
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    for breach in breaches:
+        print(f"THRESHOLD BREACHED {breach}")
+    sys.exit(1 if breaches else 0)
+
+
+if __name__ == "__main__":
+    main()
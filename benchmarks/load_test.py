@@ -0,0 +1,219 @@
+"""
+End-to-end latency benchmark of the Flask app against in-process fakes of the NVIDIA
+embedding, Pinecone and Groq APIs (src/utils/fake_services.py) - no API keys needed.
+
+    python -m benchmarks.load_test --rps 20 --duration 30
+    python -m benchmarks.load_test --rps 20 --duration 30 --save-baseline   # benchmarks/baselines/, not committed
+    python -m benchmarks.load_test --rps 20 --duration 30 --compare      # exit code 1 on regression
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import tempfile
+import argparse
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List
+
+
+BASELINE_DIR = os.path.join(os.path.dirname(__file__), "baselines")
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+# mix of traffic: small talk and lookups (answered by the router) and open-ended questions (RAG)
+questions = [
+    "hi",
+    "thanks",
+    "do you ship to pune?",
+    "what is the price of zen flare pants",
+    "Recommend a formal shirt under ₹700",
+    "Which watches have a rating above 4.3?",
+    "Suggest a silk saree for a wedding",
+    "Show me analog watches for men from Titan",
+    "I need a slim fit checked casual shirt",
+    "What are the best rated sarees under ₹1,000?",
+]
+
+
+def percentile(samples: List[float], p: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(int(p * len(ordered)), len(ordered) - 1)]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {"count": len(samples),
+            "p50_ms": round(percentile(samples, 0.50), 2),
+            "p95_ms": round(percentile(samples, 0.95), 2),
+            "p99_ms": round(percentile(samples, 0.99), 2),
+            "mean_ms": round(sum(samples) / len(samples), 2) if samples else 0.0}
+
+
+def start_server(app: Any):
+    from werkzeug.serving import make_server
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def send(url: str, question: str, timeout: float, user: int) -> Dict[str, Any]:
+    body = json.dumps({"input": question}).encode("utf-8")
+    # the load test acts as the reverse proxy (TRUSTED_PROXIES) of `user`'s own address
+    headers = {"Content-Type": "application/json", "X-Session-ID": f"load-{user}",
+               "X-Forwarded-For": f"10.0.{user // 256 % 256}.{user % 256}"}
+    request = urllib.request.Request(f"{url}/chat", data=body, headers=headers)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception:
+        status = 0
+    return {"status": status, "latency_ms": (time.perf_counter() - start) * 1000}
+
+
+def run_load(url: str, rps: float, duration: float, timeout: float, max_workers: int,
+             sessions: int = 200) -> Dict[str, Any]:
+    """
+    Open-loop load: requests are started on schedule whether or not earlier ones finished.
+    Each request comes from one of `sessions` simulated users (admission control limits per client ip).
+    """
+    results, futures = [], []
+    interval = 1.0 / rps
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        sent = 0
+        while True:
+            scheduled = start + sent * interval
+            if scheduled - start >= duration:
+                break
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(executor.submit(send, url, random.choice(questions), timeout,
+                                           random.randrange(sessions)))
+            sent += 1
+        results = [f.result() for f in futures]
+    elapsed = time.perf_counter() - start
+
+    ok = [r["latency_ms"] for r in results if r["status"] == 200]
+    return {"sent": len(results),
+            "ok": len(ok),
+            "errors": len(results) - len(ok),
+            "rejected": sum(1 for r in results if r["status"] in (429, 503)),
+            "elapsed_s": round(elapsed, 2),
+            "throughput_rps": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+            "latency": summarize(ok)}
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Regressions of the current run against a saved baseline"""
+    regressions = []
+    for key in ("p50_ms", "p95_ms", "p99_ms"):
+        current, previous = report["latency"][key], baseline["latency"][key]
+        if previous and current > previous * (1 + tolerance):
+            regressions.append(f"latency {key}: {current} > {previous} (+{tolerance:.0%})")
+    if report["throughput_rps"] < baseline["throughput_rps"] * (1 - tolerance):
+        regressions.append(f"throughput: {report['throughput_rps']} < {baseline['throughput_rps']}")
+    if report["errors"] > baseline["errors"]:
+        regressions.append(f"errors: {report['errors']} > {baseline['errors']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test /chat against local fakes")
+    parser.add_argument("--scenario", default="default", help="name of the baseline / results file")
+    parser.add_argument("--rps", type=float, default=10.0)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--warmup", type=float, default=3.0, help="seconds of load before measuring")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--max-workers", type=int, default=256)
+    parser.add_argument("--embed-ms", type=float, default=80, help="median fake embedding latency")
+    parser.add_argument("--search-ms", type=float, default=40, help="median fake vector search latency")
+    parser.add_argument("--llm-ms", type=float, default=900, help="median fake generation latency")
+    parser.add_argument("--sigma", type=float, default=0.4, help="lognormal spread of the fake latencies")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--sessions", type=int, default=200, help="simulated users the requests come from")
+    parser.add_argument("--max-concurrent", type=int, default=64,
+                        help="ADMISSION_MAX_CONCURRENT: chain calls the app runs at once")
+    parser.add_argument("--answer-cache-ttl", type=float, default=0,
+                        help="ANSWER_CACHE_TTL_SECONDS, 0 (default) so repeated questions still hit the chain")
+    parser.add_argument("--embedding-cache-ttl", type=float, default=0,
+                        help="EMBEDDING_CACHE_TTL_SECONDS, 0 (default) so every question pays the embedding call")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.15)
+    args = parser.parse_args()
+
+    # baselines are machine specific and not committed, record one on this box first
+    baseline_path = os.path.join(BASELINE_DIR, f"{args.scenario}.json")
+    if args.compare and not args.save_baseline and not os.path.exists(baseline_path):
+        parser.error(f"no baseline at {baseline_path}, record one with --save-baseline (same options)")
+
+    os.environ["USE_FAKE_SERVICES"] = "true"
+    os.environ["FAKE_EMBED_LATENCY_MS"] = str(args.embed_ms)
+    os.environ["FAKE_SEARCH_LATENCY_MS"] = str(args.search_ms)
+    os.environ["FAKE_LLM_LATENCY_MS"] = str(args.llm_ms)
+    os.environ["FAKE_LATENCY_SIGMA"] = str(args.sigma)
+    os.environ["FAKE_LLM_ERROR_RATE"] = str(args.llm_error_rate)
+    os.environ["ADMISSION_MAX_CONCURRENT"] = str(args.max_concurrent)
+    os.environ["TRUSTED_PROXIES"] = "127.0.0.1"
+    # the question pool is small: with the answer cache on, most requests would never reach the chain
+    os.environ["ANSWER_CACHE_TTL_SECONDS"] = str(args.answer_cache_ttl)
+    os.environ["EMBEDDING_CACHE_TTL_SECONDS"] = str(args.embedding_cache_ttl)
+    # a fresh shared state dir per run: nothing cached by an earlier run (or the app) makes it faster
+    state_dir = tempfile.mkdtemp(prefix="load_test_state_")
+    os.environ["SHARED_STATE_DIR"] = state_dir
+
+    # imported after the environment is set so app.py builds its chatbot on the fakes
+    from app import app
+    from src.utils.fake_services import stage_recorder
+
+    server, url = start_server(app)
+    try:
+        if args.warmup:
+            run_load(url, args.rps, args.warmup, args.timeout, args.max_workers, args.sessions)
+        stage_recorder.reset()
+        report = run_load(url, args.rps, args.duration, args.timeout, args.max_workers, args.sessions)
+    finally:
+        server.shutdown()
+        shutil.rmtree(state_dir, ignore_errors=True)
+
+    report["stages"] = {stage: summarize(samples) for stage, samples in stage_recorder.snapshot().items()}
+    report["config"] = {key: value for key, value in vars(args).items()
+                        if key not in ("save_baseline", "compare", "tolerance")}
+    report["timestamp"] = datetime.now().isoformat(timespec="seconds")
+
+    print(json.dumps(report, indent=2))
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(os.path.join(RESULTS_DIR, f"{args.scenario}.json"), "w") as f:
+        json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(baseline_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved baseline to {baseline_path}")
+
+    if args.compare:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
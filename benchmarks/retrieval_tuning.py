@@ -0,0 +1,267 @@
+"""
+Retrieval tuning harness: sweeps k, score threshold, MMR and context budget over a labeled
+question -> expected products set generated from the catalog CSVs, against the local fake
+index and a fake LLM (src/utils/fake_services.py). Reports recall@N, context tokens and
+end-to-end latency per configuration and exports the chosen one to config/retrieval.json,
+which the app loads (RetrievalProfile).
+
+    python -m benchmarks.retrieval_tuning
+    python -m benchmarks.retrieval_tuning --k 3 5 8 --thresholds 0.6 0.7 --budgets 0 400 800
+    python -m benchmarks.retrieval_tuning --embeddings nvidia --export   # write the next config version
+
+LLM latency is modelled from the prompt size (--llm-base-ms + --llm-ms-per-token x context
+tokens) on top of the measured chain time, so bigger contexts cost what they would in prod.
+Scores and thresholds depend on the embedder, so only a sweep with the production embedder
+(nvidia, or local for EMBEDDING_BACKEND=local) can be exported.
+"""
+import os
+import glob
+import json
+import time
+import random
+import argparse
+import itertools
+from dataclasses import asdict
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from benchmarks.load_test import summarize
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+# words of product names that say nothing about the product itself
+_GENERIC_WORDS = {"men", "mens", "women", "womens", "woman", "girls", "boys", "unisex", "with", "for",
+                  "and", "the", "piece", "pack", "size", "free", "combo", "style", "design"}
+_NOUNS = {"sarees": "saree", "shirts": "shirt", "watches": "watch"}
+
+
+def load_catalog(paths: List[str]) -> List[Dict[str, Any]]:
+    """Catalog rows with the ids the fake index gives them (<path>#<row>)"""
+    import csv
+    from src.utils.partitioning import category_from_path
+
+    rows = []
+    for path in paths:
+        category = category_from_path(path)
+        with open(path, encoding="utf-8", newline="") as f:
+            for row_no, row in enumerate(csv.DictReader(f)):
+                rows.append({"id": f"{path}#{row_no}", "category": category,
+                             "brand": str(row.get("Brand Name", "")).strip(),
+                             "name": str(row.get("Product Name", "")).strip()})
+    return rows
+
+
+def build_labeled_set(rows: List[Dict[str, Any]], size: int, max_expected: int,
+                      seed: int = 42) -> List[Dict[str, Any]]:
+    """
+    Questions a shopper would ask, labeled with every catalog row that satisfies them:
+      brand      "show me <brand> <noun>s"            -> rows of that brand in the category
+      keywords   "looking for a <w1> <w2> <w3> <noun>" -> rows whose name has all the words
+    Questions matching more than `max_expected` rows are too vague to score and are skipped.
+    """
+    from src.utils.retrieval_utils import tokenize
+
+    rng = random.Random(seed)
+    for row in rows:
+        brand_words = tokenize(row["brand"])
+        row["words"] = {w for w in tokenize(row["name"]) if w.isalpha() and len(w) > 3} - brand_words - _GENERIC_WORDS
+
+    labeled, seen = [], set()
+    for row in rng.sample(rows, len(rows)):
+        noun = _NOUNS.get(row["category"], row["category"])
+        candidates = []
+        if row["brand"]:
+            candidates.append((f"show me {row['brand']} {noun}s", "brand",
+                               lambda other, brand=row["brand"].lower(): other["brand"].lower() == brand))
+        if len(row["words"]) >= 3:
+            words = set(rng.sample(sorted(row["words"]), 3))
+            candidates.append((f"looking for a {' '.join(sorted(words))} {noun}", "keywords",
+                               lambda other, words=words: words <= other["words"]))
+
+        for question, kind, matches in candidates:
+            if question in seen:
+                continue
+            seen.add(question)
+            expected = {other["id"] for other in rows if other["category"] == row["category"] and matches(other)}
+            if len(expected) <= max_expected:
+                labeled.append({"question": question, "kind": kind, "expected": sorted(expected)})
+        if len(labeled) >= size:
+            break
+    return labeled[:size]
+
+
+def sweep_grid(args: argparse.Namespace) -> List[Tuple[str, Any]]:
+    from src.utils.retrieval_utils import RetrievalConfig
+
+    grid = []
+    if "threshold" in args.strategies:
+        for k, threshold, budget in itertools.product(args.k, args.thresholds, args.budgets):
+            grid.append(("threshold", RetrievalConfig(k=k, score_threshold=threshold, max_context_tokens=budget)))
+    if "multi_stage" in args.strategies:
+        for k, threshold, lambda_mult, budget in itertools.product(args.k, args.thresholds,
+                                                                   args.lambda_mult, args.budgets):
+            grid.append(("multi_stage", RetrievalConfig(k=k, score_threshold=threshold, fetch_k=args.fetch_k,
+                                                        mmr_k=max(RetrievalConfig.mmr_k, k),
+                                                        lambda_mult=lambda_mult, max_context_tokens=budget)))
+    return grid
+
+
+def build_chain(vector_store: Any, strategy: str, config: Any):
+    from langchain.chains import create_retrieval_chain
+    from langchain.chains.combine_documents import create_stuff_documents_chain
+    from src.utils.chatbot_utils import BuildChatbot
+    from src.utils.fake_services import FakeChatModel, FaultProfile
+    from src.utils.retrieval_utils import MultiStageRetriever, ThresholdRetriever
+
+    if strategy == "multi_stage":
+        retriever = MultiStageRetriever(vector_store=vector_store, config=config)
+    else:
+        retriever = ThresholdRetriever(vector_store=vector_store, k=config.k, score_threshold=config.score_threshold,
+                                       max_context_tokens=config.max_context_tokens)
+    doc_chain = create_stuff_documents_chain(llm=FakeChatModel(profile=FaultProfile()),
+                                             prompt=BuildChatbot().setup_prompt(),
+                                             document_variable_name="context")
+    return create_retrieval_chain(retriever=retriever, combine_docs_chain=doc_chain)
+
+
+def evaluate(chain: Any, labeled: List[Dict[str, Any]], recall_at: int, llm_base_ms: float,
+             llm_ms_per_token: float) -> Dict[str, Any]:
+    from src.utils.retrieval_utils import estimate_tokens
+
+    recalls, hits, documents, tokens, latencies = [], [], [], [], []
+    for item in labeled:
+        start = time.perf_counter()
+        result = chain.invoke({"input": item["question"]})
+        measured_ms = (time.perf_counter() - start) * 1000
+
+        context = result.get("context", [])
+        retrieved = {f"{doc.metadata.get('source')}#{int(doc.metadata.get('row', -1))}" for doc in context}
+        found = len(retrieved & set(item["expected"]))
+        top = {f"{doc.metadata.get('source')}#{int(doc.metadata.get('row', -1))}" for doc in context[:recall_at]}
+        context_tokens = sum(estimate_tokens(doc.page_content) for doc in context)
+
+        relevant = min(len(item["expected"]), recall_at)
+        recalls.append(len(top & set(item["expected"])) / relevant)
+        hits.append(1.0 if found else 0.0)
+        documents.append(len(context))
+        tokens.append(context_tokens)
+        latencies.append(measured_ms + llm_base_ms + llm_ms_per_token * context_tokens)
+
+    count = len(labeled)
+    return {f"recall_at_{recall_at}": round(sum(recalls) / count, 4),
+            "hit_rate": round(sum(hits) / count, 4),
+            "documents": round(sum(documents) / count, 2),
+            "context_tokens": round(sum(tokens) / count, 1),
+            "latency": summarize(latencies)}
+
+
+def choose(results: List[Dict[str, Any]], recall_key: str, tolerance: float) -> Dict[str, Any]:
+    """Fastest configuration whose recall is within `tolerance` of the best one"""
+    best_recall = max(result["metrics"][recall_key] for result in results)
+    eligible = [result for result in results if result["metrics"][recall_key] >= best_recall - tolerance]
+    return min(eligible, key=lambda result: (result["metrics"]["latency"]["mean_ms"],
+                                             result["metrics"]["context_tokens"]))
+
+
+def describe(strategy: str, config: Any) -> str:
+    text = f"{strategy:<11} k={config.k:<2} thr={config.score_threshold:<5} budget={config.max_context_tokens:<4}"
+    if strategy == "multi_stage":
+        text += f" fetch_k={config.fetch_k} lambda={config.lambda_mult}"
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tune retrieval settings for recall vs context size / latency")
+    parser.add_argument("--catalog", nargs="+", default=sorted(glob.glob(os.path.join("data", "*.csv"))))
+    parser.add_argument("--questions", type=int, default=150, help="size of the labeled set")
+    parser.add_argument("--max-expected", type=int, default=10, help="skip questions matching more products")
+    parser.add_argument("--recall-at", type=int, default=5)
+    parser.add_argument("--strategies", nargs="+", choices=["threshold", "multi_stage"],
+                        default=["threshold", "multi_stage"])
+    parser.add_argument("--k", type=int, nargs="+", default=[3, 5, 8])
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.6, 0.65, 0.7])
+    parser.add_argument("--lambda-mult", type=float, nargs="+", default=[0.6, 1.0], help="MMR diversity (1 = off)")
+    parser.add_argument("--fetch-k", type=int, default=25)
+    parser.add_argument("--budgets", type=int, nargs="+", default=[0, 300], help="context token budgets, 0 = none")
+    parser.add_argument("--llm-base-ms", type=float, default=400.0)
+    parser.add_argument("--llm-ms-per-token", type=float, default=0.25, help="prompt processing cost")
+    parser.add_argument("--recall-tolerance", type=float, default=0.02,
+                        help="recall the chosen config may give up against the best one for lower latency")
+    parser.add_argument("--embeddings", choices=["fake", "local", "nvidia"], default="fake",
+                        help="query / document embedder: hashing fake, the local model fitted on the catalog "
+                             "or the production NVIDIA model (NVIDIA_API_KEY)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--export", action="store_true", help="write the chosen config as the next version")
+    parser.add_argument("--config-path", default=None, help="default: RETRIEVAL_CONFIG_PATH / config/retrieval.json")
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "retrieval_tuning.json"))
+    args = parser.parse_args()
+    if args.export and args.embeddings == "fake":
+        parser.error("--export needs the production embedder (--embeddings nvidia, or local), "
+                     "settings tuned on fake embeddings don't carry over")
+
+    # local index and LLM: no simulated network latency
+    os.environ["FAKE_EMBED_LATENCY_MS"] = "0"
+    os.environ["FAKE_SEARCH_LATENCY_MS"] = "0"
+
+    from src.utils.fake_services import FakeEmbeddings, FaultProfile, build_fake_vector_store
+    from src.utils.pipeline_state import fingerprint_files
+    from src.utils.retrieval_utils import RetrievalProfile
+
+    rows = load_catalog(args.catalog)
+    labeled = build_labeled_set(rows, args.questions, args.max_expected, args.seed)
+    print(f"Labeled set: {len(labeled)} questions over {len(rows)} catalog rows")
+    if args.embeddings == "nvidia":
+        from src.utils.chatbot_utils import BuildChatbot
+
+        os.environ.update(USE_FAKE_SERVICES="false", EMBEDDING_BACKEND="nvidia")
+        embeddings = BuildChatbot().load_embeddings()
+        vector_store = build_fake_vector_store(embeddings, args.catalog, document_embeddings=embeddings)
+    elif args.embeddings == "local":
+        from src.utils.fake_services import catalog_texts
+        from src.utils.local_embeddings import LocalEmbeddings
+
+        embeddings = LocalEmbeddings.fit(text for path in args.catalog for text in catalog_texts(path)[0])
+        vector_store = build_fake_vector_store(embeddings, args.catalog, document_embeddings=embeddings)
+    else:
+        vector_store = build_fake_vector_store(FakeEmbeddings(profile=FaultProfile()), args.catalog)
+
+    recall_key = f"recall_at_{args.recall_at}"
+    results = []
+    for strategy, config in sweep_grid(args):
+        metrics = evaluate(build_chain(vector_store, strategy, config), labeled, args.recall_at,
+                           args.llm_base_ms, args.llm_ms_per_token)
+        results.append({"strategy": strategy, "config": asdict(config), "metrics": metrics,
+                        "_config": config})
+        print(f"{describe(strategy, config)}  recall@{args.recall_at}={metrics[recall_key]:.3f} "
+              f"hit={metrics['hit_rate']:.3f} docs={metrics['documents']:<4} tokens={metrics['context_tokens']:<6} "
+              f"p50={metrics['latency']['p50_ms']} ms")
+
+    chosen = choose(results, recall_key, args.recall_tolerance)
+    print(f"Chosen: {describe(chosen['strategy'], chosen['_config'])} {json.dumps(chosen['metrics'])}")
+
+    report = {"timestamp": datetime.now().isoformat(timespec="seconds"),
+              "catalog": args.catalog,
+              "questions": len(labeled),
+              "settings": {key: value for key, value in vars(args).items() if key not in ("export", "output")},
+              "results": [{key: value for key, value in result.items() if key != "_config"} for result in results],
+              "chosen": {key: value for key, value in chosen.items() if key != "_config"}}
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.export:
+        previous = RetrievalProfile.load(args.config_path)
+        profile = RetrievalProfile(version=previous.version + 1, strategy=chosen["strategy"], config=chosen["_config"],
+                                   evaluation=dict(chosen["metrics"], questions=len(labeled),
+                                                   catalog_fingerprint=fingerprint_files(args.catalog),
+                                                   llm_base_ms=args.llm_base_ms,
+                                                   llm_ms_per_token=args.llm_ms_per_token,
+                                                   tuned_at=report["timestamp"]))
+        profile.save(args.config_path)
+        print(f"Exported retrieval config v{profile.version}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Scraper browser benchmark against a local fixture shop: headless Chromium scrapes Hunnit-like
+search / product pages (heavy images, web fonts, stylesheets and third-party trackers served with
+latency) in the full and the lean browser mode, and reports per page browser time, WebDriver
+round trips and what the fixture server actually had to serve. Rows of both modes must match.
+
+    CHROME_BINARY=/path/to/chrome CHROMEDRIVER_PATH=/path/to/chromedriver \
+        python -m benchmarks.scraper_benchmark --products 20
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from collections import Counter
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+from urllib.parse import urlparse
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+SHOP_HOST = "hunnit.test"
+# resolved to the fixture server too (--host-resolver-rules), so the default tracker patterns apply
+TRACKER_HOSTS = ["www.googletagmanager.com", "static.hotjar.com", "connect.facebook.net"]
+
+# -------- fixture shop --------
+resource_spec = {           # kind: (bytes, latency seconds)
+    'image': (150_000, 0.04),
+    'font': (60_000, 0.03),
+    'css': (80_000, 0.02),
+    'tracker': (40_000, 0.15),
+}
+
+
+def _product(index: int) -> Dict[str, Any]:
+    return {
+        "id": index,
+        "title": f"Flex Legging {index}",
+        "handle": f"flex-legging-{index}",
+        "price": 149900 + index * 100,
+        "compare_at_price": 199900,
+        "description": "<p>Buttery soft, squat proof leggings with a high rise waistband.</p>",
+        "vendor": "Hunnit",
+        "type": "Leggings",
+        "tags": ["activewear", "leggings"],
+        "images": [f"//{SHOP_HOST}/cdn/images/legging-{index}-{i}.jpg" for i in range(3)],
+        "variants": [{"id": index * 10 + i, "title": size, "sku": f"FL{index}-{size}", "price": 149900,
+                      "available": True, "options": [size]} for i, size in enumerate(["S", "M", "L"])],
+    }
+
+
+def _heavy_head(index: int) -> str:
+    trackers = "".join(f'<script async src="http://{host}/tag.js?page={index}"></script>' for host in TRACKER_HOSTS)
+    return (f'<link rel="stylesheet" href="/cdn/theme.css?v={index}">'
+            f'<link rel="preload" as="font" crossorigin href="/cdn/fonts/brand.woff2?v={index}">'
+            f'{trackers}')
+
+
+def _heavy_body(index: int) -> str:
+    images = "".join(f'<img src="/cdn/images/legging-{index}-{i}.jpg">' for i in range(6))
+    return f'{images}<iframe src="http://{TRACKER_HOSTS[2]}/tr.html?page={index}"></iframe>'
+
+
+def search_page(products: int) -> str:
+    cards = "".join(f'<div class="card"><a href="/products/flex-legging-{i}">Flex Legging {i}</a>'
+                    f'<img src="/cdn/images/card-{i}.jpg"></div>' for i in range(products))
+    return f"<html><head>{_heavy_head(-1)}</head><body>{cards}{_heavy_body(-1)}</body></html>"
+
+
+def product_page(index: int) -> str:
+    product = _product(index)
+    ld_json = {"@context": "https://schema.org", "@type": "Product", "name": product["title"],
+               "brand": {"@type": "Brand", "name": "Hunnit"},
+               "offers": {"@type": "Offer", "price": "1499.00", "availability": "https://schema.org/InStock"}}
+    features = "".join(f"<li>  Feature {n} of\n legging {index} </li>" for n in range(5))
+    return (f"<html><head>{_heavy_head(index)}"
+            f'<script type="application/ld+json">{json.dumps(ld_json)}</script></head><body>'
+            f'<script type="application/json" id="ProductJson-{index}">{json.dumps(product)}</script>'
+            f'<ul class="m-key-features">{features}</ul>{_heavy_body(index)}</body></html>')
+
+
+class FixtureShop(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, products: int):
+        super().__init__(("127.0.0.1", 0), FixtureHandler)
+        self.products = products
+        self.served = Counter()         # requests served per kind
+        self.bytes_served = Counter()
+        self.lock = threading.Lock()
+
+    def record(self, kind: str, size: int):
+        with self.lock:
+            self.served[kind] += 1
+            self.bytes_served[kind] += size
+
+    def reset(self):
+        with self.lock:
+            self.served.clear()
+            self.bytes_served.clear()
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def _send(self, kind: str, body: bytes, content_type: str, latency: float = 0.0):
+        if latency:
+            time.sleep(latency)
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")       # every page pays for its resources, like a cold crawl
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.record(kind, len(body))
+
+    def do_GET(self):
+        host = (self.headers.get("Host") or "").split(":")[0]
+        path = urlparse(self.path).path
+        if host in TRACKER_HOSTS:
+            size, latency = resource_spec['tracker']
+            return self._send('tracker', b"/*" + b"x" * size + b"*/", "application/javascript", latency)
+        if path == "/search":
+            return self._send('document', search_page(self.server.products).encode(), "text/html", 0.02)
+        if path.startswith("/products/"):
+            index = int(path.rsplit("-", 1)[-1])
+            return self._send('document', product_page(index).encode(), "text/html", 0.02)
+        for kind, suffixes, content_type in (('image', (".jpg",), "image/jpeg"),
+                                             ('font', (".woff2",), "font/woff2"),
+                                             ('css', (".css",), "text/css")):
+            if path.endswith(suffixes):
+                size, latency = resource_spec[kind]
+                return self._send(kind, b"\0" * size, content_type, latency)
+        self.send_error(404)
+# ------------------------------
+
+
+def _instrument(driver, log: List[Dict[str, Any]]):
+    """Record every WebDriver command (one HTTP round trip to chromedriver each)"""
+    execute = driver.execute
+
+    def counted(command, params=None):
+        log.append({"command": command, "url": (params or {}).get("url"), "at": time.perf_counter()})
+        return execute(command, params)
+
+    driver.execute = counted
+    return driver
+
+
+def run_mode(shop: FixtureShop, lean: bool, products: int) -> Dict[str, Any]:
+    from src.components import scraper
+
+    config = scraper.ScraperConfig()
+    config.lean_mode = lean
+    config.headless = True
+    config.base_url = f"http://{SHOP_HOST}"
+    config.chrome_arguments = list(config.chrome_arguments) + [
+        f"--host-resolver-rules=MAP * 127.0.0.1:{shop.server_address[1]}"]
+
+    commands = []
+    init_driver = scraper._init_driver
+
+    def instrumented_init(is_airflow, config=None):
+        driver, user_data_dir = init_driver(is_airflow, config)
+        return _instrument(driver, commands), user_data_dir
+
+    shop.reset()
+    scraper._init_driver = instrumented_init
+    try:
+        started = time.perf_counter()
+        rows = list(scraper.iter_hunnit_products("flex legging", num_products=products * 3, config=config))
+        finished = time.perf_counter()
+    finally:
+        scraper._init_driver = init_driver
+
+    # per product page: from its get to the next page's get (or the end of the scrape)
+    gets = [i for i, c in enumerate(commands) if c["command"] == "get" and "/products/" in (c["url"] or "")]
+    pages = []
+    for n, i in enumerate(gets):
+        end = gets[n + 1] if n + 1 < len(gets) else len(commands)
+        until = commands[end]["at"] if end < len(commands) else finished
+        pages.append({"ms": (until - commands[i]["at"]) * 1000, "rpcs": end - i})
+    page_ms = sorted(page["ms"] for page in pages) or [0.0]
+    return {
+        "mode": "lean" if lean else "full",
+        "pages": len(pages),
+        "rows": len(rows),
+        "total_s": round(finished - started, 2),
+        "page_ms_mean": round(sum(page_ms) / len(page_ms), 1),
+        "page_ms_p50": round(page_ms[len(page_ms) // 2], 1),
+        "page_ms_max": round(page_ms[-1], 1),
+        "rpcs_total": len(commands),
+        "rpcs_per_page": round(sum(page["rpcs"] for page in pages) / max(len(pages), 1), 1),
+        "served": dict(shop.served),
+        "served_mb": round(sum(shop.bytes_served.values()) / 1e6, 2),
+        "_rows": rows,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the full vs lean Selenium scraper on a local fixture shop")
+    parser.add_argument("--products", type=int, default=20, help="product pages in the fixture shop")
+    parser.add_argument("--output", default=os.path.join(RESULTS_DIR, "scraper.json"))
+    args = parser.parse_args()
+
+    shop = FixtureShop(args.products)
+    threading.Thread(target=shop.serve_forever, daemon=True).start()
+    try:
+        results = [run_mode(shop, lean=False, products=args.products),
+                   run_mode(shop, lean=True, products=args.products)]
+    finally:
+        shop.shutdown()
+
+    full, lean = results
+    same_rows = full.pop("_rows") == lean.pop("_rows")
+    print(f"{'mode':<6}{'pages':>7}{'page ms':>10}{'p50':>8}{'max':>8}{'rpc/page':>10}{'rpcs':>7}{'MB':>7}  served")
+    for r in results:
+        print(f"{r['mode']:<6}{r['pages']:>7}{r['page_ms_mean']:>10}{r['page_ms_p50']:>8}{r['page_ms_max']:>8}"
+              f"{r['rpcs_per_page']:>10}{r['rpcs_total']:>7}{r['served_mb']:>7}  {r['served']}")
+    speedup = full['page_ms_mean'] / max(lean['page_ms_mean'], 1e-9)
+    print(f"lean mode: {speedup:.1f}x faster per page, {full['rpcs_per_page']} -> {lean['rpcs_per_page']} "
+          f"rpcs per page, identical rows: {same_rows}")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump({"timestamp": datetime.now().isoformat(), "products": args.products,
+                   "identical_rows": same_rows, "results": results}, f, indent=2)
+    print(f"Results written to {args.output}")
+    if not same_rows:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,25 @@
 from datetime import datetime, timedelta
 from airflow import DAG
-from airflow.operators.python import PythonOperator
+from airflow.operators.python import PythonOperator, ShortCircuitOperator
+from airflow.utils.trigger_rule import TriggerRule
 import logging
 import sys
 import os
 
 sys.path.append('/opt/airflow')
 
-from src.components.data_collection import DataCollection
+from src.components.data_collection import DataCollection, products_config
 from src.components.data_cleaning import DataCleaner
 from src.components.vectorstore_builder import VectorStoreBuilder
-from src.components.chatbot_builder import ChatbotBuilder
-
-from langchain_pinecone import PineconeVectorStore
+from src.utils.pipeline_state import PipelineState, fingerprint_dir, fingerprint_files
+from src.utils.profiling import profiled
 
 default_args = {
     'owner': 'airflow',
-    'depends_on_past': False,               # does the current DAG run depends on the previous DAG run? 
+    'depends_on_past': False,               # does the current DAG run depends on the previous DAG run?
     'start_date': datetime(2025, 6, 17),
     'retries': 1,
-    'retry_delay': timedelta(minutes=4),    # if a task fails in a dag run, it will be retried after 4 minutes  
+    'retry_delay': timedelta(minutes=4),    # if a task fails in a dag run, it will be retried after 4 minutes
                                             # we can try to solve the error within 4 minutes for a successfull rerun
 }
 
@@ -27,51 +27,99 @@ dag = DAG(
     'Ecommerce-Chatbot-Pipeline',
     default_args=default_args,
     description='Ecommerce Chatbot Pipeline',
-    schedule_interval=None,               # DAG runs will start only with a manual trigger 
+    schedule_interval=None,               # DAG runs will start only with a manual trigger
     catchup=False,
+    params={"force": False},              # trigger with {"force": true} to rescrape and rebuild everything
 )
 
 
+# fingerprint keys: inputs of the last successful cleaning / vectorstore build
+CLEAN_INPUT = "clean_input"
+VECTORSTORE_INPUT = "vectorstore_input"
+
+
+def raw_fingerprint():
+    return fingerprint_dir(DataCleaner().data_cleaner_config.input_path)
+
+def cleaned_fingerprint():
+    return fingerprint_files([DataCleaner().data_cleaner_config.output_path])
+
+
 # task functions
-def collect_data():
-    DataCollection().initiate_data_collection()
+def collect_keyword(keyword, **context):                # one mapped task instance per keyword
+    return DataCollection().collect_product(keyword, force=context["params"].get("force", False))
+
+def inputs_changed(**context):
+    # fan-in: like the old serial collection, a failed keyword falls back to its last CSV,
+    # but at least one keyword has to make it
+    collected = [path for path in context["ti"].xcom_pull(task_ids="data_collection") or [] if path]
+    if not collected:
+        raise ValueError("All products scraping failed")
+
+    if context["params"].get("force", False):
+        return True
+    state = PipelineState()
+    # a build that failed after a successful cleaning has to be retried even if the raw data is unchanged
+    changed = state.changed(CLEAN_INPUT, raw_fingerprint()) or state.changed(VECTORSTORE_INPUT, cleaned_fingerprint())
+    logging.info(f"Raw data changed since the last build: {changed}")
+    return changed
 
 def clean_data():
+    fingerprint = raw_fingerprint()
     DataCleaner().clean_data()
+    PipelineState().set(CLEAN_INPUT, fingerprint)
+
+def cleaned_data_changed(**context):
+    # the raw files can change (e.g. a rescrape) without changing the cleaned catalog
+    changed = context["params"].get("force", False) or PipelineState().changed(VECTORSTORE_INPUT, cleaned_fingerprint())
+    logging.info(f"Cleaned data changed since the last build: {changed}")
+    return changed
 
 def build_vectorstore():                                # creating the vectorstore
-    VectorStoreBuilder().run_pipeline()       
-
-def build_chatbot():
-    pipeline = VectorStoreBuilder()                     # loading the created vectorstore as we don't want to pass the result from one task to another 
-    embeddings = pipeline.create_embeddings()
-    vector_store = PineconeVectorStore.from_existing_index(
-        index_name="ecommerce-chatbot-project", 
-        embedding=embeddings
-    )
-   
-    ChatbotBuilder().build_chatbot(vector_store)
+    fingerprint = cleaned_fingerprint()
+    VectorStoreBuilder().run_pipeline()
+    PipelineState().set(VECTORSTORE_INPUT, fingerprint)
+
+def check_index():                                      # vectors present + one smoke query, no LLM call
+    return VectorStoreBuilder().check_index_health()
 
 
 with dag:
-    task1 = PythonOperator(
+    # fan out: scrape the keywords in parallel
+    task1 = PythonOperator.partial(
         task_id='data_collection',
-        python_callable=collect_data
+        python_callable=profiled(collect_keyword, 'data_collection')      # PROFILE_TASKS=<task ids>|all
+    ).expand(op_kwargs=[{"keyword": product['keyword']} for product in products_config])
+
+    # fan in: skip cleaning and the build when nothing changed since the last successful run
+    task2 = ShortCircuitOperator(
+        task_id='inputs_changed',
+        python_callable=inputs_changed,
+        trigger_rule=TriggerRule.ALL_DONE,
+        ignore_downstream_trigger_rules=False
     )
 
-    task2 = PythonOperator(
+    task3 = PythonOperator(
         task_id='data_cleaning',
-        python_callable=clean_data
+        python_callable=profiled(clean_data, 'data_cleaning')
     )
 
-    task3 = PythonOperator(
+    task4 = ShortCircuitOperator(
+        task_id='cleaned_data_changed',
+        python_callable=cleaned_data_changed,
+        ignore_downstream_trigger_rules=False
+    )
+
+    task5 = PythonOperator(
         task_id='vectorstore_build',
-        python_callable=build_vectorstore
+        python_callable=profiled(build_vectorstore, 'vectorstore_build')
     )
 
-    task4 = PythonOperator(
-        task_id='chatbot_build',
-        python_callable=build_chatbot
+    # runs after a build and after skipped (no-op) runs, not after failures
+    task6 = PythonOperator(
+        task_id='index_health_check',
+        python_callable=profiled(check_index, 'index_health_check'),
+        trigger_rule=TriggerRule.NONE_FAILED
     )
 
-    task1 >> task2 >> task3 >> task4
\ No newline at end of file
+    task1 >> task2 >> task3 >> task4 >> task5 >> task6
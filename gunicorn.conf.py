@@ -0,0 +1,37 @@
+# gunicorn -c gunicorn.conf.py app:app
+#
+# preload_app loads app.py (catalog, intent router tables, chains, memory-mapped vectors) once in
+# the master; the workers are forked from it and share those pages copy-on-write instead of each
+# building its own copy. Hot caches (query embeddings, answers) live in a sqlite file in /dev/shm
+# (src/utils/shared_state.py) shared by every worker of the box.
+import gc
+import os
+import multiprocessing
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("GUNICORN_WORKERS", str(min(multiprocessing.cpu_count() * 2, 8))))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))       # requests mostly wait on the LLM / Pinecone
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 30
+keepalive = 5
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "0"))
+max_requests_jitter = 50
+
+preload_app = True
+
+
+def pre_fork(server, worker):
+    # move everything loaded so far out of the gc's reach: collections would otherwise write to
+    # every object header and un-share the pages in each worker
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # background threads (log writer, index pointer watcher) are not copied by fork.
+    # every worker logs to its own file (Logs/app.<pid>.log): size / time rotation renames the
+    # file, which breaks the other processes still appending to it
+    import app
+    name, ext = os.path.splitext(os.getenv("LOG_FILE", "app.log"))
+    app.init_worker(log_file=f"{name}.{worker.pid}{ext}")
+    server.log.info(f"Worker {worker.pid} ready")
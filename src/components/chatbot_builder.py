@@ -2,7 +2,6 @@ import os
 import sys
 from typing import Any
 
-from langchain_groq import ChatGroq
 from langchain_core.caches import BaseCache
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import SystemMessage, HumanMessage
@@ -13,6 +12,9 @@ from langchain_pinecone import PineconeVectorStore
 
 from src.utils.logger import logging
 from src.utils.exception import Custom_exception
+from src.utils.fake_services import FakeChatModel, use_fake_services
+from src.utils.llm_gateway import LLMGateway, create_groq_gateway
+from src.utils.retrieval_utils import MultiStageRetriever, RetrievalConfig, RetrievalProfile, ThresholdRetriever
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -21,21 +23,24 @@ load_dotenv()
 class ChatbotBuilder:
     def __init__(self):
         self.api_key = os.getenv("GROQ_API_KEY")
-        if not self.api_key:
+        if not self.api_key and not use_fake_services():
             raise ValueError("GROQ_API_KEY environment variable not set")
         
 
     def create_llm(self):
         try:
+            if use_fake_services():
+                logging.info("Using fake in-process LLM tiers")
+                return LLMGateway([("primary", FakeChatModel()), ("fallback", FakeChatModel())])
+
             logging.info("Initializing Llama2 model with Groq")
 
             #ChatGroq.model_rebuild()
 
-            llm = ChatGroq(temperature=0.6,
-                           model_name="llama-3.3-70b-versatile",
-                           groq_api_key=self.api_key,
-                           max_tokens=4096,)
-                           #cache=True)
+            # deadline, hedging, circuit breaking and fallback to a faster model tier
+            llm = create_groq_gateway(api_key=self.api_key,
+                                      temperature=0.6,
+                                      max_tokens=4096)
             
             logging.info("LLM initialized successfully")
             return llm
@@ -90,13 +95,22 @@ class ChatbotBuilder:
             raise Custom_exception(e, sys)
         
 
-    def create_retriever(self, vector_store: PineconeVectorStore):
+    def create_retriever(self, vector_store: PineconeVectorStore, multi_stage: bool = None,
+                         retrieval_config: RetrievalConfig = None):
         try:
             logging.info("Initializing vector_store as retriever")
-            retriever = vector_store.as_retriever(
-                search_type="similarity_score_threshold",
-                search_kwargs={"score_threshold": 0.7}
-            )
+            # tuned settings from config/retrieval.json unless given explicitly
+            profile = RetrievalProfile.load()
+            config = retrieval_config or profile.config
+            if multi_stage is None:
+                multi_stage = profile.multi_stage
+            if multi_stage:
+                # over-fetch, diversify with MMR and re-rank locally, pass only the top few docs on
+                retriever = MultiStageRetriever(vector_store=vector_store, config=config)
+            else:
+                retriever = ThresholdRetriever(vector_store=vector_store, k=config.k,
+                                               score_threshold=config.score_threshold,
+                                               max_context_tokens=config.max_context_tokens)
             
             logging.info("Retriever has been initialized")
             return retriever
@@ -126,12 +140,12 @@ class ChatbotBuilder:
             raise Custom_exception(e, sys)
         
 
-    def build_chatbot(self, vector_store: PineconeVectorStore):
+    def build_chatbot(self, vector_store: PineconeVectorStore, multi_stage: bool = None):
         try:
             logging.info("Starting chatbot building")
             llm = self.create_llm()
             prompt = self.create_prompt()
-            retriever = self.create_retriever(vector_store)
+            retriever = self.create_retriever(vector_store, multi_stage=multi_stage)
             retrieval_chain = self.create_chains(llm, prompt, retriever)
             
             logging.info("Chatbot building completed successfully")
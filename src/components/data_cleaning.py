@@ -2,11 +2,14 @@
 import os
 import sys
 import glob
+import json
 import pandas as pd
 from pandas import DataFrame
 from dataclasses import dataclass
 from src.utils.logger import logging
 from src.utils.exception import Custom_exception
+from src.utils.partitioning import category_from_path
+from src.utils.profiling import stage
 
 @dataclass
 class DataCleaningConfig:
@@ -14,9 +17,11 @@ class DataCleaningConfig:
     if is_airflow:
         input_path = "/opt/airflow/data/"
         output_path = "/opt/airflow/artifacts/data_cleaned.csv"
+        modes_path = "/opt/airflow/artifacts/column_modes.json"
     else:
         input_path = "data"
         output_path = "artifacts/data_cleaned.csv"
+        modes_path = "artifacts/column_modes.json"
 
 class DataCleaner:
     """
@@ -36,6 +41,12 @@ class DataCleaner:
             file_paths = glob.glob(os.path.join(file_path, "*.csv"))
             for f in file_paths:
                 file = pd.read_csv(f)
+                # the category partitions the vector index, older scrapes only have it in the file name
+                category = category_from_path(f)
+                if "Category" not in file.columns:
+                    file["Category"] = category
+                else:
+                    file["Category"] = file["Category"].where(~file["Category"].map(self.is_na), category)
                 dfs.append(file)
             df = pd.concat(dfs, ignore_index=True) if dfs else pd.DataFrame()
             logging.info("Data loaded successfully")
@@ -86,19 +97,73 @@ class DataCleaner:
 
     def clean_data(self):
         try:
-            logging.info("Starting data cleaning process")
-            df = self.load_data(self.data_cleaner_config.input_path)
-            if df.empty:
-                logging.info("No files found to clean")
-                return df
-            self.check_for_na(df)
-            cols, replace_value = self.find_mode(df)
-            df_cleaned = self.handling_na(columns=cols,
-                                          replacement_value=replace_value,
-                                          df=df,
-                                          path=self.data_cleaner_config.output_path)
-            logging.info("Data cleaning process has been completed")
-            return df_cleaned
+            with stage("clean"):
+                logging.info("Starting data cleaning process")
+                df = self.load_data(self.data_cleaner_config.input_path)
+                if df.empty:
+                    logging.info("No files found to clean")
+                    return df
+                self.check_for_na(df)
+                cols, replace_value = self.find_mode(df)
+                # streaming ingestion imputes record by record with these
+                self.save_modes(replace_value)
+                df_cleaned = self.handling_na(columns=cols,
+                                              replacement_value=replace_value,
+                                              df=df,
+                                              path=self.data_cleaner_config.output_path)
+                logging.info("Data cleaning process has been completed")
+                return df_cleaned
         except Exception as e:
             logging.error(f"Error cleaning data: {str(e)}")
             raise Custom_exception(e, sys)
+
+    def save_modes(self, modes: dict):
+        try:
+            path = self.data_cleaner_config.modes_path
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({col: str(value) for col, value in modes.items()}, f, indent=2)
+            logging.info(f"Saved column modes to {path}")
+        except Exception as e:
+            logging.error(f"Error saving column modes: {str(e)}")
+            raise Custom_exception(e, sys)
+
+    def load_modes(self) -> dict:
+        """Modes saved by the last batch cleaning run, empty if there was none"""
+        try:
+            with open(self.data_cleaner_config.modes_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logging.error(f"Error loading column modes: {str(e)}")
+            raise Custom_exception(e, sys)
+
+    @staticmethod
+    def is_na(value) -> bool:
+        if value is None:
+            return True
+        if isinstance(value, float) and pd.isna(value):
+            return True
+        return str(value).strip().lower() == 'na'
+
+    @staticmethod
+    def find_record_modes(records) -> dict:
+        """Modes of a sample of records (rows without any 'na', like find_mode)"""
+        counts = {}
+        for record in records:
+            if any(DataCleaner.is_na(value) for value in record.values()):
+                continue
+            for col, value in record.items():
+                if isinstance(value, (int, float, bool)):
+                    continue
+                counts.setdefault(col, {})
+                counts[col][str(value)] = counts[col].get(str(value), 0) + 1
+        return {col: max(values, key=values.get) for col, values in counts.items() if values}
+
+    def clean_record(self, record: dict, modes: dict, source: str = None) -> dict:
+        """Streaming counterpart of handling_na: replace 'na' / missing values with precomputed modes"""
+        if source is not None and self.is_na(record.get("Category")):
+            # like load_data: the category of the source file, not the mode of all categories
+            record = dict(record, Category=category_from_path(source))
+        return {col: (modes.get(col, value) if self.is_na(value) else value) for col, value in record.items()}
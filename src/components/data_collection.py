@@ -1,11 +1,14 @@
 import os 
 import sys 
+import time
 
 # ✔ you said your file name is still scraper.py
 from src.components.scraper import scrape_hunnit_products
 
 from src.utils.logger import logging
 from src.utils.exception import Custom_exception
+from src.utils.pipeline_state import PipelineState, fingerprint_value
+from src.utils.profiling import stage
 
 from dataclasses import dataclass
 
@@ -40,12 +43,67 @@ class DataCollectionConfig:
     else:
         path = 'data'   
 
+    # a keyword scraped with the same settings more recently than this is not scraped again
+    max_age_hours = float(os.getenv("SCRAPE_MAX_AGE_HOURS", "24"))
+
 
 class DataCollection:
     def __init__(self):
         self.data_collection_config = DataCollectionConfig()
 
-    def initiate_data_collection(self):
+    def get_product_config(self, keyword: str) -> dict:
+        for product in products_config:
+            if product['keyword'] == keyword:
+                return product
+        raise ValueError(f"Unknown keyword: {keyword}")
+
+    def is_fresh(self, product: dict, state: PipelineState) -> bool:
+        file_path = os.path.join(self.data_collection_config.path, product['file_path'])
+        if not os.path.exists(file_path):
+            return False
+        age_hours = (time.time() - os.path.getmtime(file_path)) / 3600
+        return (age_hours < self.data_collection_config.max_age_hours
+                and not state.changed(f"scrape_{product['keyword']}", fingerprint_value(product)))
+
+    def collect_product(self, keyword: str, force: bool = False) -> str:
+        """Scrape one keyword into its CSV (skipped while the last scrape is fresh), returns the file path"""
+        try:
+            product = self.get_product_config(keyword)
+            file_path = os.path.join(self.data_collection_config.path, product['file_path'])
+            state = PipelineState()
+
+            if not force and self.is_fresh(product, state):
+                logging.info(f"Skipping {keyword}: scraped less than "
+                             f"{self.data_collection_config.max_age_hours} hours ago")
+                return file_path
+
+            logging.info(
+                f"Collecting data for: {product['keyword']} "
+                f"Target: {product['num_products']}"
+            )
+
+            # ✔ Updated function call (your new scraper function)
+            with stage("scrape"):
+                data = scrape_hunnit_products(
+                    keyword=product['keyword'],
+                    num_products=product['num_products']
+                )
+
+            print("Data shape for", product['keyword'], ":", data.shape)
+            print("Sample data:\n", data.head())
+
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            data.to_csv(file_path, index=False)
+
+            state.set(f"scrape_{product['keyword']}", fingerprint_value(product), rows=len(data))
+            logging.info(f"Successfully collected and saved: {product['keyword']}")
+            return file_path
+
+        except Exception as e:
+            logging.error(f"Failed to collect data for {keyword}: {str(e)}")
+            raise Custom_exception(e, sys)
+
+    def initiate_data_collection(self, force: bool = False):
 
         try:
             logging.info("Starting multi-product data collection for Hunnit.com")
@@ -55,29 +113,10 @@ class DataCollection:
 
             for product in products_config:
                 try:
-                    logging.info(
-                        f"Collecting data for: {product['keyword']} "
-                        f"Target: {product['num_products']}"
-                    )
-
-                    # ✔ Updated function call (your new scraper function)
-                    data = scrape_hunnit_products(
-                        keyword=product['keyword'],
-                        num_products=product['num_products']
-                    )
-
-                    print("Data shape for", product['keyword'], ":", data.shape)
-                    print("Sample data:\n", data.head())
-
-                    file_path = os.path.join(self.data_collection_config.path, product['file_path'])
-                    os.makedirs(os.path.dirname(file_path), exist_ok=True)
-                    data.to_csv(file_path, index=False)
-
+                    self.collect_product(product['keyword'], force=force)
                     successful_products.append(product['keyword'])
-                    logging.info(f"Successfully collected and saved: {product['keyword']}")
 
                 except Exception as e:
-                    logging.error(f"Failed to collect data for {product['keyword']}: {str(e)}")
                     failed_products.append(product['keyword'])
                     continue  
 
@@ -0,0 +1,228 @@
+import os
+import sys
+import glob
+import json
+import time
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, List, Optional
+from dataclasses import dataclass
+
+from src.utils.logger import logging
+from src.utils.exception import Custom_exception
+
+
+@dataclass
+class IndexManagerConfig:
+    is_airflow = os.getenv("IS_AIRFLOW", "false").lower() == "true"
+    if is_airflow:
+        pointer_path = os.getenv("INDEX_POINTER_PATH", "/opt/airflow/artifacts/index_pointer.json")
+    else:
+        pointer_path = os.getenv("INDEX_POINTER_PATH", "artifacts/index_pointer.json")
+
+    # local embeddings (EMBEDDING_BACKEND=local) have their own dimension, so their own pinecone index
+    if os.getenv("EMBEDDING_BACKEND", "nvidia").lower() == "local":
+        index_name = os.getenv("PINECONE_LOCAL_INDEX_NAME", "ecommerce-chatbot-local")
+    else:
+        index_name = os.getenv("PINECONE_INDEX_NAME", "ecommerce-chatbot-project")
+    keep_versions = int(os.getenv("INDEX_KEEP_VERSIONS", "2"))          # live version + rollback targets
+    poll_interval = float(os.getenv("INDEX_POINTER_POLL_SECONDS", "10"))
+    validation_timeout = float(os.getenv("INDEX_VALIDATION_TIMEOUT_SECONDS", "120"))
+    smoke_query = "casual shirt"
+
+
+class IndexManager:
+    """
+    Blue/green builds of the vector index. Every build is written into its own namespace
+    (catalog-<timestamp>), validated, and then published by atomically replacing a small pointer
+    file that the app watches. Older namespaces beyond `keep_versions` are deleted.
+
+    Pointer: {"index_name", "namespace", "version", "documents", "published_at", "history": [...]}
+    Partitioned versions add "partitions": {category: {"namespace", "documents"}} (one namespace per
+    category, <namespace>--<category>) and "router_path", the query -> partition router of the version.
+    With local embeddings the pointer has "embedding_path", the embedding model the version was built with.
+    Without a pointer the app keeps serving the default namespace (indexes built before this).
+    """
+
+    def __init__(self, config: Optional[IndexManagerConfig] = None):
+        self.index_manager_config = config or IndexManagerConfig()
+
+    @staticmethod
+    def new_version() -> str:
+        return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+
+    @staticmethod
+    def namespace_for(version: str) -> str:
+        return f"catalog-{version}"
+
+    def router_path_for(self, version: str) -> str:
+        return os.path.join(os.path.dirname(self.index_manager_config.pointer_path) or ".",
+                            f"partition_router-{version}.json")
+
+    def embeddings_path_for(self, version: str) -> str:
+        return os.path.join(os.path.dirname(self.index_manager_config.pointer_path) or ".",
+                            f"local_embeddings-{version}.npz")
+
+    def read_pointer(self) -> Optional[dict]:
+        try:
+            with open(self.index_manager_config.pointer_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # a half-written pointer is impossible with os.replace, anything else is worth a log line
+            logging.error(f"Could not read index pointer: {str(e)}")
+            return None
+
+    def current_namespace(self) -> Optional[str]:
+        return (self.read_pointer() or {}).get("namespace")
+
+    def validate(self, index: Any, vector_store: Any, namespace: str, expected_vectors: int):
+        """Wait until the namespace holds every upserted vector, then run one smoke query in it"""
+        try:
+            deadline = time.monotonic() + self.index_manager_config.validation_timeout
+            while True:
+                # pinecone counts are eventually consistent, poll until the upserts are visible
+                stats = index.describe_index_stats()
+                namespaces = stats.get("namespaces") or {}
+                count = (namespaces.get(namespace) or {}).get("vector_count", 0)
+                if count >= expected_vectors:
+                    break
+                if time.monotonic() > deadline:
+                    raise ValueError(f"Namespace {namespace} holds {count} of {expected_vectors} vectors")
+                time.sleep(2)
+
+            docs = vector_store.similarity_search(self.index_manager_config.smoke_query, k=1)
+            if not docs:
+                raise ValueError(f"Smoke query returned no documents from namespace {namespace}")
+            logging.info(f"Validated namespace {namespace}: {count} vectors, smoke query ok")
+        except Exception as e:
+            logging.error(f"Validation of namespace {namespace} failed: {str(e)}")
+            raise Custom_exception(e, sys)
+
+    def publish(self, namespace: str, version: str, documents: int,
+                partitions: Optional[dict] = None, router_path: Optional[str] = None,
+                embedding_path: Optional[str] = None) -> dict:
+        """Flip the pointer to a validated namespace (write to a temp file + os.replace)"""
+        try:
+            previous = self.read_pointer() or {}
+            history = [previous["namespace"]] + previous.get("history", []) if previous.get("namespace") else []
+            pointer = {"index_name": self.index_manager_config.index_name,
+                       "namespace": namespace,
+                       "version": version,
+                       "documents": documents,
+                       "published_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                       "history": [ns for ns in history if ns != namespace]}
+            if partitions:
+                pointer["partitions"] = partitions
+                pointer["router_path"] = router_path
+            if embedding_path:
+                pointer["embedding_path"] = embedding_path
+
+            path = self.index_manager_config.pointer_path
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(pointer, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+            logging.info(f"Index pointer now at {namespace}")
+            return pointer
+        except Exception as e:
+            logging.error(f"Error publishing index pointer: {str(e)}")
+            raise Custom_exception(e, sys)
+
+    def garbage_collect(self, index: Any) -> List[str]:
+        """Delete build namespaces that are neither live nor among the kept rollback versions"""
+        try:
+            pointer = self.read_pointer() or {}
+            keep = ([pointer.get("namespace")] + pointer.get("history", []))[:self.index_manager_config.keep_versions]
+            namespaces = (index.describe_index_stats().get("namespaces") or {}).keys()
+            # partition namespaces (catalog-<ts>--<category>) belong to their version's namespace
+            stale = [ns for ns in namespaces if ns.startswith("catalog-") and ns.split("--")[0] not in keep]
+            for namespace in stale:
+                index.delete(delete_all=True, namespace=namespace)
+                logging.info(f"Deleted old index namespace {namespace}")
+
+            # per-version artifacts: partition routers and local embedding models
+            directory = os.path.dirname(self.index_manager_config.pointer_path) or "."
+            for prefix, extension in (("partition_router-", ".json"), ("local_embeddings-", ".npz")):
+                for path in glob.glob(os.path.join(directory, f"{prefix}*{extension}")):
+                    version = os.path.basename(path)[len(prefix):-len(extension)]
+                    if self.namespace_for(version) not in keep:
+                        os.remove(path)
+
+            if stale and pointer:
+                stale_versions = {ns.split("--")[0] for ns in stale}
+                pointer["history"] = [ns for ns in pointer.get("history", []) if ns not in stale_versions]
+                path = self.index_manager_config.pointer_path
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(pointer, f, indent=2)
+                os.replace(tmp_path, path)
+            return stale
+        except Exception as e:
+            logging.error(f"Error collecting old index versions: {str(e)}")
+            raise Custom_exception(e, sys)
+
+
+class HotSwapChain:
+    """
+    Stable handle to the serving chain. A watcher thread polls the index pointer and, when it
+    moves, builds a chain for the new namespace in the background and swaps the reference.
+    Requests already running keep the chain they started with, so nothing is dropped.
+    """
+
+    def __init__(self, factory: Callable[[Optional[dict]], Any], manager: Optional[IndexManager] = None):
+        self.factory = factory
+        self.manager = manager or IndexManager()
+        self.pointer = self.manager.read_pointer()
+        self.chain = factory(self.pointer)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def invoke(self, *args, **kwargs):
+        return self.chain.invoke(*args, **kwargs)
+
+    def __getattr__(self, name):
+        if name == "chain":
+            raise AttributeError(name)
+        return getattr(self.chain, name)
+
+    def refresh(self) -> bool:
+        """Rebuild and swap if the pointer moved; a failed rebuild keeps the current chain"""
+        pointer = self.manager.read_pointer()
+        if pointer is None:
+            return False
+        if (self.pointer and pointer.get("namespace") == self.pointer.get("namespace")
+                and set(pointer.get("partitions") or {}) == set(self.pointer.get("partitions") or {})):
+            self.pointer = pointer      # only the history changed (garbage collection)
+            return False
+        try:
+            chain = self.factory(pointer)
+        except Exception as e:
+            logging.error(f"Hot reload to {pointer.get('namespace')} failed, keeping the current index: {str(e)}")
+            return False
+        self.chain, self.pointer = chain, pointer
+        logging.info(f"Serving index namespace {pointer.get('namespace')} (version {pointer.get('version')})")
+        return True
+
+    def _watch(self):
+        while not self._stop.wait(self.manager.index_manager_config.poll_interval):
+            self.refresh()
+
+    def start(self) -> "HotSwapChain":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._watch, name="index-pointer-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def restart_after_fork(self) -> "HotSwapChain":
+        """Threads are not copied by fork: start this process' own watcher"""
+        self._stop = threading.Event()
+        self._thread = None
+        return self.start()
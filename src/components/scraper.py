@@ -6,7 +6,8 @@ import json
 import uuid
 import shutil
 import pandas as pd
-from typing import List, Dict, Any
+from dataclasses import dataclass
+from typing import List, Dict, Any, Iterator, Optional
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
@@ -15,9 +16,54 @@ from selenium.common.exceptions import NoSuchElementException, TimeoutException
 from src.utils.logger import logging
 from src.utils.exception import Custom_exception
 
-def _init_driver(is_airflow: bool):
+
+@dataclass
+class ScraperConfig:
+    # lean mode: no images / fonts / css / trackers, eager page loads and one injected script per page
+    # (opt-in until full vs lean equivalence has been confirmed against the live site)
+    lean_mode = os.getenv("SCRAPER_LEAN_MODE", "false").lower() == "true"
+    headless = os.getenv("SCRAPER_HEADLESS", "false").lower() == "true"
+    base_url = os.getenv("HUNNIT_BASE_URL", "https://hunnit.com").rstrip("/")
+    chromedriver_path = os.getenv("CHROMEDRIVER_PATH")          # overrides the per environment default
+    chrome_binary = os.getenv("CHROME_BINARY")
+    chrome_arguments = os.getenv("SCRAPER_CHROME_ARGS", "").split()
+    page_load_timeout = 30
+    wait_seconds = float(os.getenv("SCRAPER_WAIT_SECONDS", "5"))   # lean mode polls up to this for late content
+    poll_interval = 0.25
+    # everything product data never needs, blocked with CDP Network.setBlockedURLs
+    blocked_resources = ("*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.avif", "*.svg", "*.ico",
+                         "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot", "*.css", "*.mp4", "*.webm")
+    blocked_hosts = ("*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+                     "*connect.facebook.net*", "*hotjar.com*", "*clarity.ms*", "*klaviyo.com*",
+                     "*shopify.com/shopifycloud/*", "*monorail-edge.shopifysvc.com*", "*tiktok.com*",
+                     "*snapchat.com*", "*criteo.*", "*bing.com*", "*youtube.com*", "*gorgias*")
+    extra_blocked = [p for p in os.getenv("SCRAPER_BLOCKED_URLS", "").split(",") if p.strip()]
+
+
+# one round trip per product page: every payload the parser needs, returned as one object
+PRODUCT_SNAPSHOT_SCRIPT = """
+const text = node => node ? node.textContent : null;
+return {
+    ready_state: document.readyState,
+    product_json: text(document.querySelector('script[type="application/json"][id^="ProductJson-"]')),
+    ld_json: Array.from(document.querySelectorAll('script[type="application/ld+json"]'), text),
+    features: Array.from(document.querySelectorAll('ul.m-key-features li'),
+                         li => li.textContent.replace(/\\s+/g, ' ').trim()).filter(Boolean)
+};
+"""
+
+SEARCH_LINKS_SCRIPT = """
+return {
+    ready_state: document.readyState,
+    links: Array.from(document.querySelectorAll('a[href*="/products/"]'), a => a.href)
+};
+"""
+
+
+def _init_driver(is_airflow: bool, config: Optional[ScraperConfig] = None):
     """Initialize chrome webdriver with options similar to your Amazon scraper."""
     try:
+        config = config or ScraperConfig()
         chrome_options = Options()
         if is_airflow:
             # airflow container paths
@@ -28,7 +74,11 @@ def _init_driver(is_airflow: bool):
             chrome_options.add_argument('--headless=new')
         else:
             unique_user_data_dir = None
-            # keep non-headless by default locally so you can debug; caller may add headless flag if desired
+            # keep non-headless by default locally so you can debug; SCRAPER_HEADLESS=true to hide it
+            if config.headless:
+                chrome_options.add_argument('--headless=new')
+        if config.chrome_binary:
+            chrome_options.binary_location = config.chrome_binary
 
         chrome_options.add_argument("--window-size=1920,1080")
         # recommended flags for headless scraping in some environments
@@ -36,15 +86,35 @@ def _init_driver(is_airflow: bool):
         chrome_options.add_argument("--no-sandbox")
         chrome_options.add_argument("--disable-dev-shm-usage")
 
-        if is_airflow:
+        if config.lean_mode:
+            # don't wait for images / iframes / late scripts, the data is in the server rendered html
+            chrome_options.page_load_strategy = "eager"
+            chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+            chrome_options.add_experimental_option("prefs", {
+                "profile.managed_default_content_settings.images": 2,
+                "profile.default_content_setting_values.notifications": 2,
+            })
+        for argument in config.chrome_arguments:
+            chrome_options.add_argument(argument)
+
+        if config.chromedriver_path:
+            chromedriver_path = config.chromedriver_path
+        elif is_airflow:
             chromedriver_path = "/usr/bin/chromedriver"
         else:
             # change this path to your local chromedriver path
             chromedriver_path = "F:/Data Science/Projects/4.Ecommerce-Chatbot-Project/chromedriver.exe"
 
         driver = webdriver.Chrome(service=Service(chromedriver_path), options=chrome_options)
-        driver.set_page_load_timeout(30)
-        driver.implicitly_wait(10)
+        driver.set_page_load_timeout(config.page_load_timeout)
+        if config.lean_mode:
+            # no implicit waits: the snapshot script never looks elements up through webdriver
+            blocked = list(config.blocked_resources) + list(config.blocked_hosts) + list(config.extra_blocked)
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked})
+            logging.info(f"Lean scraper mode: blocking {len(blocked)} url patterns")
+        else:
+            driver.implicitly_wait(10)
         return driver, unique_user_data_dir
     except Exception as e:
         logging.error(f"Error initializing Chrome driver: {e}")
@@ -61,158 +131,244 @@ def _safe_get(driver, url):
         except Exception as e:
             raise
 
-def _extract_json_from_product_page(driver) -> Dict[str, Any]:
+def _parse_product_payloads(product_json_text: Optional[str], ld_json_texts: List[Optional[str]],
+                            features: List[str]) -> Dict[str, Any]:
     """
-    Extract product data from product detail page.
+    Build the product dictionary from the raw page payloads (shared by the lean and the full browser mode).
     Priority:
       1) script[type="application/json" and id startswith ProductJson-] -> parse JSON
       2) script[type="application/ld+json"] -> parse schema.org (fallback/additional)
     Returns combined dictionary with keys we care about.
     """
     result = {}
+    # 1) ProductJson script (Shopify product JSON)
+    prod_json_text = (product_json_text or "").strip()
+    if prod_json_text:
+        prod = json.loads(prod_json_text)
+        result['title'] = prod.get('title') or prod.get('name')
+        # Shopify prices are often in paise; check magnitude and adjust if needed
+        price_val = prod.get('price') or prod.get('price_min') or prod.get('price_max')
+        if isinstance(price_val, (int, float)):
+            # heuristic: if value looks like paise (e.g., 149900) convert to rupees
+            if price_val > 10000:
+                result['price'] = price_val / 100.0
+            else:
+                result['price'] = price_val
+        else:
+            result['price'] = price_val
+
+        result['compare_at_price'] = prod.get('compare_at_price') or prod.get('compare_at_price_min')
+        result['description'] = prod.get('description')
+        result['vendor'] = prod.get('vendor')
+        result['category'] = prod.get('type')
+        result['tags'] = prod.get('tags', [])
+        result['variants'] = prod.get('variants', [])
+        result['handle'] = prod.get('handle')
+        # images from product JSON
+        images = []
+        if isinstance(prod.get('images'), list) and prod.get('images'):
+            images = [img for img in prod.get('images')]
+        # sometimes featured_media / featured_image exist
+        if not images and prod.get('featured_image'):
+            src = prod['featured_image'].get('src')
+            if src:
+                images = [src]
+        result['image_urls'] = images
+    else:
+        logging.info("No ProductJson script found on this page")
+
+    # 2) schema.org JSON-LD (useful for standardized fields)
+    for ld_text in ld_json_texts:
+        ld_text = (ld_text or "").strip()
+        if not ld_text:
+            continue
+        try:
+            # sometimes there are multiple JSON objects/arrays; wrap safely
+            parsed = json.loads(ld_text)
+        except ValueError:
+            logging.info("Skipping malformed ld+json block")
+            continue
+        # parsed could be a dict or list
+        if isinstance(parsed, dict):
+            parsed_list = [parsed]
+        else:
+            parsed_list = parsed
+        if not parsed_list:
+            continue
+
+        for obj in parsed_list:
+            if isinstance(obj.get('@type'), str) and obj.get('@type').lower() == 'product':
+                # overwrite or fill missing fields
+                result.setdefault('title', obj.get('name'))
+                result.setdefault('description', obj.get('description'))
+                result.setdefault('image_urls', obj.get('image') if isinstance(obj.get('image'), list) else [obj.get('image')] if obj.get('image') else [])
+                # offers may contain price info
+                offers = obj.get('offers')
+                if offers:
+                    # offers can be list or dict
+                    if isinstance(offers, list):
+                        first_offer = offers[0]
+                    else:
+                        first_offer = offers
+                    price = first_offer.get('price')
+                    if price:
+                        # numeric or string
+                        try:
+                            price_f = float(price)
+                            result.setdefault('price', price_f)
+                        except Exception:
+                            result.setdefault('price', price)
+                    result.setdefault('availability', first_offer.get('availability'))
+        # fallback brand
+        if isinstance(parsed_list[0], dict) and parsed_list[0].get('brand'):
+            brand = parsed_list[0]['brand'].get('name') if isinstance(parsed_list[0]['brand'], dict) else parsed_list[0]['brand']
+            result.setdefault('vendor', brand)
+
+    # 3) Fallback selectors for description / features present on the page
+    if features:
+        result.setdefault('features', features)
+
+    # 4) Guarantee/normalize fields
+    result.setdefault('title', result.get('title', 'na'))
+    result.setdefault('description', result.get('description', 'na'))
+    result.setdefault('image_urls', result.get('image_urls', []))
+    result.setdefault('price', result.get('price', 'na'))
+    result.setdefault('category', result.get('category', 'na'))
+    result.setdefault('vendor', result.get('vendor', 'na'))
+    result.setdefault('variants', result.get('variants', []))
+    result.setdefault('tags', result.get('tags', []))
+
+    return result
+
+def _extract_json_from_product_page(driver) -> Dict[str, Any]:
+    """Extract product data from product detail page, one webdriver lookup per element (full browser mode)"""
     try:
-        # 1) ProductJson script (Shopify product JSON)
+        product_json_text = None
         try:
             prod_json_script = driver.find_element(By.XPATH, "//script[starts-with(@id, 'ProductJson-') and @type='application/json']")
-            prod_json_text = prod_json_script.get_attribute("innerHTML").strip()
-            if prod_json_text:
-                prod = json.loads(prod_json_text)
-                result['title'] = prod.get('title') or prod.get('name')
-                # Shopify prices are often in paise; check magnitude and adjust if needed
-                price_val = prod.get('price') or prod.get('price_min') or prod.get('price_max')
-                if isinstance(price_val, (int, float)):
-                    # heuristic: if value looks like paise (e.g., 149900) convert to rupees
-                    if price_val > 10000:
-                        result['price'] = price_val / 100.0
-                    else:
-                        result['price'] = price_val
-                else:
-                    result['price'] = price_val
-
-                result['compare_at_price'] = prod.get('compare_at_price') or prod.get('compare_at_price_min')
-                result['description'] = prod.get('description')
-                result['vendor'] = prod.get('vendor')
-                result['category'] = prod.get('type')
-                result['tags'] = prod.get('tags', [])
-                result['variants'] = prod.get('variants', [])
-                result['handle'] = prod.get('handle')
-                # images from product JSON
-                images = []
-                if isinstance(prod.get('images'), list) and prod.get('images'):
-                    images = [img for img in prod.get('images')]
-                # sometimes featured_media / featured_image exist
-                if not images and prod.get('featured_image'):
-                    src = prod['featured_image'].get('src')
-                    if src:
-                        images = [src]
-                result['image_urls'] = images
+            product_json_text = prod_json_script.get_attribute("innerHTML")
         except NoSuchElementException:
-            logging.info("No ProductJson script found on this page")
+            pass
 
-        # 2) schema.org JSON-LD (useful for standardized fields)
+        ld_json_texts = []
         try:
             ld_script = driver.find_element(By.XPATH, "//script[@type='application/ld+json']")
-            ld_text = ld_script.get_attribute("innerHTML").strip()
-            if ld_text:
-                # sometimes there are multiple JSON objects/arrays; wrap safely
-                parsed = json.loads(ld_text)
-                # parsed could be a dict or list
-                if isinstance(parsed, dict):
-                    parsed_list = [parsed]
-                else:
-                    parsed_list = parsed
-
-                for obj in parsed_list:
-                    if obj.get('@type') and obj.get('@type').lower() == 'product':
-                        # overwrite or fill missing fields
-                        result.setdefault('title', obj.get('name'))
-                        result.setdefault('description', obj.get('description'))
-                        result.setdefault('image_urls', obj.get('image') if isinstance(obj.get('image'), list) else [obj.get('image')] if obj.get('image') else [])
-                        # offers may contain price info
-                        offers = obj.get('offers')
-                        if offers:
-                            # offers can be list or dict
-                            if isinstance(offers, list):
-                                first_offer = offers[0]
-                            else:
-                                first_offer = offers
-                            price = first_offer.get('price')
-                            if price:
-                                # numeric or string
-                                try:
-                                    price_f = float(price)
-                                    result.setdefault('price', price_f)
-                                except Exception:
-                                    result.setdefault('price', price)
-                            result.setdefault('availability', first_offer.get('availability'))
-                # fallback brand
-                if isinstance(parsed_list[0], dict) and parsed_list[0].get('brand'):
-                    brand = parsed_list[0]['brand'].get('name') if isinstance(parsed_list[0]['brand'], dict) else parsed_list[0]['brand']
-                    result.setdefault('vendor', brand)
+            ld_json_texts.append(ld_script.get_attribute("innerHTML"))
         except NoSuchElementException:
             logging.info("No ld+json script found on this page")
 
-        # 3) Fallback selectors for description / features present on the page
+        features = []
         try:
             # common Hunnit feature list class observed in HTML: ul.m-key-features
             features_elems = driver.find_elements(By.CSS_SELECTOR, "ul.m-key-features li")
-            if features_elems:
-                features = [f.text.strip() for f in features_elems if f.text.strip()]
-                if features:
-                    result.setdefault('features', features)
+            features = [f.text.strip() for f in features_elems if f.text.strip()]
         except Exception:
             pass
 
-        # 4) Guarantee/normalize fields
-        result.setdefault('title', result.get('title', 'na'))
-        result.setdefault('description', result.get('description', 'na'))
-        result.setdefault('image_urls', result.get('image_urls', []))
-        result.setdefault('price', result.get('price', 'na'))
-        result.setdefault('category', result.get('category', 'na'))
-        result.setdefault('vendor', result.get('vendor', 'na'))
-        result.setdefault('variants', result.get('variants', []))
-        result.setdefault('tags', result.get('tags', []))
-
-        return result
+        return _parse_product_payloads(product_json_text, ld_json_texts, features)
     except Exception as e:
         logging.error(f"Error extracting JSON from product page: {e}")
         raise
 
-def scrape_hunnit_products(keyword: str, num_products: int = 50) -> pd.DataFrame:
+def _poll_script(driver, script: str, is_ready, config: ScraperConfig) -> Dict[str, Any]:
+    """Run an injected script, re-running it only while the page is still loading and is_ready(snapshot) is false"""
+    deadline = time.monotonic() + config.wait_seconds
+    while True:
+        snapshot = driver.execute_script(script) or {}
+        if is_ready(snapshot) or snapshot.get('ready_state') == 'complete' or time.monotonic() >= deadline:
+            return snapshot
+        time.sleep(config.poll_interval)
+
+def _extract_product_snapshot(driver, config: ScraperConfig) -> Dict[str, Any]:
+    """Extract product data with a single injected script (lean mode), usually one round trip per page"""
+    try:
+        snapshot = _poll_script(driver, PRODUCT_SNAPSHOT_SCRIPT,
+                                lambda snap: bool(snap.get('product_json') or snap.get('ld_json')), config)
+        return _parse_product_payloads(snapshot.get('product_json'), snapshot.get('ld_json') or [],
+                                       snapshot.get('features') or [])
+    except Exception as e:
+        logging.error(f"Error extracting product snapshot: {e}")
+        raise
+
+def _product_row(extracted: Dict[str, Any], product_url: str, variant: Dict[str, Any] = None) -> Dict[str, Any]:
+    """One SKU-level row (or product-level when there are no variants)"""
+    if variant is None:
+        return {
+            "Title": extracted.get('title'),
+            "Price": extracted.get('price'),
+            "CompareAtPrice": extracted.get('compare_at_price'),
+            "SKU": None,
+            "VariantTitle": None,
+            "VariantOptions": None,
+            "Description": extracted.get('description'),
+            "Features": extracted.get('features', []),
+            "ImageURLs": extracted.get('image_urls'),
+            "Category": extracted.get('category'),
+            "Vendor": extracted.get('vendor'),
+            "Tags": extracted.get('tags'),
+            "Availability": extracted.get('availability'),
+            "ProductURL": product_url
+        }
+    return {
+        "Title": extracted.get('title'),
+        "Price": (variant.get('price') or extracted.get('price')),
+        "CompareAtPrice": variant.get('compare_at_price') or extracted.get('compare_at_price'),
+        "SKU": variant.get('sku') or variant.get('id'),
+        "VariantTitle": variant.get('title'),
+        "VariantOptions": variant.get('options'),
+        "Description": extracted.get('description'),
+        "Features": extracted.get('features', []),
+        "ImageURLs": extracted.get('image_urls'),
+        "Category": extracted.get('category'),
+        "Vendor": extracted.get('vendor'),
+        "Tags": extracted.get('tags'),
+        "Availability": variant.get('available') if 'available' in variant else extracted.get('availability'),
+        "ProductURL": product_url
+    }
+
+def iter_hunnit_products(keyword: str, num_products: int = 50,
+                         config: Optional[ScraperConfig] = None) -> Iterator[Dict[str, Any]]:
     """
-    Scrape Hunnit.com for a keyword and return a DataFrame with one row per product/SKU.
+    Scrape Hunnit.com for a keyword and yield one row per product/SKU as soon as its page has
+    been parsed (streaming ingestion consumes these while the browser keeps scraping).
     Each row will include: Title, Price, Description, Features, Image URLs, Category, Vendor, Tags,
     Variants, SKU (if variant-level), Compare price, Availability, Product URL
+    The browser is closed when the generator is exhausted or closed.
     """
+    config = config or ScraperConfig()
     driver = None
     unique_user_data_dir = None
     try:
         is_airflow = os.getenv("IS_AIRFLOW", "false").lower() == 'true'
-        logging.info(f"Running in {'Airflow' if is_airflow else 'local'} environment")
+        logging.info(f"Running in {'Airflow' if is_airflow else 'local'} environment"
+                     f"{' (lean browser mode)' if config.lean_mode else ''}")
 
-        driver, unique_user_data_dir = _init_driver(is_airflow)
+        driver, unique_user_data_dir = _init_driver(is_airflow, config)
 
-        base_search_url = f"https://hunnit.com/search?q={keyword.replace(' ', '+')}"
+        base_search_url = f"{config.base_url}/search?q={keyword.replace(' ', '+')}"
         logging.info(f"Searching Hunnit: {base_search_url}")
 
         _safe_get(driver, base_search_url)
-        time.sleep(2)
 
         # find product links on search results: anchor tags containing '/products/'
         product_links = []
-        anchors = driver.find_elements(By.XPATH, "//a[contains(@href, '/products/')]")
-        for a in anchors:
-            try:
-                href = a.get_attribute("href")
-                # simple dedupe and ensure link is product page
-                if href and '/products/' in href and href not in product_links:
-                    product_links.append(href)
-            except Exception:
-                continue
+        if config.lean_mode:
+            hrefs = _poll_script(driver, SEARCH_LINKS_SCRIPT, lambda snap: bool(snap.get('links')), config).get('links') or []
+        else:
+            time.sleep(2)
+            hrefs = []
+            for a in driver.find_elements(By.XPATH, "//a[contains(@href, '/products/')]"):
+                try:
+                    hrefs.append(a.get_attribute("href"))
+                except Exception:
+                    continue
+        for href in hrefs:
+            # simple dedupe and ensure link is product page
+            if href and '/products/' in href and href not in product_links:
+                product_links.append(href)
 
         logging.info(f"Found {len(product_links)} product links on search results")
 
-        data_rows = []
         visited = 0
 
         for product_url in product_links:
@@ -221,66 +377,27 @@ def scrape_hunnit_products(keyword: str, num_products: int = 50) -> pd.DataFrame
             try:
                 logging.info(f"Visiting product: {product_url}")
                 _safe_get(driver, product_url)
-                time.sleep(1.5)  # allow page JS to populate
-
-                extracted = _extract_json_from_product_page(driver)
-
-                # If variants exist, create one row per variant (SKU-level) — as user requested SKU-level
-                variants = extracted.get('variants') or []
-                if variants:
-                    for var in variants:
-                        if visited >= num_products:
-                            break
-                        row = {
-                            "Title": extracted.get('title'),
-                            "Price": (var.get('price') or extracted.get('price')),
-                            "CompareAtPrice": var.get('compare_at_price') or extracted.get('compare_at_price'),
-                            "SKU": var.get('sku') or var.get('id'),
-                            "VariantTitle": var.get('title'),
-                            "VariantOptions": var.get('options'),
-                            "Description": extracted.get('description'),
-                            "Features": extracted.get('features', []),
-                            "ImageURLs": extracted.get('image_urls'),
-                            "Category": extracted.get('category'),
-                            "Vendor": extracted.get('vendor'),
-                            "Tags": extracted.get('tags'),
-                            "Availability": var.get('available') if 'available' in var else extracted.get('availability'),
-                            "ProductURL": product_url
-                        }
-                        data_rows.append(row)
-                        visited += 1
+                if config.lean_mode:
+                    extracted = _extract_product_snapshot(driver, config)
                 else:
-                    # no variants: one row per product
-                    if visited < num_products:
-                        row = {
-                            "Title": extracted.get('title'),
-                            "Price": extracted.get('price'),
-                            "CompareAtPrice": extracted.get('compare_at_price'),
-                            "SKU": None,
-                            "VariantTitle": None,
-                            "VariantOptions": None,
-                            "Description": extracted.get('description'),
-                            "Features": extracted.get('features', []),
-                            "ImageURLs": extracted.get('image_urls'),
-                            "Category": extracted.get('category'),
-                            "Vendor": extracted.get('vendor'),
-                            "Tags": extracted.get('tags'),
-                            "Availability": extracted.get('availability'),
-                            "ProductURL": product_url
-                        }
-                        data_rows.append(row)
-                        visited += 1
-
+                    time.sleep(1.5)  # allow page JS to populate
+                    extracted = _extract_json_from_product_page(driver)
             except Exception as e:
                 logging.error(f"Error scraping product {product_url}: {e}")
                 continue
 
-        df = pd.DataFrame(data_rows)
-        logging.info(f"Scraped total {len(df)} rows")
-        return df
+            # If variants exist, create one row per variant (SKU-level) — as user requested SKU-level
+            variants = extracted.get('variants') or [None]
+            for var in variants:
+                if visited >= num_products:
+                    break
+                visited += 1
+                yield _product_row(extracted, product_url, var)
+
+        logging.info(f"Scraped total {visited} rows")
 
     except Exception as e:
-        logging.error(f"Error in scrape_hunnit_products: {e}")
+        logging.error(f"Error in iter_hunnit_products: {e}")
         raise Custom_exception(e, sys)
 
     finally:
@@ -297,3 +414,13 @@ def scrape_hunnit_products(keyword: str, num_products: int = 50) -> pd.DataFrame
                 logging.info("Temporary directory cleaned up")
             except Exception as cleanup_error:
                 logging.info(f"Error cleaning temp directory: {cleanup_error}")
+
+def scrape_hunnit_products(keyword: str, num_products: int = 50, config: Optional[ScraperConfig] = None) -> pd.DataFrame:
+    """
+    Scrape Hunnit.com for a keyword and return a DataFrame with one row per product/SKU.
+    Each row will include: Title, Price, Description, Features, Image URLs, Category, Vendor, Tags,
+    Variants, SKU (if variant-level), Compare price, Availability, Product URL
+    """
+    df = pd.DataFrame(list(iter_hunnit_products(keyword, num_products, config)))
+    logging.info(f"Scraped total {len(df)} rows")
+    return df
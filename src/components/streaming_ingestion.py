@@ -0,0 +1,410 @@
+import os
+import sys
+import csv
+import glob
+import time
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from dataclasses import dataclass, field
+
+from src.components.data_cleaning import DataCleaner
+from src.components.index_manager import IndexManager
+from src.components.vectorstore_builder import VectorStoreBuilder
+from src.utils.local_embeddings import LocalEmbeddings
+from src.utils.fake_services import FakeIndex, use_fake_services
+from src.utils.partitioning import PartitioningConfig, PartitionRouter, document_partition, partition_namespace
+from src.utils.profiling import in_stage
+from src.utils.logger import logging
+from src.utils.exception import Custom_exception
+
+
+@dataclass
+class StreamingIngestionConfig:
+    is_airflow = os.getenv("IS_AIRFLOW", "false").lower() == "true"
+    if is_airflow:
+        raw_path = "/opt/airflow/data"
+        cleaned_path = "/opt/airflow/artifacts/data_cleaned_stream.csv"
+    else:
+        raw_path = "data"
+        cleaned_path = "artifacts/data_cleaned_stream.csv"
+
+    batch_size = int(os.getenv("STREAM_BATCH_SIZE", "64"))               # documents per embed / upsert call
+    max_batch_wait = float(os.getenv("STREAM_MAX_BATCH_WAIT_SECONDS", "2"))  # flush a partial batch after this
+    queue_size = int(os.getenv("STREAM_QUEUE_SIZE", "8"))                # batches buffered between stages
+    mode_warmup_rows = int(os.getenv("STREAM_MODE_WARMUP_ROWS", "200"))  # used when no modes were saved
+    write_raw = os.getenv("STREAM_WRITE_RAW", "true").lower() == "true"          # side output: data/<file>.csv
+    write_cleaned = os.getenv("STREAM_WRITE_CLEANED", "false").lower() == "true"  # side output: cleaned csv
+    seed_raw = os.getenv("STREAM_SEED_RAW", "true").lower() == "true"    # target="new": carry over data/*.csv
+
+
+@dataclass
+class StreamingStats:
+    rows: int = 0
+    upserted: int = 0
+    failed_batches: int = 0
+    started: float = field(default_factory=time.perf_counter)
+    first_upsert_s: Optional[float] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"rows": self.rows, "upserted": self.upserted, "failed_batches": self.failed_batches,
+                "first_upsert_s": self.first_upsert_s,
+                "total_s": round(time.perf_counter() - self.started, 3)}
+
+
+_DONE = object()
+
+
+class _CsvSideOutput:
+    """
+    Appends rows to a csv as they stream by (header from the first row). Written to a temp file
+    and moved into place on commit, so a failed stream never replaces the last good file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tmp_path = f"{path}.{os.getpid()}.tmp"
+        self._file = None
+        self._writer = None
+
+    def write(self, row: Dict[str, Any]):
+        if self._writer is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.tmp_path, "w", encoding="utf-8", newline="")
+            self._writer = csv.DictWriter(self._file, fieldnames=list(row), extrasaction="ignore")
+            self._writer.writeheader()
+        self._writer.writerow(row)
+
+    def close(self, commit: bool = True):
+        if self._file is None:
+            return
+        self._file.close()
+        if commit:
+            os.replace(self.tmp_path, self.path)
+        else:
+            os.remove(self.tmp_path)
+
+
+class StreamingIngestion:
+    """
+    Scraped rows -> cleaning (precomputed modes) -> document rendering -> embedding -> upsert,
+    as threads connected by bounded queues: every stage works on the next batch while the
+    following stage handles the previous one, and a slow stage throttles the ones before it.
+
+    sources maps the raw csv name of a source (e.g. "hunnit_shirts.csv", used as the document
+    source like the batch pipeline) to an iterable of row dicts, e.g. iter_hunnit_products(...).
+
+    target="new" (default) streams into a fresh namespace and publishes it when the stream is complete.
+    The raw csvs of sources that are not streamed (e.g. data_sarees.csv next to the hunnit scrapes) are
+    streamed into it too, so a new version holds the whole catalog and not only this run's keywords.
+    target="live" (opt-in) upserts into the namespace the app is serving (stable ids overwrite updated
+    products), so new rows are searchable within seconds of being scraped, half-finished streams included.
+
+    Partitioned indexes (INDEX_PARTITIONING) get every row upserted into its category's namespace;
+    categories the live version does not have yet are added to its pointer and router at the end.
+    """
+
+    def __init__(self, config: Optional[StreamingIngestionConfig] = None,
+                 embeddings: Any = None, index: Any = None):
+        self.streaming_config = config or StreamingIngestionConfig()
+        self.builder = VectorStoreBuilder()
+        self.cleaner = DataCleaner()
+        self.manager = IndexManager()
+        self.embeddings = embeddings
+        self.index = index
+        self.router = PartitionRouter()
+
+    def _connect(self):
+        if self.embeddings is None:
+            self.embeddings = self.builder.create_embeddings()
+        if self.index is None:
+            if use_fake_services():
+                self.index = FakeIndex()
+            else:
+                from pinecone import Pinecone
+                self.index = Pinecone(api_key=self.builder.pinecone_api_key).Index(
+                    self.manager.index_manager_config.index_name)
+
+    @staticmethod
+    def render(record: Dict[str, Any]) -> str:
+        """Row as CSVLoader renders a csv row ("column: value" lines), so ids match batch builds"""
+        lines = []
+        for key, value in record.items():
+            value = "" if value is None or (isinstance(value, float) and value != value) else value
+            lines.append(f"{str(key).strip()}: {str(value).strip()}")
+        return "\n".join(lines)
+
+    def raw_sources(self, streamed: Iterable[str]) -> Dict[str, Iterable[Dict[str, Any]]]:
+        """Row iterators over the raw csvs (data/*.csv) that are not among the streamed sources"""
+        streamed = set(streamed)
+        paths = sorted(glob.glob(os.path.join(self.streaming_config.raw_path, "*.csv")))
+        return {os.path.basename(path): _read_csv(path) for path in paths if os.path.basename(path) not in streamed}
+
+    def _produce(self, name: str, rows: Iterable[Dict[str, Any]], out: queue.Queue, errors: List[str],
+                 write_raw: bool = True):
+        side_output = None
+        if write_raw and self.streaming_config.write_raw:
+            side_output = _CsvSideOutput(os.path.join(self.streaming_config.raw_path, name))
+        failed = False
+        try:
+            for row in rows:
+                out.put((name, row))
+                if side_output is not None:
+                    side_output.write(row)
+        except Exception as e:
+            logging.error(f"Source {name} failed: {str(e)}")
+            errors.append(name)
+            failed = True
+        finally:
+            if side_output is not None:
+                side_output.close(commit=not failed)
+            out.put(_DONE)
+
+    def _clean_and_batch(self, rows: queue.Queue, batches: queue.Queue, sources: int, stats: StreamingStats,
+                         partitioned: bool = False):
+        modes = self.cleaner.load_modes()
+        warmup = [] if not modes else None
+        side_output = _CsvSideOutput(self.streaming_config.cleaned_path) if self.streaming_config.write_cleaned else None
+        batch, batch_started, done, row_numbers = [], None, 0, {}
+
+        def emit(items):
+            if items:
+                batches.put(items)
+
+        def process(name, row):
+            cleaned = self.cleaner.clean_record(row, modes, source=name)
+            if side_output is not None:
+                side_output.write(cleaned)
+            row_numbers[name] = row_numbers.get(name, -1) + 1
+            text = self.render(cleaned)
+            metadata = {"source": os.path.join(self.streaming_config.raw_path, name),
+                        "row": row_numbers[name], "text": text}
+            if partitioned:
+                metadata["partition"] = document_partition(text, name)
+                self.router.add(metadata["partition"], text)
+            return self.builder.document_id(text), text, metadata
+
+        try:
+            while done < sources:
+                timeout = None
+                if batch_started is not None:
+                    timeout = max(self.streaming_config.max_batch_wait - (time.perf_counter() - batch_started), 0)
+                try:
+                    item = rows.get(timeout=timeout)
+                except queue.Empty:
+                    emit(batch)
+                    batch, batch_started = [], None
+                    continue
+
+                if item is _DONE:
+                    done += 1
+                    continue
+                stats.rows += 1
+
+                if warmup is not None:
+                    # no saved modes: learn them from the first rows, then stream
+                    warmup.append(item)
+                    if len(warmup) < self.streaming_config.mode_warmup_rows:
+                        continue
+                    modes = self.cleaner.find_record_modes(row for _, row in warmup)
+                    pending, warmup = warmup, None
+                else:
+                    pending = [item]
+
+                for name, row in pending:
+                    batch.append(process(name, row))
+                    if batch_started is None:
+                        batch_started = time.perf_counter()
+                    if len(batch) >= self.streaming_config.batch_size:
+                        emit(batch)
+                        batch, batch_started = [], None
+
+            if warmup:
+                modes = self.cleaner.find_record_modes(row for _, row in warmup)
+                batch.extend(process(name, row) for name, row in warmup)
+            emit(batch)
+        except Exception as e:
+            logging.error(f"Cleaning stage failed: {str(e)}")
+            stats.failed_batches += 1
+            # keep draining so the sources are not blocked on a full queue forever
+            while done < sources:
+                if rows.get() is _DONE:
+                    done += 1
+        finally:
+            if side_output is not None:
+                side_output.close()
+            batches.put(_DONE)
+
+    def _embed(self, batches: queue.Queue, embedded: queue.Queue, stats: StreamingStats):
+        try:
+            while True:
+                batch = batches.get()
+                if batch is _DONE:
+                    return
+                try:
+                    vectors = self.embeddings.embed_documents([text for _, text, _ in batch])
+                    embedded.put([(doc_id, vector, metadata)
+                                  for (doc_id, _, metadata), vector in zip(batch, vectors)])
+                except Exception as e:
+                    # drop the batch, not the stream; the next full build picks the rows up again
+                    logging.error(f"Embedding a batch of {len(batch)} documents failed: {str(e)}")
+                    stats.failed_batches += 1
+        finally:
+            embedded.put(_DONE)
+
+    def _upsert(self, embedded: queue.Queue, namespace_for: Callable[[dict], Optional[str]],
+                stats: StreamingStats, ids: Dict[Optional[str], set]):
+        while True:
+            vectors = embedded.get()
+            if vectors is _DONE:
+                return
+            try:
+                by_namespace = {}
+                for vector in vectors:
+                    by_namespace.setdefault(namespace_for(vector[2]), []).append(vector)
+                for namespace, namespace_vectors in by_namespace.items():
+                    self.index.upsert(vectors=namespace_vectors, namespace=namespace)
+                    ids.setdefault(namespace, set()).update(doc_id for doc_id, _, _ in namespace_vectors)
+                stats.upserted += len(vectors)
+                if stats.first_upsert_s is None:
+                    stats.first_upsert_s = round(time.perf_counter() - stats.started, 3)
+                    logging.info(f"First streamed documents searchable after {stats.first_upsert_s} s")
+            except Exception as e:
+                logging.error(f"Upserting a batch of {len(vectors)} vectors failed: {str(e)}")
+                stats.failed_batches += 1
+
+    def run(self, sources: Dict[str, Iterable[Dict[str, Any]]], target: str = "new") -> Dict[str, Any]:
+        try:
+            if target not in ("live", "new"):
+                raise ValueError(f"Unknown target: {target}")
+            self._connect()
+
+            pointer = self.manager.read_pointer() or {}
+            if target == "new":
+                version = self.manager.new_version()
+                namespace = self.manager.namespace_for(version)
+                partitioned = PartitioningConfig().enabled
+            else:
+                version, namespace = pointer.get("version"), pointer.get("namespace")
+                partitioned = bool(pointer.get("partitions"))
+            self.router = PartitionRouter()
+
+            seeded = {}
+            if target == "new" and self.streaming_config.seed_raw:
+                # a version without them would drop every product this run did not scrape
+                seeded = self.raw_sources(sources)
+                sources = dict(sources, **seeded)
+                logging.info(f"Seeding the new version with the raw csvs {sorted(seeded)}")
+
+            def namespace_for(metadata: dict) -> Optional[str]:
+                return partition_namespace(namespace, metadata["partition"]) if partitioned else namespace
+            logging.info(f"Streaming {len(sources)} sources into namespace '{namespace or ''}'"
+                         f"{' (partitioned)' if partitioned else ''}")
+
+            size = self.streaming_config.queue_size
+            rows = queue.Queue(maxsize=size * self.streaming_config.batch_size)
+            batches, embedded = queue.Queue(maxsize=size), queue.Queue(maxsize=size)
+            stats, ids, errors = StreamingStats(), {}, []
+
+            # one thread per stage, each tagged with it for the sampling profiler (--profile)
+            threads = [threading.Thread(target=in_stage("scrape", self._produce),
+                                        args=(name, source, rows, errors, name not in seeded),
+                                        name=f"stream-source-{name}", daemon=True)
+                       for name, source in sources.items()]
+            threads += [
+                threading.Thread(target=in_stage("clean", self._clean_and_batch),
+                                 args=(rows, batches, len(sources), stats, partitioned),
+                                 name="stream-clean", daemon=True),
+                threading.Thread(target=in_stage("embed", self._embed), args=(batches, embedded, stats),
+                                 name="stream-embed", daemon=True),
+                threading.Thread(target=in_stage("upsert", self._upsert), args=(embedded, namespace_for, stats, ids),
+                                 name="stream-upsert", daemon=True),
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            if errors and len(errors) == len(sources):
+                raise Exception("All streaming sources failed")
+
+            if target == "new" and not partitioned:
+                vector_store = self._vector_store(namespace)
+                documents = len(ids.get(namespace, ()))
+                self.manager.validate(self.index, vector_store, namespace, expected_vectors=documents)
+                self.manager.publish(namespace, version, documents=documents,
+                                     embedding_path=self._embedding_path(version))
+                self.manager.garbage_collect(self.index)
+            elif target == "new":
+                partitions = {}
+                for partition in self.router.partitions:
+                    partition_ns = partition_namespace(namespace, partition)
+                    documents = len(ids.get(partition_ns, ()))
+                    if not documents:
+                        continue        # every batch of it failed
+                    self.manager.validate(self.index, self._vector_store(partition_ns), partition_ns,
+                                          expected_vectors=documents)
+                    partitions[partition] = {"namespace": partition_ns, "documents": documents}
+                router_path = self.manager.router_path_for(version)
+                self.router.save(router_path)
+                self.manager.publish(namespace, version, documents=sum(p["documents"] for p in partitions.values()),
+                                     partitions=partitions, router_path=router_path,
+                                     embedding_path=self._embedding_path(version))
+                self.manager.garbage_collect(self.index)
+            elif partitioned:
+                self._add_live_partitions(pointer, ids)
+
+            result = dict(stats.as_dict(), namespace=namespace, failed_sources=errors)
+            logging.info(f"Streaming ingestion completed: {result}")
+            return result
+        except Exception as e:
+            logging.error(f"Error in streaming ingestion: {str(e)}")
+            raise Custom_exception(e, sys)
+
+    def _embedding_path(self, version: str) -> Optional[str]:
+        """A new version streamed with the live local model keeps its own copy (old versions get collected)"""
+        if not isinstance(self.embeddings, LocalEmbeddings):
+            return None
+        path = self.manager.embeddings_path_for(version)
+        if not os.path.exists(path):
+            self.embeddings.save(path)
+        return path
+
+    def _add_live_partitions(self, pointer: dict, ids: Dict[Optional[str], set]):
+        """Publish categories that first appeared in a live stream, so the router can send queries there"""
+        new = [p for p in self.router.partitions
+               if p not in pointer["partitions"] and ids.get(partition_namespace(pointer["namespace"], p))]
+        if not new:
+            return
+        router = PartitionRouter.load(pointer["router_path"])
+        for partition in new:
+            router.documents[partition] = self.router.documents[partition]
+            router.totals[partition] = self.router.totals[partition]
+            router.counts[partition] = self.router.counts[partition]
+        router.save(pointer["router_path"])
+        partitions = dict(pointer["partitions"])
+        for partition in new:
+            partition_ns = partition_namespace(pointer["namespace"], partition)
+            partitions[partition] = {"namespace": partition_ns, "documents": len(ids[partition_ns])}
+        self.manager.publish(pointer["namespace"], pointer["version"],
+                             documents=sum(p["documents"] for p in partitions.values()),
+                             partitions=partitions, router_path=pointer["router_path"],
+                             embedding_path=pointer.get("embedding_path"))
+        logging.info(f"Added new partitions to the live index version: {new}")
+
+    def _vector_store(self, namespace: Optional[str]):
+        from langchain_pinecone import PineconeVectorStore
+        return PineconeVectorStore(index=self.index, embedding=self.embeddings, namespace=namespace)
+
+
+def _read_csv(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, encoding="utf-8", newline="") as f:
+        yield from csv.DictReader(f)
+
+
+def scraper_sources(products: List[Dict[str, Any]]) -> Dict[str, Iterable[Dict[str, Any]]]:
+    """One lazily started scraper per configured keyword (src/components/data_collection.py)"""
+    from src.components.scraper import iter_hunnit_products
+    return {product['file_path']: iter_hunnit_products(keyword=product['keyword'],
+                                                        num_products=product['num_products'])
+            for product in products}
@@ -1,7 +1,8 @@
 import os
 import sys
 import time
-from typing import List
+import hashlib
+from typing import Dict, List, Optional
 from dataclasses import dataclass
 
 from langchain_community.document_loaders.csv_loader import CSVLoader
@@ -9,9 +10,16 @@ from langchain_nvidia_ai_endpoints import NVIDIAEmbeddings
 from pinecone import Pinecone
 from langchain_pinecone import PineconeVectorStore
 from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
 
 from src.utils.logger import logging
 from src.utils.exception import Custom_exception
+from src.components.index_manager import IndexManager
+from src.utils.partitioning import PartitioningConfig, PartitionRouter, document_partition, partition_namespace
+from src.utils.fake_services import FakeEmbeddings, FakeIndex, build_fake_vector_store, use_fake_services
+from src.utils.local_embeddings import LocalEmbeddings, local_embeddings_enabled
+from src.utils.metrics import InstrumentedEmbeddings
+from src.utils.profiling import stage
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -36,7 +44,8 @@ class VectorStoreBuilder:
         self.nvidia_api_key = os.getenv("NVIDIA_API_KEY")
         self.pinecone_api_key = os.getenv("PINECONE_API_KEY")
 
-        if not self.nvidia_api_key or not self.pinecone_api_key:
+        if (not self.pinecone_api_key or (not self.nvidia_api_key and not local_embeddings_enabled())) \
+                and not use_fake_services():
             raise ValueError("Required API keys not set")
 
     def load_data(self, data_path: str) -> List[Document]:
@@ -47,16 +56,56 @@ class VectorStoreBuilder:
                 encoding="utf-8",
                 csv_args={"delimiter": ",", "quotechar": '"'}
             )
-            docs = loader.load()
-            logging.info(f"Sample data: {docs[:5]}")
+            with stage("load"):
+                docs = loader.load()
+            # one short sample, not whole documents: the catalog rows are long
+            if docs:
+                logging.info(f"Sample document: {docs[0].page_content[:200]}")
             logging.info(f"Successfully loaded {len(docs)} documents.")
             return docs
         except Exception as e:
             logging.error(f"Error in loading data: {str(e)}")
             raise Custom_exception(e, sys)
 
-    def create_embeddings(self) -> NVIDIAEmbeddings:
+    @staticmethod
+    def document_id(page_content: str) -> str:
+        """
+        Stable vector id of a catalog row: its product url + SKU when the row has them (so an
+        updated product overwrites its vector), the whole rendered row otherwise
+        """
+        fields = dict(line.split(": ", 1) for line in page_content.splitlines() if ": " in line)
+        key = f"{fields['ProductURL']}|{fields.get('SKU', '')}" if fields.get("ProductURL") else page_content
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def partition_documents(documents: List[Document]) -> Dict[str, List[Document]]:
+        """Group documents by their category (partition key column, else the source csv name)"""
+        partitions = {}
+        for doc in documents:
+            partition = document_partition(doc.page_content, doc.metadata.get("source"))
+            doc.metadata["partition"] = partition
+            partitions.setdefault(partition, []).append(doc)
+        return partitions
+
+    def create_embeddings(self, documents: Optional[List[Document]] = None) -> Embeddings:
+        """
+        NVIDIA endpoint, or with EMBEDDING_BACKEND=local the in-process model: fitted on `documents`
+        (a new index version, run_pipeline saves it with the version) or the live version's model
+        """
         try:
+            if local_embeddings_enabled():
+                if documents is not None:
+                    logging.info(f"Fitting local embeddings on {len(documents)} documents")
+                    return LocalEmbeddings.fit(doc.page_content for doc in documents)
+                embedding_path = (IndexManager().read_pointer() or {}).get("embedding_path")
+                if not embedding_path:
+                    raise ValueError("No local embedding model published yet, run the vectorstore pipeline first")
+                return LocalEmbeddings.load(embedding_path)
+
+            if use_fake_services():
+                logging.info("Using fake in-process embeddings")
+                return FakeEmbeddings()
+
             logging.info("Initializing NVIDIA Embeddings.")
             embeddings = NVIDIAEmbeddings(
                 model="nvidia/nv-embedqa-mistral-7b-v2",
@@ -70,9 +119,23 @@ class VectorStoreBuilder:
             raise Custom_exception(e, sys)
 
     def create_vector_store(self, documents: List[Document],
-                            embeddings: NVIDIAEmbeddings,
-                            index_name: str = 'ecommerce-chatbot-project') -> PineconeVectorStore:
+                            embeddings: Embeddings,
+                            index_name: str = 'ecommerce-chatbot-project',
+                            namespace: str = None) -> PineconeVectorStore:
         try:
+            # deterministic ids: a retried build (or a streamed update) overwrites vectors instead of duplicating them
+            unique = {self.document_id(doc.page_content): doc for doc in documents}
+            ids, documents = list(unique), list(unique.values())
+            # embedding calls inside add_documents show up as the embed stage, the rest as upsert
+            embeddings = InstrumentedEmbeddings(embeddings)
+
+            if use_fake_services():
+                logging.info("Uploading documents to a fake in-memory index")
+                vector_store = PineconeVectorStore(index=FakeIndex(), embedding=embeddings, namespace=namespace)
+                with stage("upsert"):
+                    vector_store.add_documents(documents, ids=ids)
+                return vector_store
+
             logging.info(f"Connecting to existing Pinecone index: {index_name}")
             pc = Pinecone(api_key=self.pinecone_api_key)
 
@@ -83,16 +146,14 @@ class VectorStoreBuilder:
             initial_stats = index.describe_index_stats()
             logging.info(f"Index stats before uploading: {initial_stats}")
 
-            # Upload documents
-            vector_store = PineconeVectorStore.from_documents(
-                documents=documents,
-                index_name=index_name,
-                embedding=embeddings
-            )
+            # Upload documents into the build namespace, the live one is untouched until the pointer flips
+            vector_store = PineconeVectorStore(index=index, embedding=embeddings, namespace=namespace)
+            with stage("upsert"):
+                vector_store.add_documents(documents, ids=ids)
 
             final_stats = index.describe_index_stats()
             logging.info(f"Index stats after uploading: {final_stats}")
-            logging.info(f"Successfully uploaded {len(documents)} documents to vector store")
+            logging.info(f"Successfully uploaded {len(documents)} documents to namespace {namespace}")
 
             return vector_store
 
@@ -100,12 +161,99 @@ class VectorStoreBuilder:
             logging.error(f"Error creating vector store: {str(e)}")
             raise Custom_exception(e, sys)
 
+    def check_index_health(self, index_name: str = None,
+                           query: str = "casual shirt", min_vectors: int = 1) -> dict:
+        """
+        Cheap post-build check of the live namespace (index pointer): it holds vectors and one
+        similarity search (a single embedding call, no LLM) returns a document. Raises when either fails.
+        """
+        try:
+            manager = IndexManager()
+            pointer = manager.read_pointer() or {}
+            index_name = index_name or pointer.get("index_name") or manager.index_manager_config.index_name
+            namespace = pointer.get("namespace")
+            partitions = pointer.get("partitions") or {}
+            if partitions:
+                # partitioned version: count every partition, smoke query the largest one
+                namespace = max(partitions.values(), key=lambda p: p["documents"])["namespace"]
+            embeddings = self.create_embeddings()
+            if use_fake_services():
+                vector_store = build_fake_vector_store(embeddings, [self.vectorstore_builder_config.path],
+                                                       namespace=namespace,
+                                                       document_embeddings=embeddings
+                                                       if isinstance(embeddings, LocalEmbeddings) else None)
+                index = vector_store._index
+            else:
+                index = Pinecone(api_key=self.pinecone_api_key).Index(index_name)
+                vector_store = PineconeVectorStore(index=index, embedding=embeddings, namespace=namespace)
+
+            stats = index.describe_index_stats()
+            counts = stats.get("namespaces") or {}
+            namespaces = [p["namespace"] for p in partitions.values()] if partitions else [namespace or ""]
+            total_vectors = sum((counts.get(ns) or {}).get("vector_count", 0) for ns in namespaces)
+            logging.info(f"Namespace '{namespace or ''}' of {index_name} holds {total_vectors} vectors")
+            if total_vectors < min_vectors:
+                raise ValueError(f"Index {index_name} has {total_vectors} vectors, expected at least {min_vectors}")
+
+            start = time.perf_counter()
+            docs = vector_store.similarity_search(query, k=1)
+            latency_ms = (time.perf_counter() - start) * 1000
+            if not docs:
+                raise ValueError(f"Smoke query '{query}' returned no documents")
+            logging.info(f"Smoke query '{query}' returned a document in {latency_ms:.0f} ms")
+
+            return {"namespace": namespace, "total_vectors": total_vectors, "smoke_query_ms": round(latency_ms, 1)}
+        except Exception as e:
+            logging.error(f"Index health check failed: {str(e)}")
+            raise Custom_exception(e, sys)
+
     def run_pipeline(self) -> PineconeVectorStore:
+        """
+        Blue/green build: new namespace -> validate -> flip the index pointer -> drop old versions.
+        With INDEX_PARTITIONING every category goes into its own namespace (catalog-<ts>--<category>)
+        and a query -> partition router is fitted and published with the version.
+        """
         try:
             logging.info("Starting vectorstore pipeline")
+            manager = IndexManager()
+            version = manager.new_version()
+            namespace = manager.namespace_for(version)
+
             docs = self.load_data(self.vectorstore_builder_config.path)
-            embeddings = self.create_embeddings()
-            vector_store = self.create_vector_store(docs, embeddings)
+            with stage("embed"):        # fitting the local model
+                embeddings = self.create_embeddings(docs)
+            index_name = manager.index_manager_config.index_name
+            embedding_path = None
+            if isinstance(embeddings, LocalEmbeddings):
+                # documents and queries of this version must use the same fitted model
+                embedding_path = manager.embeddings_path_for(version)
+                embeddings.save(embedding_path)
+
+            if not PartitioningConfig().enabled:
+                vector_store = self.create_vector_store(docs, embeddings, index_name=index_name, namespace=namespace)
+                expected = len({self.document_id(doc.page_content) for doc in docs})
+                manager.validate(vector_store._index, vector_store, namespace, expected_vectors=expected)
+                manager.publish(namespace, version, documents=expected, embedding_path=embedding_path)
+                manager.garbage_collect(vector_store._index)
+                logging.info("Vectorstore pipeline completed successfully")
+                return vector_store
+
+            router, partitions = PartitionRouter(), {}
+            for partition, partition_docs in sorted(self.partition_documents(docs).items()):
+                partition_ns = partition_namespace(namespace, partition)
+                vector_store = self.create_vector_store(partition_docs, embeddings, index_name=index_name,
+                                                        namespace=partition_ns)
+                expected = len({self.document_id(doc.page_content) for doc in partition_docs})
+                manager.validate(vector_store._index, vector_store, partition_ns, expected_vectors=expected)
+                partitions[partition] = {"namespace": partition_ns, "documents": expected}
+                router.fit((partition, doc.page_content) for doc in partition_docs)
+            logging.info(f"Indexed {len(partitions)} partitions: {sorted(partitions)}")
+
+            router_path = manager.router_path_for(version)
+            router.save(router_path)
+            manager.publish(namespace, version, documents=sum(p["documents"] for p in partitions.values()),
+                            partitions=partitions, router_path=router_path, embedding_path=embedding_path)
+            manager.garbage_collect(vector_store._index)
             logging.info("Vectorstore pipeline completed successfully")
             return vector_store
         except Exception as e:
@@ -1,11 +1,15 @@
 import sys 
+import argparse
 
 from src.components.data_collection import DataCollection
 from src.components.data_cleaning import DataCleaner
 from src.components.vectorstore_builder import VectorStoreBuilder
 from src.components.chatbot_builder import ChatbotBuilder
+from src.components.data_collection import products_config
+from src.components.streaming_ingestion import StreamingIngestion, scraper_sources
 
 from src.utils.logger import logging
+from src.utils.profiling import profile_run
 from src.utils.exception import Custom_exception
 from dotenv import load_dotenv
 
@@ -36,6 +40,30 @@ def main():
     
 
 
+def main_streaming(target: str = "new"):
+    """Scrape -> clean -> embed -> upsert as one overlapping stream (no csv round trips)"""
+    try:
+        result = StreamingIngestion().run(scraper_sources(products_config), target=target)
+        print("Streaming ingestion: ", result)
+    except Exception as e:
+        raise Custom_exception(e, sys)
+
+
+
 if __name__=="__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Run the ingestion pipeline")
+    parser.add_argument("--stream", action="store_true",
+                        help="streaming ingestion from the scraper straight into the vector store")
+    parser.add_argument("--target", choices=["new", "live"], default="new",
+                        help="stream into a new version published at the end, or (opt-in) straight into "
+                             "the served namespace")
+    parser.add_argument("--profile", action="store_true",
+                        help="sampling profile of the run, tagged by stage, written to artifacts/profiles/")
+    args = parser.parse_args()
+
+    with profile_run("main-stream" if args.stream else "main", enabled=args.profile):
+        if args.stream:
+            main_streaming(args.target)
+        else:
+            main()
     
@@ -0,0 +1,254 @@
+import os
+import math
+import time
+import ipaddress
+import threading
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+from dataclasses import dataclass
+
+from src.utils.logger import logging
+from src.utils.metrics import registry
+from src.utils.rate_limit import TokenBucket
+
+
+@dataclass
+class AdmissionConfig:
+    # all limits are per worker process (gunicorn: multiply by GUNICORN_WORKERS for the box)
+    enabled = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+    max_concurrent = int(os.getenv("ADMISSION_MAX_CONCURRENT", "4"))         # chain calls running at once
+    max_queue = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))                  # requests waiting for a slot
+    max_queue_per_session = int(os.getenv("ADMISSION_MAX_QUEUE_PER_SESSION", "2"))
+    max_wait = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "10"))          # then 503 instead of a timeout
+    session_rate = float(os.getenv("ADMISSION_SESSION_RATE", "1"))           # requests/s per session, 0 = unlimited
+    session_burst = float(os.getenv("ADMISSION_SESSION_BURST", "5"))
+    session_idle = float(os.getenv("ADMISSION_SESSION_IDLE_SECONDS", "600"))  # forget idle sessions' buckets
+    # /chat/batch questions: their own class, at most this share of the chain slots (/chat keeps the rest)
+    batch_share = float(os.getenv("ADMISSION_BATCH_SHARE", "0.5"))
+    # reverse proxies in front of the app (comma separated ips / networks): X-Forwarded-For is only
+    # believed from these, otherwise any client could pick the address it is limited under
+    trusted_proxies = os.getenv("TRUSTED_PROXIES", "")
+
+
+queue_depth = registry.gauge("chat_admission_queue_depth", "Requests waiting for a chain slot")
+in_flight = registry.gauge("chat_admission_in_flight", "Chain calls currently running")
+admission_wait = registry.histogram("chat_admission_wait_seconds", "Time admitted requests waited for a slot")
+rejections = registry.counter("chat_admission_rejected_total", "Requests rejected by admission control, by reason")
+
+
+class AdmissionRejected(Exception):
+    """Over capacity: answer with `status` (429 / 503) and a Retry-After of `retry_after` seconds"""
+
+    def __init__(self, status: int, retry_after: float, reason: str):
+        super().__init__(reason)
+        self.status = status
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.reason = reason
+
+
+BATCH_LANE = "batch"
+
+
+class _Waiter:
+    __slots__ = ("session", "event", "granted")
+
+    def __init__(self, session: str):
+        self.session = session
+        self.event = threading.Event()
+        self.granted = False
+
+
+class AdmissionController:
+    """
+    Admission control in front of the expensive part of /chat (the LLM chain):
+
+      check_rate(session)  token bucket per client (ip, see client_ip) -> 429 when a client is too fast
+      slot(session)        at most `max_concurrent` chain calls; the rest wait in a bounded queue
+                           with one lane per session, served round-robin, so one busy client only
+                           delays its own requests. Full queue, or no slot within `max_wait` -> 503.
+      batch_slot()         the batch class: at most `batch_slots` chain calls for /chat/batch
+                           questions, queued in one shared "batch" lane; waits instead of rejecting.
+
+    Freed slots are handed directly to the next waiter, so a new arrival can never jump the queue.
+    """
+
+    def __init__(self, config: Optional[AdmissionConfig] = None):
+        self.admission_config = config or AdmissionConfig()
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, list] = {}                     # session -> [bucket, last seen]
+        self._lanes: "OrderedDict[str, deque]" = OrderedDict()  # round-robin order of waiting sessions
+        self._waiting = 0
+        self._running = 0
+        self._service_time = 1.0                                # moving average, for Retry-After
+        self._checks = 0
+        self._trusted = self._parse_networks(self.admission_config.trusted_proxies)
+        self._batch = threading.BoundedSemaphore(self.batch_slots)
+
+    @staticmethod
+    def _parse_networks(value: str) -> List[ipaddress._BaseNetwork]:
+        networks = []
+        for item in value.split(","):
+            item = item.strip()
+            if not item:
+                continue
+            try:
+                networks.append(ipaddress.ip_network(item, strict=False))
+            except ValueError:
+                logging.warning(f"Ignoring invalid TRUSTED_PROXIES entry: {item}")
+        return networks
+
+    def _is_trusted(self, address: str) -> bool:
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in self._trusted)
+
+    def client_ip(self, remote_addr: Optional[str], forwarded_for: Optional[str] = None) -> str:
+        """
+        Address a request is rate limited under: the peer, unless it is a trusted proxy; then the
+        X-Forwarded-For hops are walked from the right (the ones our proxies appended) to the
+        first one that is not a trusted proxy. Client supplied hops further left are ignored.
+        """
+        address = remote_addr or ""
+        if not forwarded_for or not self._is_trusted(address):
+            return address
+        for hop in reversed([hop.strip() for hop in forwarded_for.split(",") if hop.strip()]):
+            address = hop
+            if not self._is_trusted(hop):
+                break
+        return address
+
+    def _reject(self, status: int, retry_after: float, reason: str):
+        rejections.inc(reason=reason)
+        logging.warning(f"Request rejected ({reason}), retry after {retry_after:.1f} s", extra={"sample": True})
+        raise AdmissionRejected(status, retry_after, reason)
+
+    def check_rate(self, session: str):
+        config = self.admission_config
+        if not config.enabled or config.session_rate <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            entry = self._buckets.get(session)
+            if entry is None:
+                entry = self._buckets[session] = [TokenBucket(config.session_rate, config.session_burst), now]
+            entry[1] = now
+            self._checks += 1
+            if self._checks % 1000 == 0:
+                idle = [s for s, (_, seen) in self._buckets.items() if now - seen > config.session_idle]
+                for s in idle:
+                    del self._buckets[s]
+        bucket = entry[0]
+        if not bucket.try_acquire():
+            self._reject(429, bucket.wait_time(), "session_rate")
+
+    def _retry_after(self) -> float:
+        # rough time until the queue ahead has drained
+        return self._service_time * (self._waiting + 1) / max(self.admission_config.max_concurrent, 1)
+
+    def _update_gauges(self):
+        queue_depth.set(self._waiting)
+        in_flight.set(self._running)
+
+    @property
+    def batch_slots(self) -> int:
+        """Chain slots batch questions may hold at once (the batch runner caps its concurrency to it)"""
+        config = self.admission_config
+        return max(1, min(int(config.max_concurrent * config.batch_share), config.max_concurrent))
+
+    def _acquire(self, session: str, lane_limit: bool = True) -> float:
+        config = self.admission_config
+        with self._lock:
+            if self._running < config.max_concurrent and not self._waiting:
+                self._running += 1
+                self._update_gauges()
+                return 0.0
+            if self._waiting >= config.max_queue:
+                self._reject(503, self._retry_after(), "queue_full")
+            lane = self._lanes.get(session)
+            if lane_limit and lane is not None and len(lane) >= config.max_queue_per_session:
+                self._reject(429, self._retry_after(), "session_queue_full")
+
+            waiter = _Waiter(session)
+            self._lanes.setdefault(session, deque()).append(waiter)
+            self._waiting += 1
+            self._update_gauges()
+
+        start = time.perf_counter()
+        waiter.event.wait(config.max_wait)
+        with self._lock:
+            if not waiter.granted:
+                # timed out: leave the queue (the slot was never handed over)
+                lane = self._lanes.get(session)
+                lane.remove(waiter)
+                if not lane:
+                    del self._lanes[session]
+                self._waiting -= 1
+                self._update_gauges()
+                self._reject(503, self._retry_after(), "queue_timeout")
+        waited = time.perf_counter() - start
+        admission_wait.observe(waited)
+        return waited
+
+    def _release(self, service_time: float):
+        with self._lock:
+            self._service_time = 0.9 * self._service_time + 0.1 * service_time
+            if self._lanes:
+                # round-robin: the first session in line gets the slot and moves to the back
+                session, lane = next(iter(self._lanes.items()))
+                waiter = lane.popleft()
+                if lane:
+                    self._lanes.move_to_end(session)
+                else:
+                    del self._lanes[session]
+                self._waiting -= 1
+                waiter.granted = True
+                waiter.event.set()
+            else:
+                self._running -= 1
+            self._update_gauges()
+
+    @contextmanager
+    def slot(self, session: str) -> Iterator[float]:
+        """Hold one of the chain slots for the duration of the block, yields the seconds waited"""
+        if not self.admission_config.enabled:
+            yield 0.0
+            return
+        waited = self._acquire(session)
+        start = time.perf_counter()
+        try:
+            yield waited
+        finally:
+            self._release(time.perf_counter() - start)
+
+    @contextmanager
+    def batch_slot(self) -> Iterator[float]:
+        """
+        Chain slot for one batch question, yields the seconds waited. Batch work is not interactive:
+        instead of a 429 / 503 it waits for one of the `batch_slots` and then in the batch lane.
+        """
+        if not self.admission_config.enabled:
+            yield 0.0
+            return
+        start = time.perf_counter()
+        with self._batch:
+            while True:
+                try:
+                    self._acquire(BATCH_LANE, lane_limit=False)
+                    break
+                except AdmissionRejected as e:
+                    time.sleep(e.retry_after)
+            waited = time.perf_counter() - start
+            start = time.perf_counter()
+            try:
+                yield waited
+            finally:
+                self._release(time.perf_counter() - start)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"running": self._running, "waiting": self._waiting,
+                    "sessions_waiting": len(self._lanes), "tracked_sessions": len(self._buckets),
+                    "avg_service_s": round(self._service_time, 3)}
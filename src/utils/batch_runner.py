@@ -0,0 +1,179 @@
+import os
+import sys
+import json
+import time
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable, Iterator, List, Optional
+from dataclasses import dataclass, asdict
+
+from src.utils.logger import logging
+from src.utils.exception import Custom_exception
+from src.utils.rate_limit import TokenBucket
+
+
+@dataclass
+class BatchConfig:
+    max_concurrency: int = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+    requests_per_second: float = float(os.getenv("BATCH_REQUESTS_PER_SECOND", "5"))    # provider quota, 0 = unlimited
+    burst: Optional[float] = None
+    max_questions: int = int(os.getenv("BATCH_MAX_QUESTIONS", "10000"))
+
+
+@dataclass
+class BatchResult:
+    index: int
+    question: str
+    answer: Optional[str] = None
+    error: Optional[str] = None
+    queued_ms: float = 0.0            # time spent waiting for the rate limiter / a free worker
+    latency_ms: float = 0.0           # time spent in the chain
+
+
+def read_questions(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Questions from a JSONL stream. Each line is either a JSON string or an object with an
+    "input" (or "question") key; blank lines are skipped.
+    """
+    for line_no, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        if isinstance(record, dict):
+            record = record.get("input", record.get("question"))
+        if not isinstance(record, str):
+            raise ValueError(f"Line {line_no} has no question")
+        yield record
+
+
+class BatchRunner:
+    """
+    Runs many questions through a chain with bounded parallelism and a token-bucket rate limit.
+    Results are yielded in input order as soon as the head of the queue is done, so a caller can
+    stream them while later questions are still running.
+    The configured rate is the provider quota, one bucket shared by every run of the process.
+    With an `admission` controller (app.py) questions run in its batch class: at most
+    `admission.batch_slots` at once, waiting for a slot instead of being rejected, so batch
+    work never starves /chat and never counts against a client's /chat rate limit.
+    """
+
+    def __init__(self, chain: Any, config: Optional[BatchConfig] = None, admission: Any = None):
+        self.chain = chain
+        self.batch_config = config or BatchConfig()
+        self.admission = admission
+        self.quota = TokenBucket(self.batch_config.requests_per_second,
+                                 self.batch_config.burst or self.batch_config.max_concurrency)
+
+    def validate(self, questions: List[str], max_concurrency: Optional[int] = None,
+                 requests_per_second: Optional[float] = None):
+        """Raise ValueError for a request run() can't serve, before a response is started"""
+        if len(questions) > self.batch_config.max_questions:
+            raise ValueError(f"Batch is limited to {self.batch_config.max_questions} questions")
+        if max_concurrency is not None and (isinstance(max_concurrency, bool) or not isinstance(max_concurrency, int)
+                                            or max_concurrency < 1):
+            raise ValueError("max_concurrency must be an integer >= 1")
+        if requests_per_second is not None and (isinstance(requests_per_second, bool)
+                                                or not isinstance(requests_per_second, (int, float))
+                                                or not requests_per_second > 0):
+            raise ValueError("requests_per_second must be a number > 0")
+
+    def _invoke(self, question: str, config: dict) -> Any:
+        if self.admission is None:
+            return self.chain.invoke({"input": question}, config=config)
+        with self.admission.batch_slot():
+            return self.chain.invoke({"input": question}, config=config)
+
+    def _answer(self, index: int, question: str, submitted_at: float, session_id: str) -> BatchResult:
+        start = time.perf_counter()
+        result = BatchResult(index=index, question=question,
+                             queued_ms=round((start - submitted_at) * 1000, 3))
+        try:
+            config = {"configurable": {"session_id": f"{session_id}_{index}"}}
+            response = self._invoke(question, config)
+            result.answer = response["answer"] if isinstance(response, dict) else str(response)
+        except Exception as e:
+            # one failing question must not abort a run of thousands
+            logging.error(f"Batch question {index} failed: {str(e)}")
+            result.error = str(e)
+        result.latency_ms = round((time.perf_counter() - start) * 1000, 3)
+        return result
+
+    def run(self, questions: Iterable[str], max_concurrency: Optional[int] = None,
+            requests_per_second: Optional[float] = None, session_id: str = "batch") -> Iterator[BatchResult]:
+        try:
+            concurrency = max(1, min(max_concurrency or self.batch_config.max_concurrency,
+                                     self.batch_config.max_concurrency))
+            if self.admission is not None:
+                # more workers than batch slots would only wait inside the pool
+                concurrency = min(concurrency, self.admission.batch_slots)
+            # the quota bucket is shared, a caller may only go below it with a bucket of its own
+            limit = self.batch_config.requests_per_second
+            rate = limit
+            limiter = None
+            if requests_per_second is not None and requests_per_second > 0 and (limit <= 0 or requests_per_second < limit):
+                rate = requests_per_second
+                limiter = TokenBucket(rate, self.batch_config.burst or concurrency)
+
+            logging.info(f"Starting batch run with concurrency {concurrency} and {rate} requests/s")
+            window = deque()
+            # keep a few more futures than workers so the pool never idles behind a slow head item
+            max_window = concurrency * 4
+
+            with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as executor:
+                for index, question in enumerate(questions):
+                    if index >= self.batch_config.max_questions:
+                        raise ValueError(f"Batch is limited to {self.batch_config.max_questions} questions")
+
+                    while len(window) >= max_window or (window and window[0].done()):
+                        yield window.popleft().result()
+
+                    submitted_at = time.perf_counter()
+                    if limiter is not None:
+                        limiter.acquire()
+                    self.quota.acquire()
+                    window.append(executor.submit(self._answer, index, question, submitted_at, session_id))
+
+                while window:
+                    yield window.popleft().result()
+
+            logging.info("Batch run completed")
+        except Exception as e:
+            logging.error(f"Error in batch run: {str(e)}")
+            raise Custom_exception(e, sys)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a JSONL file of questions with the chatbot")
+    parser.add_argument("--input", required=True, help="JSONL file, one question per line")
+    parser.add_argument("--output", default="-", help="JSONL results file (default: stdout)")
+    parser.add_argument("--concurrency", type=int, default=None)
+    parser.add_argument("--rps", type=float, default=None, help="requests per second, 0 = unlimited")
+    args = parser.parse_args()
+
+    from src.utils.chatbot_utils import BuildChatbot
+    chatbot = BuildChatbot().initialize_chatbot()
+
+    config = BatchConfig()
+    if args.concurrency:
+        config.max_concurrency = args.concurrency
+    if args.rps is not None:
+        config.requests_per_second = args.rps
+    runner = BatchRunner(chatbot, config)
+
+    output = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        with open(args.input, encoding="utf-8") as f:
+            for result in runner.run(read_questions(f)):
+                output.write(json.dumps(asdict(result), ensure_ascii=False) + "\n")
+                output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    main()
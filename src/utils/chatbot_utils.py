@@ -1,25 +1,46 @@
 import os
 import sys
+import glob
 from typing import Any
 
-from langchain_nvidia import NVIDIAEmbeddings
-from langchain_groq import ChatGroq
+from langchain_nvidia_ai_endpoints import NVIDIAEmbeddings
 from langchain.prompts import PromptTemplate
-from langchain.vectorstores import Pinecone
-from langchain.chains import RetrievalQA
+from langchain_pinecone import PineconeVectorStore
+from langchain.chains.combine_documents import create_stuff_documents_chain
+from langchain.chains import create_retrieval_chain
 from langchain.schema import BaseChatMessageHistory, ChatMessage
 from langchain.memory import ConversationBufferMemory
 
 from src.utils.logger import logging
 from src.utils.exception import Custom_exception
+from src.components.index_manager import IndexManagerConfig
+from src.utils.fake_services import (FakeChatModel, FakeEmbeddings, build_fake_vector_store, catalog_texts,
+                                     use_fake_services)
+from src.utils.llm_gateway import LLMGateway, create_groq_gateway
+from src.utils.local_embeddings import LocalEmbeddings, local_embeddings_enabled
+from src.utils.metrics import InstrumentedEmbeddings
+from src.utils.partitioning import (PartitionedRetriever, PartitioningConfig, PartitionRouter, document_partition,
+                                    partition_namespace)
+from src.utils.retrieval_utils import MultiStageRetriever, RetrievalProfile, ThresholdRetriever
+from src.utils.conversation import ConversationalRetriever, ConversationConfig
+from src.utils.prefetch import PrefetchConfig, PrefetchedRetriever
+from src.utils.shared_state import CachedEmbeddings
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
 class BuildChatbot:
-    def __init__(self):
+    def __init__(self, multi_stage_retrieval: bool = None):
         self.store = {}  # For chat history
+        if multi_stage_retrieval is None and os.getenv("MULTI_STAGE_RETRIEVAL"):
+            multi_stage_retrieval = os.getenv("MULTI_STAGE_RETRIEVAL").lower() == "true"
+        # None: strategy of the tuned retrieval config
+        self.multi_stage_retrieval = multi_stage_retrieval
+        self.embeddings = None
+        self.embedding_path = None      # local model the embeddings were loaded from
+        self.prefetch_retriever = None  # of the last built chain, for the prefetch endpoint
+        self.llm = None
 
     def get_session_id(self, session_id: str) -> BaseChatMessageHistory:
         """Creates and retrieves a chat history session."""
@@ -30,9 +51,23 @@ class BuildChatbot:
             )
         return self.store[session_id]
 
-    def load_embeddings(self):
-        """Initialize NVIDIA embeddings"""
+    def load_embeddings(self, pointer: dict = None):
+        """Initialize NVIDIA embeddings, or the local model the index version was built with"""
         try:
+            if local_embeddings_enabled():
+                embedding_path = (pointer or {}).get("embedding_path")
+                if embedding_path:
+                    logging.info(f"Loading local embeddings from {embedding_path}")
+                    return LocalEmbeddings.load(embedding_path)
+                if not use_fake_services():
+                    raise ValueError("The index version has no local embedding model, rebuild it with EMBEDDING_BACKEND=local")
+                # fake index without a build: fit on the catalog it is loaded from (deterministic, same in every worker)
+                return LocalEmbeddings.fit(text for path in self.fake_catalog_paths() for text in catalog_texts(path)[0])
+
+            if use_fake_services():
+                logging.info("Using fake in-process embeddings")
+                return FakeEmbeddings()
+
             logging.info("Initializing NVIDIA Embeddings.")
             embeddings = NVIDIAEmbeddings(
                 model="nvidia/nv-embedqa-mistral-7b-v2",
@@ -48,11 +83,15 @@ class BuildChatbot:
     def load_llm(self):
         """Initialize Groq LLM"""
         try:
+            if use_fake_services():
+                logging.info("Using fake in-process LLM tiers")
+                return LLMGateway([("primary", FakeChatModel()), ("fallback", FakeChatModel())])
+
             logging.info("Initializing Groq LLM")
-            llm = ChatGroq(
+            # deadline, hedging, circuit breaking and fallback to a faster model tier
+            llm = create_groq_gateway(
+                api_key=os.getenv("GROQ_API_KEY"),
                 temperature=0.6,
-                model_name="llama-3.3-70b-versatile",
-                groq_api_key=os.getenv("GROQ_API_KEY"),
                 max_tokens=4096
             )
             logging.info("LLM initialized successfully")
@@ -72,11 +111,11 @@ Use only information from the context. If details are missing, answer gracefully
 
 Context: {context}
 
-Question: {question}
+Question: {input}
 Answer:"""
             prompt = PromptTemplate(
                 template=template,
-                input_variables=["context", "question"]
+                input_variables=["context", "input"]
             )
             logging.info("Prompt template created")
             return prompt
@@ -84,13 +123,54 @@ Answer:"""
             logging.error(f"Error creating prompt: {str(e)}")
             raise Custom_exception(e, sys)
 
-    def load_vectorstore(self, embeddings):
-        """Load Pinecone vector store"""
+    @staticmethod
+    def fake_catalog_paths():
+        """Catalog CSVs indexed by the fake vector store (cleaned data if it has been built)"""
+        if os.path.exists("artifacts/data_cleaned.csv"):
+            return ["artifacts/data_cleaned.csv"]
+        return sorted(glob.glob(os.path.join("data", "*.csv")))
+
+    def load_partitions(self, pointer: dict = None):
+        """partition -> namespace and the query router of a partitioned index version, (None, None) if it is flat"""
         try:
-            logging.info("Loading Pinecone vector store")
-            vector_store = Pinecone.from_existing_index(
-                index_name="ecommerce-chatbot-project",
-                embedding=embeddings
+            pointer = pointer or {}
+            if use_fake_services():
+                if not PartitioningConfig().enabled:
+                    return None, None
+                router, namespaces = PartitionRouter(), {}
+                for path in self.fake_catalog_paths():
+                    for text in catalog_texts(path)[0]:
+                        partition = document_partition(text, path)
+                        namespaces[partition] = partition_namespace(pointer.get("namespace"), partition)
+                        router.add(partition, text)
+                return namespaces, router
+
+            if not pointer.get("partitions"):
+                return None, None
+            namespaces = {p: details["namespace"] for p, details in pointer["partitions"].items()}
+            return namespaces, PartitionRouter.load(pointer["router_path"])
+        except Exception as e:
+            logging.error(f"Error loading index partitions: {str(e)}")
+            raise Custom_exception(e, sys)
+
+    def load_vectorstore(self, embeddings, pointer: dict = None):
+        """Load Pinecone vector store (the namespace of the index pointer, default namespace without one)"""
+        try:
+            pointer = pointer or {}
+            namespace = pointer.get("namespace")
+            if use_fake_services():
+                logging.info("Loading fake in-memory vector store from the catalog CSVs")
+                # a local model embeds the catalog rows too, the fake embedder only stands in for nvidia
+                local = getattr(embeddings, "embeddings", embeddings)
+                local = local if isinstance(local, LocalEmbeddings) else None
+                return build_fake_vector_store(embeddings, self.fake_catalog_paths(), namespace=namespace,
+                                               partitioned=PartitioningConfig().enabled, document_embeddings=local)
+
+            logging.info(f"Loading Pinecone vector store, namespace '{namespace or ''}'")
+            vector_store = PineconeVectorStore.from_existing_index(
+                index_name=pointer.get("index_name", IndexManagerConfig.index_name),
+                embedding=embeddings,
+                namespace=namespace
             )
             logging.info("Vector store loaded successfully")
             return vector_store
@@ -98,25 +178,66 @@ Answer:"""
             logging.error(f"Error loading vector store: {str(e)}")
             raise Custom_exception(e, sys)
 
-    def build_retrieval_chain(self):
+    def build_retrieval_chain(self, pointer: dict = None):
         """Combine embeddings, LLM, prompt, vector store into a retriever chain"""
         try:
-            embeddings = self.load_embeddings()
-            llm = self.load_llm()
+            # clients are kept across index swaps, only the vector store is reloaded
+            # (and a local embedding model, which belongs to its index version)
+            embedding_path = (pointer or {}).get("embedding_path") if local_embeddings_enabled() else None
+            if self.embeddings is None or embedding_path != self.embedding_path:
+                embeddings = self.load_embeddings(pointer)
+                if not isinstance(embeddings, LocalEmbeddings):
+                    # remote query embeddings are cached in shared memory, one cache for all workers of the box;
+                    # a local one is cheaper to compute than to look up
+                    embeddings = CachedEmbeddings(embeddings)
+                self.embeddings, self.embedding_path = InstrumentedEmbeddings(embeddings), embedding_path
+            if self.llm is None:
+                self.llm = self.load_llm()
+            embeddings, llm = self.embeddings, self.llm
             prompt = self.setup_prompt()
-            vector_store = self.load_vectorstore(embeddings)
+            vector_store = self.load_vectorstore(embeddings, pointer)
+            namespaces, router = self.load_partitions(pointer)
+            reuse = ConversationConfig().enabled
+            # k / threshold / context budget tuned by benchmarks/retrieval_tuning.py, re-read on every index swap
+            profile = RetrievalProfile.load()
+            config = profile.config
+            multi_stage_retrieval = (profile.multi_stage if self.multi_stage_retrieval is None
+                                     else self.multi_stage_retrieval)
 
-            # Create RetrievalQA chain
-            retriever = vector_store.as_retriever(
-                search_type="similarity_score_threshold",
-                search_kwargs={"k": 5, "score_threshold": 0.7}
-            )
+            # Create retrieval chain
+            if namespaces:
+                # one namespace per category: each query only searches the partitions it is about
+                multi_stage = None
+                if multi_stage_retrieval:
+                    multi_stage = MultiStageRetriever(vector_store=vector_store, config=config)
+                retriever = PartitionedRetriever(vector_store=vector_store, router=router, namespaces=namespaces,
+                                                 k=config.k, score_threshold=config.score_threshold,
+                                                 max_context_tokens=config.max_context_tokens,
+                                                 multi_stage=multi_stage, include_values=reuse)
+            elif multi_stage_retrieval:
+                # over-fetch, diversify with MMR and re-rank locally -> smaller, more varied context
+                retriever = MultiStageRetriever(vector_store=vector_store, config=config)
+            else:
+                retriever = ThresholdRetriever(vector_store=vector_store, k=config.k,
+                                               score_threshold=config.score_threshold,
+                                               max_context_tokens=config.max_context_tokens,
+                                               include_values=reuse)
 
-            chain = RetrievalQA.from_chain_type(
-                llm=llm,
-                retriever=retriever,
-                chain_type_kwargs={"prompt": prompt}
-            )
+            prefetch_retriever = None
+            if PrefetchConfig().enabled:
+                # documents retrieved while the user was still typing (/chat/prefetch)
+                retriever = prefetch_retriever = PrefetchedRetriever(base=retriever,
+                                                                     namespace=(pointer or {}).get("namespace"))
+            if reuse:
+                # follow-ups in a session reuse / re-rank its last retrieval instead of searching again
+                retriever = ConversationalRetriever(base=retriever, namespace=(pointer or {}).get("namespace"))
+
+            doc_chain = create_stuff_documents_chain(llm=llm,
+                                                     prompt=prompt,
+                                                     document_variable_name="context")
+            chain = create_retrieval_chain(retriever=retriever,
+                                           combine_docs_chain=doc_chain)
+            self.prefetch_retriever = prefetch_retriever
             logging.info("Retrieval chain created successfully")
             return chain
 
@@ -124,17 +245,12 @@ Answer:"""
             logging.error(f"Error building retrieval chain: {str(e)}")
             raise Custom_exception(e, sys)
 
-    def initialize_chatbot(self):
+    def initialize_chatbot(self, pointer: dict = None):
         """Initialize chatbot with session memory"""
         try:
-            retrieval_chain = self.build_retrieval_chain()
-
-            # Wrap chain with memory
-            chatbot = {
-                "chain": retrieval_chain,
-                "get_session_history": self.get_session_id
-            }
-            return chatbot
+            # invoked as chatbot.invoke({"input": ...}) -> {"answer": ...} by app.py
+            retrieval_chain = self.build_retrieval_chain(pointer)
+            return retrieval_chain
         except Exception as e:
             logging.error(f"Error initializing chatbot: {str(e)}")
             raise Custom_exception(e, sys)
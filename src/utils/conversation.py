@@ -0,0 +1,206 @@
+import os
+import re
+import sys
+import contextvars
+from typing import Any, Dict, List, Optional, Tuple
+from dataclasses import dataclass
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from src.utils.logger import logging
+from src.utils.exception import Custom_exception
+from src.utils.metrics import current_trace, registry, span
+from src.utils.retrieval_utils import tokenize
+from src.utils.shared_state import SharedCache, cache_key
+
+
+@dataclass
+class ConversationConfig:
+    enabled = os.getenv("CONVERSATION_REUSE", "true").lower() == "true"
+    ttl = float(os.getenv("CONVERSATION_CACHE_TTL_SECONDS", "1800"))   # a session's last retrieval
+    max_follow_up_terms = 6          # longer messages are new questions, not follow-ups
+    max_new_terms = 2                # this many new words without a reference back ("any silk sarees?") -> new
+    rerank_min_share = 0.4           # each new word in at least this share of the cached documents, else search
+    feedback_weight = 0.5            # pull of the documents matching the follow-up on the query vector
+    lexical_weight = 0.5             # vs vector similarity when re-ranking the cached documents
+
+
+conversation_retrievals = registry.counter("chat_conversation_retrievals_total",
+                                           "Retrievals by decision: reuse / rerank of the session's last "
+                                           "documents, follow-up search or new search")
+
+_session: contextvars.ContextVar = contextvars.ContextVar("chat_session", default=None)
+
+
+def set_session(session_id: Optional[str]):
+    """Chat session of the current request (app.py), read by the conversational retriever"""
+    _session.set(session_id)
+
+
+def get_session() -> Optional[str]:
+    return _session.get()
+
+
+# words pointing back at the previous answer ("the second one", "is it cheaper", "what about ...")
+_REFERENCE_PATTERN = re.compile(
+    r"\b(it|its|this|that|these|those|them|they|one|ones|first|second|third|fourth|fifth|last|"
+    r"former|latter|above|previous|same|cheaper|cheapest|costlier|expensive|better|compare|"
+    r"difference|vs|versus|either|both|other|another|similar)\b")
+_CONTINUATION_PATTERN = re.compile(r"^\s*((what|how) about|and|also|any|in|with|without|but|more|only)\b")
+_REFERENCE_WORDS = {
+    "it", "its", "this", "that", "these", "those", "them", "they", "one", "ones", "first", "second",
+    "third", "fourth", "fifth", "last", "former", "latter", "above", "previous", "same", "cheaper",
+    "cheapest", "costlier", "expensive", "better", "compare", "difference", "vs", "versus", "either",
+    "both", "other", "another", "similar", "about", "how", "also", "but", "more", "only", "without",
+    "tell", "is", "was", "there", "does", "come", "comes", "available", "cost", "price", "much", "than",
+}
+# product kinds of the catalogs (singular): asking for another kind is a new question, reference or not
+_CATEGORY_NOUNS = {
+    "shirt", "tshirt", "tee", "saree", "sari", "watch", "legging", "skort", "pant", "trouser",
+    "jean", "dress", "skirt", "kurta", "kurti", "lehenga", "bra", "jacket", "hoodie", "sweatshirt",
+    "jogger", "shoe", "sneaker", "bag", "belt", "wallet", "sunglass", "dupatta",
+}
+
+
+def _singular(term: str) -> str:
+    # crude plural folding so "sarees", "watches" and "pants" match the nouns above
+    if term.endswith("ches") or term.endswith("shes"):
+        return term[:-2]
+    return term[:-1] if len(term) > 3 and term.endswith("s") and not term.endswith("ss") else term
+
+
+class FollowUpDetector:
+    """
+    Cheap lexical decision for a message in a session with a cached retrieval:
+      reuse   refers back to the last answer and adds nothing new ("is the second one cheaper?")
+      rerank  follow-up whose new words all occur in enough of the cached documents ("what about in blue?")
+      search  follow-up with new words -> new search for "<previous query> <follow-up>" ("in black")
+      new     stand-alone question -> new search for the message itself: another product kind
+              ("any silk sarees?", "do you have that in a saree" after shirts) or `max_new_terms` new words
+    """
+
+    def __init__(self, config: Optional[ConversationConfig] = None):
+        self.conversation_config = config or ConversationConfig()
+
+    def is_follow_up(self, message: str) -> bool:
+        text = message.lower()
+        if len(tokenize(text)) > self.conversation_config.max_follow_up_terms:
+            return False
+        return bool(_REFERENCE_PATTERN.search(text) or _CONTINUATION_PATTERN.search(text))
+
+    def new_terms(self, message: str, previous_query: str) -> set:
+        return tokenize(message) - _REFERENCE_WORDS - tokenize(previous_query)
+
+    def new_categories(self, terms: set, previous_query: str) -> set:
+        previous = {_singular(term) for term in tokenize(previous_query)}
+        return {_singular(term) for term in terms} & _CATEGORY_NOUNS - previous
+
+    def decide(self, message: str, entry: Optional[dict]) -> Tuple[str, set]:
+        config = self.conversation_config
+        if entry is None or not self.is_follow_up(message):
+            return "new", set()
+        terms = self.new_terms(message, entry["query"])
+        if self.new_categories(terms, entry["query"]):
+            return "new", terms
+        if len(terms) >= config.max_new_terms and not _REFERENCE_PATTERN.search(message.lower()):
+            return "new", terms
+        if not entry["documents"]:
+            return "search", terms
+        if not terms:
+            return "reuse", terms
+        # re-ranking only reorders the cached documents, a word few of them mention needs a search
+        documents = [tokenize(doc["page_content"]) for doc in entry["documents"]]
+        share = min(sum(term in tokens for tokens in documents) for term in terms) / len(documents)
+        return ("rerank" if share >= config.rerank_min_share else "search"), terms
+
+
+class ConversationalRetriever(BaseRetriever):
+    """
+    Keeps each session's last retrieval (query, query vector, documents with scores and vectors)
+    in the shared cache and answers follow-ups from it: reused as is, or re-ranked locally
+    towards the follow-up's words - no embedding call and no vector search. Entries are tied to
+    the index version (namespace) they came from, a hot swap makes them misses.
+    `base` is any retriever with retrieve_scored(query) -> (query vector, matches).
+    """
+
+    base: Any
+    namespace: Optional[str] = None
+    cache: Any = None
+    detector: Any = None
+
+    def model_post_init(self, __context: Any):
+        if self.cache is None:
+            self.cache = SharedCache("session_retrieval")
+        if self.detector is None:
+            self.detector = FollowUpDetector()
+
+    @property
+    def conversation_config(self) -> ConversationConfig:
+        return self.detector.conversation_config
+
+    def _load(self, session: str) -> Optional[dict]:
+        entry = self.cache.get(cache_key(session))
+        if entry is not None and entry["namespace"] != self.namespace:
+            return None         # retrieved from another index version
+        return entry
+
+    def _store(self, session: str, query: str, query_vector: List[float], matches: List[Dict[str, Any]]):
+        documents = [{"page_content": m["document"].page_content, "metadata": m["document"].metadata,
+                      "score": m["score"],
+                      "values": None if m.get("values") is None else np.asarray(m["values"], dtype=np.float32)}
+                     for m in matches]
+        entry = {"namespace": self.namespace, "query": query,
+                 "query_vector": np.asarray(query_vector, dtype=np.float32), "documents": documents}
+        self.cache.set(cache_key(session), entry, self.conversation_config.ttl)
+
+    def rerank(self, entry: dict, terms: set) -> List[Document]:
+        """Re-score the cached documents for the follow-up's words, vectors pulled towards the matching ones"""
+        documents = entry["documents"]
+        overlap = np.asarray([len(terms & tokenize(doc["page_content"])) / len(terms) for doc in documents])
+        similarity = np.asarray([doc["score"] for doc in documents], dtype=np.float32)
+        if all(doc["values"] is not None for doc in documents) and overlap.any():
+            # rocchio feedback: query vector + mean of the documents that mention the new words
+            vectors = np.vstack([doc["values"] for doc in documents])
+            unit = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            query = entry["query_vector"] / max(np.linalg.norm(entry["query_vector"]), 1e-12)
+            feedback = unit[overlap > 0].mean(axis=0)
+            query = query + self.conversation_config.feedback_weight * feedback
+            similarity = (unit @ (query / max(np.linalg.norm(query), 1e-12)) + 1) / 2
+        weight = self.conversation_config.lexical_weight
+        scores = (1 - weight) * similarity + weight * overlap
+        order = np.argsort(-scores, kind="stable")
+        return [Document(page_content=documents[i]["page_content"], metadata=documents[i]["metadata"])
+                for i in order]
+
+    def _get_relevant_documents(self, query: str, *,
+                                run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        try:
+            session = get_session()
+            if session is None:
+                return [m["document"] for m in self.base.retrieve_scored(query)[1]]
+
+            entry = self._load(session)
+            decision, terms = self.detector.decide(query, entry)
+            conversation_retrievals.inc(decision=decision)
+            trace = current_trace()
+            if trace is not None:
+                trace.attributes["retrieval"] = decision
+
+            if decision == "reuse":
+                return [Document(page_content=doc["page_content"], metadata=doc["metadata"])
+                        for doc in entry["documents"]]
+            if decision == "rerank":
+                with span("conversation_rerank", documents=len(entry["documents"])):
+                    return self.rerank(entry, terms)
+
+            # the follow-up alone retrieves poorly, search it in the context of the previous query
+            search_query = f"{entry['query']} {query}" if decision == "search" else query
+            query_vector, matches = self.base.retrieve_scored(search_query)
+            self._store(session, search_query, query_vector, matches)
+            return [m["document"] for m in matches]
+        except Exception as e:
+            logging.error(f"Error in conversational retrieval: {str(e)}")
+            raise Custom_exception(e, sys)
@@ -0,0 +1,388 @@
+import os
+import re
+import csv
+import json
+import math
+import time
+import zlib
+import random
+import threading
+from types import SimpleNamespace
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from src.utils.logger import logging
+
+
+@dataclass
+class FaultProfile:
+    """
+    Latency and error injection of a fake service.
+      latency: callable returning the delay (seconds) of one request, e.g. lognormal_latency(0.4, 0.5)
+      error_rate: share of requests answered with `error_status`
+    """
+    latency: Callable[[], float] = field(default=lambda: 0.0)
+    error_rate: float = 0.0
+    error_status: int = 500
+
+
+def constant_latency(seconds: float) -> Callable[[], float]:
+    return lambda: seconds
+
+
+def lognormal_latency(median_s: float, sigma: float = 0.5) -> Callable[[], float]:
+    """Right-skewed latency like real LLM endpoints: most calls near the median, a long tail"""
+    mu = math.log(median_s)
+    return lambda: random.lognormvariate(mu, sigma)
+
+
+class _FakeGroqHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass                                    # keep the console quiet under load
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass                                # client gave up (deadline / hedged duplicate)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        server: "FakeGroqServer" = self.server.fake
+
+        profile = server.profile_for(request.get("model", ""))
+        time.sleep(max(profile.latency(), 0.0))
+        server.requests += 1
+
+        if random.random() < profile.error_rate:
+            self._send_json(profile.error_status, {"error": {"message": "injected failure",
+                                                             "type": "fake_error"}})
+            return
+
+        prompt = " ".join(str(m.get("content", "")) for m in request.get("messages", []))
+        answer = server.answer
+        self._send_json(200, {
+            "id": f"chatcmpl-fake-{server.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "fake"),
+            "choices": [{"index": 0,
+                         "message": {"role": "assistant", "content": answer},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt.split()),
+                      "completion_tokens": len(answer.split()),
+                      "total_tokens": len(prompt.split()) + len(answer.split())},
+        })
+
+
+class FakeGroqServer:
+    """
+    Local OpenAI/Groq compatible chat completions server with injectable latency and errors.
+    Point ChatGroq at it with GROQ_API_BASE=server.url (the client appends /openai/v1/...).
+
+        with FakeGroqServer(profiles={"llama-3.3-70b-versatile": FaultProfile(error_rate=0.3)}) as server:
+            os.environ["GROQ_API_BASE"] = server.url
+    """
+
+    def __init__(self, profiles: Optional[dict] = None, default_profile: Optional[FaultProfile] = None,
+                 answer: str = "This is a fake answer.", host: str = "127.0.0.1", port: int = 0):
+        self.profiles = profiles or {}
+        self.default_profile = default_profile or FaultProfile()
+        self.answer = answer
+        self.requests = 0
+        self._httpd = ThreadingHTTPServer((host, port), _FakeGroqHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def profile_for(self, model: str) -> FaultProfile:
+        return self.profiles.get(model, self.default_profile)
+
+    def start(self) -> "FakeGroqServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        logging.info(f"Fake Groq server listening on {self.url}")
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# ---------------- in-process fakes for the embedding, vector search and LLM APIs ----------------
+# Enabled with USE_FAKE_SERVICES=true; latencies (median, ms) are configurable through
+# FAKE_EMBED_LATENCY_MS, FAKE_SEARCH_LATENCY_MS, FAKE_LLM_LATENCY_MS and FAKE_LATENCY_SIGMA.
+
+def use_fake_services() -> bool:
+    return os.getenv("USE_FAKE_SERVICES", "false").lower() == "true"
+
+
+def profile_from_env(name: str, default_ms: float) -> FaultProfile:
+    median_ms = float(os.getenv(f"FAKE_{name}_LATENCY_MS", default_ms))
+    sigma = float(os.getenv("FAKE_LATENCY_SIGMA", "0.4"))
+    latency = lognormal_latency(median_ms / 1000, sigma) if median_ms > 0 else constant_latency(0.0)
+    return FaultProfile(latency=latency,
+                        error_rate=float(os.getenv(f"FAKE_{name}_ERROR_RATE", "0")))
+
+
+class StageRecorder:
+    """Latencies (ms) of the fake calls per stage, for the per-stage breakdown of benchmarks"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples: Dict[str, List[float]] = {}
+
+    def record(self, stage: str, latency_ms: float):
+        with self._lock:
+            self._samples.setdefault(stage, []).append(latency_ms)
+
+    def reset(self):
+        with self._lock:
+            self._samples = {}
+
+    def snapshot(self) -> Dict[str, List[float]]:
+        with self._lock:
+            return {stage: list(samples) for stage, samples in self._samples.items()}
+
+
+stage_recorder = StageRecorder()
+
+
+def _simulate(stage: str, profile: FaultProfile):
+    start = time.perf_counter()
+    time.sleep(max(profile.latency(), 0.0))
+    stage_recorder.record(stage, (time.perf_counter() - start) * 1000)
+    if random.random() < profile.error_rate:
+        raise RuntimeError(f"Injected {stage} failure")
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Deterministic hashing embedder (word + character trigram features). Texts sharing words
+    end up close in cosine space, which is enough to exercise retrieval without the NVIDIA API.
+    """
+
+    def __init__(self, dimensions: int = 256, profile: Optional[FaultProfile] = None):
+        self.dimensions = dimensions
+        self.profile = profile or profile_from_env("EMBED", 80)
+
+    def _vector(self, text: str) -> List[float]:
+        text = str(text).lower()
+        words = re.findall(r"[a-z0-9]+", text)
+        features = words + [text[i:i + 3] for i in range(max(len(text) - 2, 0))]
+        digests = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in features), dtype=np.int64,
+                              count=len(features))
+        signs = np.where(digests & 1, 1.0, -1.0)
+        vector = np.bincount(digests % self.dimensions, weights=signs, minlength=self.dimensions)
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).astype(np.float32).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        _simulate("embed", self.profile)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        _simulate("embed", self.profile)
+        return self._vector(text)
+
+
+class _AsyncResult:
+    def __init__(self, value: Any = None):
+        self._value = value
+
+    def get(self):
+        return self._value
+
+
+class FakeIndex:
+    """
+    In-memory stand-in for a pinecone Index (upsert / query / describe_index_stats / delete).
+    Scores are raw cosine like a cosine metric pinecone index; the vector store maps them to
+    relevance scores ((1 + cosine) / 2) before any threshold is applied.
+    """
+
+    def __init__(self, profile: Optional[FaultProfile] = None):
+        self.profile = profile or profile_from_env("SEARCH", 40)
+        self.config = SimpleNamespace(host="fake-index", api_key="fake")
+        self._lock = threading.Lock()
+        self._namespaces: Dict[str, Dict[str, Any]] = {}
+
+    def _namespace(self, namespace: Optional[str]) -> Dict[str, Any]:
+        return self._namespaces.setdefault(namespace or "", {"ids": [], "vectors": [], "metadata": [],
+                                                             "matrix": None})
+
+    def upsert(self, vectors: List[Any], namespace: Optional[str] = None, async_req: bool = False, **kwargs):
+        with self._lock:
+            space = self._namespace(namespace)
+            for item in vectors:
+                if isinstance(item, dict):
+                    vector_id, values, metadata = item["id"], item["values"], item.get("metadata", {})
+                else:
+                    vector_id, values, metadata = item
+                space["ids"].append(vector_id)
+                space["vectors"].append(np.asarray(values, dtype=np.float32))
+                space["metadata"].append(dict(metadata))
+            space["matrix"] = None
+        result = {"upserted_count": len(vectors)}
+        return _AsyncResult(result) if async_req else result
+
+    def load(self, ids: List[str], matrix: np.ndarray, metadata: List[Dict[str, Any]],
+             namespace: Optional[str] = None):
+        """Bulk load a prebuilt (e.g. memory-mapped, shared) matrix without copying it"""
+        with self._lock:
+            space = self._namespace(namespace)
+            space["ids"], space["vectors"], space["metadata"] = list(ids), list(matrix), list(metadata)
+            space["matrix"] = matrix
+
+    def query(self, vector: List[float], top_k: int = 4, include_values: bool = False,
+              include_metadata: bool = False, namespace: Optional[str] = None, filter: Any = None, **kwargs):
+        _simulate("search", self.profile)
+        with self._lock:
+            space = self._namespace(namespace)
+            if not space["ids"]:
+                return {"matches": [], "namespace": namespace or ""}
+            if space["matrix"] is None:
+                space["matrix"] = np.vstack(space["vectors"])
+            matrix, ids, metadata = space["matrix"], space["ids"], space["metadata"]
+
+        query = np.asarray(vector, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0)
+        cosine = (matrix @ query) / np.where(norms == 0, 1.0, norms)
+        top = np.argsort(-cosine)[:top_k]
+
+        matches = []
+        for i in top:
+            match = {"id": ids[i], "score": float(cosine[i])}
+            if include_values:
+                match["values"] = matrix[i].tolist()
+            if include_metadata:
+                match["metadata"] = dict(metadata[i])
+            matches.append(match)
+        return {"matches": matches, "namespace": namespace or ""}
+
+    def describe_index_stats(self, **kwargs) -> Dict[str, Any]:
+        with self._lock:
+            namespaces = {name: {"vector_count": len(space["ids"])} for name, space in self._namespaces.items()}
+        return {"namespaces": namespaces,
+                "total_vector_count": sum(ns["vector_count"] for ns in namespaces.values())}
+
+    def delete(self, ids: Optional[List[str]] = None, delete_all: bool = False,
+               namespace: Optional[str] = None, **kwargs):
+        with self._lock:
+            if delete_all:
+                self._namespaces.pop(namespace or "", None)
+                return {}
+            space = self._namespace(namespace)
+            keep = [i for i, vector_id in enumerate(space["ids"]) if vector_id not in set(ids or [])]
+            for key in ("ids", "vectors", "metadata"):
+                space[key] = [space[key][i] for i in keep]
+            space["matrix"] = None
+        return {}
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model returning a canned answer after a simulated generation latency"""
+
+    answer: str = "Here are a few options from our catalog that match what you are looking for."
+    profile: Any = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        _simulate("llm", self.profile or profile_from_env("LLM", 900))
+        prompt_tokens = sum(len(str(m.content).split()) for m in messages)
+        completion_tokens = len(self.answer.split())
+        message = AIMessage(content=self.answer,
+                            usage_metadata={"input_tokens": prompt_tokens,
+                                            "output_tokens": completion_tokens,
+                                            "total_tokens": prompt_tokens + completion_tokens})
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def catalog_texts(csv_path: str) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """Rows of a catalog CSV rendered the way CSVLoader renders them ("column: value" lines)"""
+    texts, metadatas = [], []
+    with open(csv_path, encoding="utf-8", newline="") as f:
+        for row_no, row in enumerate(csv.DictReader(f)):
+            texts.append("\n".join(f"{str(k).strip()}: {str(v).strip()}" for k, v in row.items()))
+            metadatas.append({"source": csv_path, "row": row_no})
+    return texts, metadatas
+
+
+def build_fake_vector_store(embeddings: Embeddings, csv_paths: List[str], namespace: Optional[str] = None,
+                            partitioned: bool = False, document_embeddings: Optional[Embeddings] = None) -> Any:
+    """
+    PineconeVectorStore over a FakeIndex pre-loaded with the catalog rows (no simulated latency).
+    The vector matrix is memory-mapped from the shared state dir, so gunicorn workers share one copy.
+    partitioned=True loads every category into its own namespace (<namespace>--<category>).
+    document_embeddings embeds the rows (a real local model), default a latency free FakeEmbeddings.
+    """
+    from langchain_pinecone import PineconeVectorStore
+    from src.utils.partitioning import document_partition, partition_namespace
+    from src.utils.pipeline_state import fingerprint_files
+    from src.utils.shared_state import shared_array
+
+    dimensions = getattr(embeddings, "dimensions", 256)
+    loader = document_embeddings or FakeEmbeddings(dimensions=dimensions, profile=FaultProfile())
+    ids, texts, metadatas = [], [], []
+    for path in csv_paths:
+        path_texts, path_metadatas = catalog_texts(path)
+        for metadata, text in zip(path_metadatas, path_texts):
+            metadata["text"] = text
+        ids.extend(f"{path}#{i}" for i in range(len(path_texts)))
+        texts.extend(path_texts)
+        metadatas.extend(path_metadatas)
+
+    partitions = [None] * len(texts)
+    if partitioned:
+        # rows grouped by partition, so each namespace is a slice (a view) of the shared matrix
+        partitions = [document_partition(text, metadata["source"]) for text, metadata in zip(texts, metadatas)]
+        order = sorted(range(len(texts)), key=lambda i: partitions[i])
+        ids, texts, metadatas, partitions = ([values[i] for i in order]
+                                             for values in (ids, texts, metadatas, partitions))
+        for metadata, partition in zip(metadatas, partitions):
+            metadata["partition"] = partition
+
+    index = FakeIndex()
+    if texts:
+        model = getattr(loader, "model", "fake")
+        fingerprint = f"{fingerprint_files(csv_paths)}-{model}-{dimensions}{'-partitioned' if partitioned else ''}"
+        matrix = shared_array("fake_index", fingerprint,
+                              lambda: np.asarray(loader.embed_documents(texts), dtype=np.float32))
+        start = 0
+        while start < len(texts):
+            end = start
+            while end < len(texts) and partitions[end] == partitions[start]:
+                end += 1
+            space = namespace if partitions[start] is None else partition_namespace(namespace, partitions[start])
+            index.load(ids[start:end], matrix[start:end], metadatas[start:end], namespace=space)
+            start = end
+    stage_recorder.reset()
+    return PineconeVectorStore(index=index, embedding=embeddings, namespace=namespace)
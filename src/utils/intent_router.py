@@ -0,0 +1,400 @@
+import os
+import re
+import sys
+import glob
+import time
+import threading
+from collections import Counter
+from typing import Any, Dict, Optional, Set
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.utils.logger import logging
+from src.utils.exception import Custom_exception
+
+
+# -------- canned replies that do not need the LLM --------
+small_talk_config = [
+    {
+        'intent': 'greeting',
+        'pattern': r"^(hi+|hello+|hey+|hiya|namaste|good (morning|afternoon|evening))( there| team| hunnit)?[\s!.,]*$",
+        'examples': ['hi', 'hello there', 'hey', 'good morning'],
+        'answer': "Hi! How can I help you today? Ask me about products, sizes, colors, prices or shipping.",
+    },
+    {
+        'intent': 'thanks',
+        'pattern': r"^(ok(ay)?[\s,]*)?(thanks+|thank you( so much| very much)?|thx|ty|great,? thanks)[\s!.]*$",
+        'examples': ['thanks', 'thank you so much', 'ok thanks'],
+        'answer': "You're welcome! Let me know if there is anything else I can help you with.",
+    },
+    {
+        'intent': 'goodbye',
+        'pattern': r"^(bye+|goodbye|see you|see ya|that'?s all)[\s!.]*$",
+        'examples': ['bye', 'goodbye', "that's all"],
+        'answer': "Goodbye! Happy shopping.",
+    },
+]
+
+# store FAQs, previously matched in the browser (templates/home_page.html). Anchored to the
+# question forms: the same words inside a product question ("trending watches under 5000") are a search
+faq_config = [
+    {
+        'intent': 'faq_shipping',
+        'pattern': r"^((do|does|can|will) (you|u|hunnit) (ship|deliver)|(how long|when) .*\b(ship|shipping|deliver|delivery)|"
+                   r"(what|how much) (is|are) (the |your )?(shipping|delivery)|(is|are) (shipping|delivery))\b",
+        'examples': ['do you ship across india', 'how long does delivery take', 'is shipping free'],
+        'answer': "Yes! We deliver all across India with fast shipping.",
+    },
+    {
+        'intent': 'faq_capabilities',
+        'pattern': r"^(what (can|do) you do|how can you help( me)?|who are you)\??$",
+        'examples': ['what can you do', 'how can you help me'],
+        'answer': "I can help you find products, compare prices, check sizes and colors, and answer questions about shipping.",
+    },
+    {
+        'intent': 'faq_fabric',
+        'pattern': r"^(what about )?(the )?(fabrics?|materials?)[\s?!.]*$",
+        'examples': ['fabric', 'what about the material'],
+        'answer': "Ask about the fabric of any product to know more about the material.",
+    },
+    {
+        'intent': 'faq_best_gym_wear',
+        'pattern': r"\bbest gym ?wear\b",
+        'examples': ['what is your best gym wear'],
+        'answer': "We have premium activewear for women — check our best sellers like Zen Cheerful Skort and Zen Flare Pants.",
+    },
+    {
+        'intent': 'faq_meetings',
+        'pattern': r"\bwear (it )?(in|to) (a )?meetings?\b",
+        'examples': ['can i wear it in meetings'],
+        'answer': "Our versatile activewear can be styled for casual meetings or office — try pairing Zen Cheerful Skort with Zen Polo Neck 2-in-1 Crop Top.",
+    },
+    {
+        'intent': 'faq_trending',
+        'pattern': r"^(what'?s|what s|what is|what are|show me|which|any)( the| your)?( products| items)? trending"
+                   r"( products| items)?( this month| this week| now| right now)?[\s?!.]*$",
+        'examples': ["what's trending this month"],
+        'answer': "Our trending products this month include Zen Cheerful Skort, Zen Flare Pants, and Zen Halo Dress.",
+    },
+    {
+        'intent': 'faq_pairing',
+        'pattern': r"\bpair (it )?with (the |a )?skort\b",
+        'examples': ['what can i pair with the skort'],
+        'answer': "You can pair Zen Cheerful Skort with Zen Polo Neck 2-in-1 Crop Top or Hunnit Collection Top.",
+    },
+    {
+        'intent': 'faq_new_arrivals',
+        'pattern': r"^(show me|what are|any)?( the| your)? ?new arrivals?( this month| this week)?[\s?!.]*$",
+        'examples': ['show me new arrivals'],
+        'answer': "Check our new arrivals like Zen Nova Dress, Zen Halo Dress, and Zen Nova Skorts.",
+    },
+]
+
+# featured products of the storefront page, with the details the catalog CSVs don't have
+store_products = {
+    "zen cheerful skort": {"price": "₹1,499", "sizes": "XS, S, M, L, XL", "colors": "Mauve Taupe, Black, Olive",
+                           "fabric": "Breathable, stretchy fabric perfect for workouts and casual wear"},
+    "zen flare pants": {"price": "₹1,799", "sizes": "XS, S, M, L, XL", "colors": "Mauve Taupe, Navy, Black",
+                        "fabric": "Soft, moisture-wicking material for gym and leisure"},
+    "hunnit day 1 collection": {"price": "₹1,299", "sizes": "S, M, L", "colors": "Pink, White",
+                                "fabric": "Lightweight cotton blend"},
+    "zen polo neck 2-in-1 crop top": {"price": "₹1,099", "sizes": "XS, S, M, L", "colors": "Mauve Taupe, Black",
+                                      "fabric": "Stretchy, quick-dry activewear fabric"},
+    "hunnit collection top": {"price": "₹1,299", "sizes": "S, M, L", "colors": "White, Pink, Black",
+                              "fabric": "Soft cotton blend"},
+    "zen halo dress": {"price": "₹2,299", "sizes": "XS, S, M, L", "colors": "Navy, Black",
+                       "fabric": "Comfortable, breathable fabric"},
+}
+# --------------------------------------------------------
+
+# catalog column names differ between the amazon and hunnit scrapes
+catalog_columns = {
+    'name': ['Product Name', 'Title'],
+    'brand': ['Brand Name', 'Vendor'],
+    'price': ['Selling Price', 'Price'],
+    'mrp': ['MRP', 'CompareAtPrice'],
+    'sizes': ['VariantTitle'],
+}
+
+_PRICE_PATTERN = re.compile(r"\b(price|cost|costs|how much|rate)\b")
+_SIZE_PATTERN = re.compile(r"\b(size|sizes|sizing)\b")
+_COLOR_PATTERN = re.compile(r"\b(colou?rs?)\b")
+_FABRIC_PATTERN = re.compile(r"\b(fabrics?|materials?|made of|made from)\b")
+_WORD_PATTERN = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+_STOP_WORDS = {"a", "an", "and", "for", "in", "of", "on", "s", "the", "to", "with"}
+
+
+@dataclass
+class IntentRouterConfig:
+    is_airflow = os.getenv("IS_AIRFLOW", "false").lower() == "true"
+    if is_airflow:
+        catalog_path = "/opt/airflow/artifacts/data_cleaned.csv"
+    else:
+        catalog_path = "artifacts/data_cleaned.csv"
+    raw_data_path = "data"
+    centroid_threshold: float = 0.8       # min cosine similarity for an embedding match
+    name_coverage: float = 0.8            # share of a product name's words the message must contain
+    generic_word_share: float = 0.02      # a word in more catalog names than this is generic ("saree", "men", "cotton")
+    min_specific_words: int = 3           # catalog names with fewer non-generic words aren't looked up directly
+    max_rule_words: int = 12              # longer messages are open-ended, leave them to the chain
+
+
+@dataclass
+class RouteResult:
+    intent: str
+    answer: Optional[str] = None          # None -> send the question to the RAG chain
+    latency_ms: float = 0.0
+
+
+class RoutingMetrics:
+    """Thread-safe per-route request counts and latency totals"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {}
+        self._latency_ms: Dict[str, float] = {}
+
+    def record(self, route: str, latency_ms: float):
+        with self._lock:
+            self._counts[route] = self._counts.get(route, 0) + 1
+            self._latency_ms[route] = self._latency_ms.get(route, 0.0) + latency_ms
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            total = sum(self._counts.values())
+            routes = {
+                route: {
+                    "count": count,
+                    "share": round(count / total, 4),
+                    "avg_latency_ms": round(self._latency_ms[route] / count, 3),
+                }
+                for route, count in self._counts.items()
+            }
+        return {"total": total, "routes": routes}
+
+
+class IntentRouter:
+    """
+    Routes a chat message before it reaches the RAG chain:
+      greetings / thanks / store FAQs / simple price, size, color and fabric lookups are answered directly,
+      everything else is returned with answer=None so the caller runs the full chain.
+    """
+
+    def __init__(self, catalog: Optional[pd.DataFrame] = None, embeddings: Any = None):
+        self.intent_router_config = IntentRouterConfig()
+        self.metrics = RoutingMetrics()
+        self.rules = [(re.compile(rule['pattern']), rule) for rule in small_talk_config + faq_config]
+        self.generic_words = self.build_generic_words(catalog)
+        self.products = self.build_product_lookup(catalog)
+
+        # optional embedding nearest-centroid fallback for phrasings the patterns miss
+        self.embeddings = embeddings
+        self.centroids = None
+        if embeddings is not None:
+            self.centroids = self.build_centroids(embeddings)
+
+    @classmethod
+    def from_catalog(cls, embeddings: Any = None) -> "IntentRouter":
+        """Create a router over the cleaned catalog (or the raw CSVs if it hasn't been built yet)"""
+        config = IntentRouterConfig()
+        try:
+            if os.path.exists(config.catalog_path):
+                catalog = pd.read_csv(config.catalog_path)
+            else:
+                files = glob.glob(os.path.join(config.raw_data_path, "*.csv"))
+                catalog = pd.concat([pd.read_csv(f) for f in files], ignore_index=True) if files else None
+        except Exception as e:
+            logging.error(f"Could not load catalog for intent router, lookups disabled: {str(e)}")
+            catalog = None
+        return cls(catalog=catalog, embeddings=embeddings)
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return " ".join(_WORD_PATTERN.findall(str(text).lower()))
+
+    @staticmethod
+    def _columns(catalog: Optional[pd.DataFrame]) -> Dict[str, Optional[str]]:
+        if catalog is None or catalog.empty:
+            return {key: None for key in catalog_columns}
+        return {key: next((c for c in names if c in catalog.columns), None)
+                for key, names in catalog_columns.items()}
+
+    def build_generic_words(self, catalog: Optional[pd.DataFrame]) -> Set[str]:
+        """Stop words plus the words that show up in too many catalog names to tell products apart"""
+        generic = set(_STOP_WORDS)
+        column = self._columns(catalog)['name']
+        if column is None:
+            return generic
+        names = [set(self._normalize(name).split()) for name in catalog[column].dropna()]
+        counts = Counter(word for words in names for word in words)
+        limit = max(1.0, len(names) * self.intent_router_config.generic_word_share)
+        generic.update(word for word, count in counts.items() if count > limit)
+        return generic
+
+    def build_product_lookup(self, catalog: Optional[pd.DataFrame]) -> Dict[str, Dict[str, str]]:
+        """
+        Store products plus the catalog rows a name identifies: the name must be unique in the
+        catalog and have min_specific_words non-generic words. "Women Saree" is listed by several
+        sellers at different prices, a question about it is a search, not a lookup.
+        """
+        try:
+            products = {name: dict(details, name=name.title()) for name, details in store_products.items()}
+            columns = self._columns(catalog)
+            if columns['name'] is None:
+                return products
+
+            rows = catalog.to_dict(orient="records")
+            names = [self._normalize(row[columns['name']]) for row in rows]
+            name_counts = Counter(names)
+            skipped = 0
+            for name, row in zip(names, rows):
+                if not name or name in products:
+                    continue
+                specific = set(name.split()) - self.generic_words
+                if name_counts[name] > 1 or len(specific) < self.intent_router_config.min_specific_words:
+                    skipped += 1
+                    continue
+                details = {"name": str(row[columns['name']])}
+                for key in ('brand', 'price', 'mrp', 'sizes'):
+                    value = row.get(columns[key]) if columns[key] else None
+                    if value is not None and not pd.isna(value) and str(value).strip().lower() != 'na':
+                        details[key] = str(value)
+                products[name] = details
+
+            logging.info(f"Intent router loaded {len(products)} products for direct lookups, "
+                         f"{skipped} duplicate or generic names left to retrieval")
+            return products
+        except Exception as e:
+            logging.error(f"Error building product lookup: {str(e)}")
+            raise Custom_exception(e, sys)
+
+    def build_centroids(self, embeddings: Any) -> Dict[str, Any]:
+        try:
+            intents, centroids, answers = [], [], {}
+            for rule in small_talk_config + faq_config:
+                vectors = np.asarray(embeddings.embed_documents(rule['examples']), dtype=np.float32)
+                centroid = vectors.mean(axis=0)
+                centroids.append(centroid / (np.linalg.norm(centroid) or 1.0))
+                intents.append(rule['intent'])
+                answers[rule['intent']] = rule['answer']
+            return {"intents": intents, "matrix": np.vstack(centroids), "answers": answers}
+        except Exception as e:
+            logging.error(f"Error building intent centroids: {str(e)}")
+            raise Custom_exception(e, sys)
+
+    def find_product(self, message: str) -> Optional[Dict[str, str]]:
+        """
+        The one product whose (normalized) name the message contains as whole words, or else
+        covers mostly, specific words included. None when no product or several products match,
+        an ambiguous question is answered by retrieval.
+        """
+        words = set(message.split())
+        padded = f" {message} "
+        contained, covered = [], []
+        min_coverage = self.intent_router_config.name_coverage
+        for name in self.products:
+            if f" {name} " in padded:
+                contained.append(name)
+                continue
+            name_words = set(name.split())
+            if len(name_words) < 3:
+                continue
+            specific = name_words - self.generic_words
+            coverage = len(name_words & words) / len(name_words)
+            if (coverage >= min_coverage and specific
+                    and len(specific & words) / len(specific) >= min_coverage):
+                covered.append((coverage, name))
+
+        if contained:
+            # "zen flare pants" inside a longer matched name is the same product, not a second one
+            contained = [name for name in contained
+                         if not any(other != name and f" {name} " in f" {other} " for other in contained)]
+            return self.products[contained[0]] if len(contained) == 1 else None
+        if not covered:
+            return None
+        covered.sort(reverse=True)
+        if len(covered) > 1 and covered[1][0] == covered[0][0]:
+            return None
+        return self.products[covered[0][1]]
+
+    def answer_lookup(self, message: str) -> Optional[RouteResult]:
+        asks_price = bool(_PRICE_PATTERN.search(message))
+        asks_size = bool(_SIZE_PATTERN.search(message))
+        asks_color = bool(_COLOR_PATTERN.search(message))
+        asks_fabric = bool(_FABRIC_PATTERN.search(message))
+        if not (asks_price or asks_size or asks_color or asks_fabric):
+            return None
+
+        product = self.find_product(message)
+        if product is None:
+            return None
+
+        name = product['name']
+        if asks_size:
+            if 'sizes' not in product:
+                return None
+            return RouteResult(intent="lookup_size", answer=f"{name} is available in sizes: {product['sizes']}.")
+        if asks_color:
+            if 'colors' not in product:
+                return None
+            return RouteResult(intent="lookup_color", answer=f"{name} is available in colors: {product['colors']}.")
+        if asks_fabric:
+            if 'fabric' not in product:
+                return None
+            return RouteResult(intent="lookup_fabric", answer=f"{name} fabric: {product['fabric']}.")
+        if 'price' not in product:
+            return None
+        brand = f" by {product['brand']}" if 'brand' in product else ""
+        mrp = f" (MRP {product['mrp']})" if 'mrp' in product else ""
+        return RouteResult(intent="lookup_price", answer=f"{name}{brand} costs {product['price']}{mrp}.")
+
+    def classify_by_centroid(self, question: str) -> Optional[RouteResult]:
+        query = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        similarities = self.centroids["matrix"] @ query
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.intent_router_config.centroid_threshold:
+            return None
+        intent = self.centroids["intents"][best]
+        return RouteResult(intent=intent, answer=self.centroids["answers"][intent])
+
+    def classify(self, question: str) -> RouteResult:
+        message = self._normalize(question)
+        if not message:
+            return RouteResult(intent="empty", answer="Hello! Ask me about products, sizes, colors, shipping, or fabric.")
+
+        # product lookups first, a FAQ keyword inside a product question shouldn't win
+        result = self.answer_lookup(message)
+        if result is not None:
+            return result
+
+        if len(message.split()) > self.intent_router_config.max_rule_words:
+            return RouteResult(intent="rag")
+
+        raw = question.strip().lower()
+        for pattern, rule in self.rules:
+            if pattern.search(raw) or pattern.search(message):
+                return RouteResult(intent=rule['intent'], answer=rule['answer'])
+
+        if self.centroids is not None:
+            result = self.classify_by_centroid(question)
+            if result is not None:
+                return result
+
+        return RouteResult(intent="rag")
+
+    def route(self, question: str) -> RouteResult:
+        """Classify a message and record the routing metrics of the direct answers"""
+        start = time.perf_counter()
+        try:
+            result = self.classify(question)
+        except Exception as e:
+            # never fail the request because of the router, the chain can still answer
+            logging.error(f"Error routing message, falling back to RAG chain: {str(e)}")
+            result = RouteResult(intent="rag")
+        result.latency_ms = (time.perf_counter() - start) * 1000
+        if result.answer is not None:
+            self.metrics.record(result.intent, result.latency_ms)
+        return result
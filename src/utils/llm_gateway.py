@@ -0,0 +1,263 @@
+import os
+import time
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, List, Optional, Tuple
+from dataclasses import dataclass
+
+from langchain_groq import ChatGroq
+from langchain_core.runnables import Runnable, RunnableConfig
+
+from src.utils.logger import logging
+from src.utils.metrics import registry
+
+
+tier_calls = registry.counter("llm_tier_calls_total", "LLM gateway calls by model tier and outcome")
+hedged_requests = registry.counter("llm_hedged_requests_total", "Duplicate requests sent for slow LLM calls")
+
+
+@dataclass
+class LLMGatewayConfig:
+    deadline_s: float = float(os.getenv("LLM_DEADLINE_SECONDS", "20"))
+    fallback_reserve: float = 0.3         # share of the remaining time kept for the next tiers
+    hedge_percentile: float = 0.95        # send a duplicate request once the call is slower than this
+    hedge_min_delay_s: float = 1.0        # ... but never earlier than this
+    max_hedges: int = 1
+    failure_threshold: int = 5            # consecutive failures that open a tier's circuit
+    reset_timeout_s: float = 30.0         # how long an open circuit rejects calls before a probe
+    max_inflight: int = int(os.getenv("LLM_MAX_INFLIGHT", "16"))     # above this, start at the fast tier
+    p95_limit_s: float = float(os.getenv("LLM_P95_LIMIT_SECONDS", "8"))
+    latency_window: int = 200
+    min_samples: int = 20                 # latency samples needed before percentiles are trusted
+    max_workers: int = 32
+
+
+class LLMGatewayError(Exception):
+    """Raised when no model tier could answer before the deadline"""
+
+
+class CircuitBreaker:
+    """closed -> (failure_threshold consecutive failures) -> open -> (reset_timeout_s) -> half-open"""
+
+    def __init__(self, failure_threshold: int, reset_timeout_s: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_s = reset_timeout_s
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_timeout_s:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._probing:
+                # let exactly one probe request through
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class LatencyTracker:
+    """Sliding window of call latencies (seconds)"""
+
+    def __init__(self, window: int):
+        self._lock = threading.Lock()
+        self._samples = deque(maxlen=window)
+
+    def record(self, latency_s: float):
+        with self._lock:
+            self._samples.append(latency_s)
+
+    def percentile(self, p: float, min_samples: int = 1) -> Optional[float]:
+        with self._lock:
+            if len(self._samples) < max(min_samples, 1):
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(int(p * len(ordered)), len(ordered) - 1)]
+
+
+class ModelTier:
+    def __init__(self, name: str, llm: Runnable, config: LLMGatewayConfig):
+        self.name = name
+        self.llm = llm
+        self.breaker = CircuitBreaker(config.failure_threshold, config.reset_timeout_s)
+        self.latency = LatencyTracker(config.latency_window)
+
+
+class LLMGateway(Runnable):
+    """
+    Drop-in replacement for a chat model in the chains, wrapping an ordered list of model tiers
+    (largest first). Every call gets a deadline; a duplicate (hedged) request is sent when the
+    first one is slower than the tier's recent p95; tiers with an open circuit are skipped and
+    the next, faster tier is used. Under high load or slow upstream p95, calls start directly
+    at the fastest tier.
+    """
+
+    def __init__(self, tiers: List[Tuple[str, Runnable]], config: Optional[LLMGatewayConfig] = None):
+        if not tiers:
+            raise ValueError("LLMGateway needs at least one model tier")
+        self.config = config or LLMGatewayConfig()
+        self.tiers = [ModelTier(name, llm, self.config) for name, llm in tiers]
+        self._executor = ThreadPoolExecutor(max_workers=self.config.max_workers,
+                                            thread_name_prefix="llm-gateway")
+        self._inflight = 0
+        self._inflight_lock = threading.Lock()
+
+    def _overloaded(self) -> bool:
+        primary = self.tiers[0]
+        p95 = primary.latency.percentile(0.95, self.config.min_samples)
+        return self._inflight > self.config.max_inflight or (p95 is not None and p95 > self.config.p95_limit_s)
+
+    def _ordered_tiers(self) -> List[ModelTier]:
+        if len(self.tiers) > 1 and self._overloaded():
+            logging.warning("LLM gateway overloaded, starting at the fallback tier")
+            return self.tiers[1:] + self.tiers[:1]
+        return list(self.tiers)
+
+    def _hedge_delay(self, tier: ModelTier) -> float:
+        threshold = tier.latency.percentile(self.config.hedge_percentile, self.config.min_samples)
+        return max(self.config.hedge_min_delay_s, threshold or self.config.deadline_s)
+
+    def _timed_call(self, tier: ModelTier, input: Any, config: Optional[RunnableConfig], kwargs: dict):
+        start = time.monotonic()
+        try:
+            return tier.llm.invoke(input, config, **kwargs)
+        finally:
+            # failed and abandoned (past the deadline) calls too, else the p95 only sees the fast ones
+            tier.latency.record(time.monotonic() - start)
+
+    @staticmethod
+    def _hedge_config(config: Optional[RunnableConfig]) -> RunnableConfig:
+        """The duplicate runs without the caller's callbacks, so traces and token counts see one call"""
+        return {key: value for key, value in (config or {}).items() if key not in ("callbacks", "run_id")}
+
+    def _call_tier(self, tier: ModelTier, input: Any, config: Optional[RunnableConfig],
+                   kwargs: dict, deadline: float) -> Any:
+        pending = {self._executor.submit(self._timed_call, tier, input, config, kwargs)}
+        hedges_left = self.config.max_hedges
+        next_hedge_at = time.monotonic() + self._hedge_delay(tier)
+        last_error = None
+
+        try:
+            while pending:
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                wake_at = min(deadline, next_hedge_at) if hedges_left else deadline
+                done, pending = wait(pending, timeout=max(wake_at - now, 0), return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    if future.exception() is None:
+                        return future.result()
+                    last_error = future.exception()
+
+                if last_error is not None and not pending:
+                    raise last_error
+
+                if hedges_left and time.monotonic() >= next_hedge_at and pending:
+                    logging.info(f"Hedging slow request on LLM tier '{tier.name}'")
+                    pending.add(self._executor.submit(self._timed_call, tier, input,
+                                                      self._hedge_config(config), kwargs))
+                    hedged_requests.inc(tier=tier.name)
+                    hedges_left -= 1
+
+            raise TimeoutError(f"LLM tier '{tier.name}' missed the deadline") from last_error
+        finally:
+            # losers of the race: calls still queued in the pool never start, so they can't hold
+            # workers the next requests need (a call already on the wire can't be interrupted)
+            for future in pending:
+                future.cancel()
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        deadline = time.monotonic() + self.config.deadline_s
+        last_error = None
+
+        with self._inflight_lock:
+            self._inflight += 1
+        try:
+            tiers = self._ordered_tiers()
+            for position, tier in enumerate(tiers):
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                if not tier.breaker.allow():
+                    logging.info(f"Circuit open for LLM tier '{tier.name}', skipping")
+                    tier_calls.inc(tier=tier.name, outcome="circuit_open")
+                    continue
+                tier_deadline = deadline
+                if position < len(tiers) - 1:
+                    tier_deadline = now + (deadline - now) * (1 - self.config.fallback_reserve)
+                try:
+                    result = self._call_tier(tier, input, config, kwargs, tier_deadline)
+                    tier.breaker.record_success()
+                    tier_calls.inc(tier=tier.name, outcome="success")
+                    return result
+                except Exception as e:
+                    tier.breaker.record_failure()
+                    tier_calls.inc(tier=tier.name, outcome="timeout" if isinstance(e, TimeoutError) else "error")
+                    logging.error(f"LLM tier '{tier.name}' failed: {str(e)}")
+                    last_error = e
+        finally:
+            with self._inflight_lock:
+                self._inflight -= 1
+
+        raise LLMGatewayError("No LLM tier answered before the deadline") from last_error
+
+    def stats(self) -> dict:
+        """Breaker state and latency percentiles of every tier"""
+        return {
+            tier.name: {
+                "circuit": tier.breaker.state,
+                "p50_s": tier.latency.percentile(0.5),
+                "p95_s": tier.latency.percentile(0.95),
+            }
+            for tier in self.tiers
+        }
+
+
+def create_groq_gateway(api_key: str, temperature: float = 0.6, max_tokens: int = 4096,
+                        config: Optional[LLMGatewayConfig] = None) -> LLMGateway:
+    """
+    Groq gateway with the 70B model as primary tier and a small, fast model as fallback.
+    Set GROQ_API_BASE to point both tiers at a local fake server (src/utils/fake_services.py).
+    """
+    config = config or LLMGatewayConfig()
+    tiers = []
+    for name, model in [("primary", os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")),
+                        ("fallback", os.getenv("GROQ_FALLBACK_MODEL", "llama-3.1-8b-instant"))]:
+        llm = ChatGroq(temperature=temperature,
+                       model_name=model,
+                       groq_api_key=api_key,
+                       max_tokens=max_tokens,
+                       request_timeout=config.deadline_s,
+                       max_retries=0)          # the gateway retries on the next tier instead
+        tiers.append((name, llm))
+    return LLMGateway(tiers, config)
@@ -0,0 +1,172 @@
+import os
+import re
+import sys
+import zlib
+import hashlib
+from typing import Iterable, List, Optional
+from dataclasses import dataclass
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.utils.logger import logging
+from src.utils.exception import Custom_exception
+
+
+@dataclass
+class LocalEmbeddingConfig:
+    backend = os.getenv("EMBEDDING_BACKEND", "nvidia").lower()       # nvidia | local
+    dimensions = int(os.getenv("LOCAL_EMBEDDING_DIMENSIONS", "256"))
+    hash_features = 2 ** 14          # hashed word + char n-gram space, no vocabulary to store
+    char_ngrams = (3, 5)
+    max_fit_documents = int(os.getenv("LOCAL_EMBEDDING_MAX_FIT_DOCUMENTS", "50000"))   # sample to fit on
+    power_iterations = 2
+    chunk_size = 256                 # rows multiplied at once while fitting
+    seed = 42
+
+
+def local_embeddings_enabled() -> bool:
+    return LocalEmbeddingConfig().backend == "local"
+
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def _features(text: str, char_ngrams=(3, 5)) -> List[str]:
+    """Words plus char n-grams inside word boundaries (" slim", "lim ", ...), robust to typos and plurals"""
+    words = _WORD_PATTERN.findall(str(text).lower())
+    features = [f"w:{word}" for word in words]
+    low, high = char_ngrams
+    for word in words:
+        padded = f" {word} "
+        for n in range(low, high + 1):
+            features.extend(padded[i:i + n] for i in range(max(len(padded) - n + 1, 0)))
+    return features
+
+
+class LocalEmbeddings(Embeddings):
+    """
+    In-process embedder fitted on the catalog: hashed word / char n-gram TF-IDF reduced to a
+    small dense space with a truncated SVD (LSA). Saved as one .npz per index version, so the
+    documents of a version and the queries against it always use the same model; a query is a
+    sparse lookup + one small matrix product on CPU, no network call.
+    """
+
+    def __init__(self, idf: np.ndarray, components: np.ndarray, config: Optional[LocalEmbeddingConfig] = None):
+        self.local_embedding_config = config or LocalEmbeddingConfig()
+        self.idf = np.asarray(idf, dtype=np.float32)
+        self.components = np.ascontiguousarray(components, dtype=np.float32)      # (dimensions, hash_features)
+        self.dimensions = self.components.shape[0]
+        digest = hashlib.sha1(self.components[:, :64].tobytes()).hexdigest()[:12]
+        # shared query embedding cache key, different fits never share vectors
+        self.model = f"local-lsa-{self.dimensions}-{digest}"
+
+    @classmethod
+    def _hashed(cls, text: str, config: LocalEmbeddingConfig):
+        features = _features(text, config.char_ngrams)
+        if not features:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        buckets = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in features), dtype=np.int64,
+                              count=len(features)) % config.hash_features
+        indices, counts = np.unique(buckets, return_counts=True)
+        return indices, (1.0 + np.log(counts)).astype(np.float32)          # sublinear tf
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        return matrix / np.where(norms == 0, 1.0, norms)
+
+    @classmethod
+    def fit(cls, texts: Iterable[str], config: Optional[LocalEmbeddingConfig] = None) -> "LocalEmbeddings":
+        """Fit idf weights and an SVD basis on catalog rows (randomized SVD, X stays sparse)"""
+        try:
+            config = config or LocalEmbeddingConfig()
+            texts = list(texts)
+            rng = np.random.default_rng(config.seed)
+            if len(texts) > config.max_fit_documents:
+                texts = [texts[i] for i in sorted(rng.choice(len(texts), config.max_fit_documents, replace=False))]
+            if not texts:
+                raise ValueError("No documents to fit the local embeddings on")
+            rows = [cls._hashed(text, config) for text in texts]
+            rows = [row for row in rows if len(row[0])] or rows
+
+            document_frequency = np.zeros(config.hash_features, dtype=np.float64)
+            for indices, _ in rows:
+                document_frequency[indices] += 1
+            idf = (np.log((1 + len(rows)) / (1 + document_frequency)) + 1).astype(np.float32)
+
+            # X (documents x features) as l2 normalized tf-idf rows, kept sparse: per chunk of rows the
+            # non-zeros in row order (for X @ m) and in feature order (for X.T @ m), summed with reduceat
+            chunks = []
+            for start in range(0, len(rows), config.chunk_size):
+                part = [(i, w * idf[i]) for i, w in rows[start:start + config.chunk_size] if len(i)]
+                indices = np.concatenate([i for i, _ in part])
+                weights = np.concatenate([w / (np.linalg.norm(w) or 1.0) for _, w in part]).astype(np.float32)
+                row_starts = np.cumsum([0] + [len(i) for i, _ in part[:-1]])
+                row_ids = np.repeat(np.arange(len(part)), [len(i) for i, _ in part])
+                order = np.argsort(indices, kind="stable")
+                features, feature_starts = np.unique(indices[order], return_index=True)
+                chunks.append((indices, weights, row_starts, row_ids[order], weights[order], features, feature_starts))
+
+            def times(matrix):          # X @ matrix
+                return np.vstack([np.add.reduceat(weights[:, None] * matrix[indices], row_starts)
+                                  for indices, weights, row_starts, *_ in chunks])
+
+            def transposed_times(matrix):   # X.T @ matrix
+                out, start = np.zeros((config.hash_features, matrix.shape[1]), dtype=np.float32), 0
+                for _, _, row_starts, row_ids, weights, features, feature_starts in chunks:
+                    out[features] += np.add.reduceat(weights[:, None] * matrix[start + row_ids], feature_starts)
+                    start += len(row_starts)
+                return out
+
+            # randomized truncated SVD (Halko et al.) with a few power iterations
+            rank = min(config.dimensions, len(rows), config.hash_features)
+            width = min(rank + 10, len(rows))
+            basis = rng.standard_normal((config.hash_features, width)).astype(np.float32)
+            for _ in range(config.power_iterations + 1):
+                projected, _ = np.linalg.qr(times(basis))
+                basis, _ = np.linalg.qr(transposed_times(projected))
+            # X ~ (X basis) basis.T; the right singular vectors of the small X basis give the embedding basis
+            _, _, vt = np.linalg.svd(times(basis), full_matrices=False)
+            components = (basis @ vt.T[:, :rank]).T
+            embeddings = cls(idf, components, config)
+            logging.info(f"Fitted local embeddings ({embeddings.model}) on {len(rows)} documents")
+            return embeddings
+        except Exception as e:
+            logging.error(f"Error fitting local embeddings: {str(e)}")
+            raise Custom_exception(e, sys)
+
+    def _vector(self, text: str) -> np.ndarray:
+        indices, weights = self._hashed(text, self.local_embedding_config)
+        if not len(indices):
+            return np.zeros(self.dimensions, dtype=np.float32)
+        weights = weights * self.idf[indices]
+        weights /= np.linalg.norm(weights) or 1.0
+        return self._normalize(self.components[:, indices] @ weights)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector(text).tolist() for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector(text).tolist()
+
+    def save(self, path: str):
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+            np.savez_compressed(tmp_path, idf=self.idf.astype(np.float16),
+                                components=self.components.astype(np.float16))
+            os.replace(tmp_path, path)
+            logging.info(f"Saved local embeddings {self.model} to {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+        except Exception as e:
+            logging.error(f"Error saving local embeddings: {str(e)}")
+            raise Custom_exception(e, sys)
+
+    @classmethod
+    def load(cls, path: str, config: Optional[LocalEmbeddingConfig] = None) -> "LocalEmbeddings":
+        try:
+            with np.load(path) as data:
+                return cls(data["idf"], data["components"], config)
+        except Exception as e:
+            logging.error(f"Error loading local embeddings from {path}: {str(e)}")
+            raise Custom_exception(e, sys)
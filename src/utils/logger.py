@@ -1,21 +1,190 @@
 import os
+import sys
+import json
+import queue
+import random
+import atexit
 import logging
-from datetime import datetime
+import contextvars
+import logging.handlers
+from datetime import datetime, timezone
 
-logs_file_name = datetime.now().strftime('%d_%m_%Y_%H_%M_%S') + ".log" 
-logs_folder_name = datetime.now().strftime('%d_%m_%Y')
+# -------- configuration (environment) --------
+# LOG_DIR                  folder of the log files (default: Logs)
+# LOG_FILE                 file name (default: app.log); gunicorn workers write <name>.<pid>.log
+# LOG_FORMAT               json | text
+# LOG_LEVEL                minimum level written (default: INFO)
+# LOG_ROTATION             size | time
+# LOG_MAX_BYTES            size rotation threshold (default: 10 MB)
+# LOG_ROTATE_WHEN          time rotation interval, TimedRotatingFileHandler `when` (default: midnight)
+# LOG_BACKUP_COUNT         rotated files kept (retention), default 7
+# LOG_SAMPLE_RATE          share of high-volume records (extra={"sample": True}) that are written
+# LOG_MAX_MESSAGE_CHARS    longer messages are truncated (0 = no limit)
+# ---------------------------------------------
 
-logs_path = os.path.join(os.getcwd(), "Logs", logs_folder_name)
+logs_folder_name = os.getenv("LOG_DIR", os.path.join(os.getcwd(), "Logs"))
+logs_file_name = os.getenv("LOG_FILE", "app.log")
+logs_path = logs_folder_name
 os.makedirs(logs_path, exist_ok=True)
 
 logs_file_path = os.path.join(logs_path, logs_file_name)
 
-logging.basicConfig(filename=logs_file_path,
-                    format="[%(asctime)s ] %(lineno)d %(name)s - %(levelname)s - %(message)s",
-                    level=logging.INFO)
+request_id_var: contextvars.ContextVar = contextvars.ContextVar("request_id", default=None)
+
+
+def set_request_id(request_id):
+    return request_id_var.set(request_id)
+
+
+def get_request_id():
+    return request_id_var.get()
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps every record with the request id of the current request (on the request thread)"""
+
+    def filter(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Drops a share of the records marked extra={"sample": True}; warnings and errors always pass"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        if getattr(record, "sample", False) and record.levelno < logging.WARNING:
+            return random.random() < self.rate
+        return True
+
+
+class TruncatingFilter(logging.Filter):
+    """
+    Formats the message once, on the calling thread (QueueHandler does the same), and cuts
+    large payloads such as full documents or LLM answers down to `max_chars`.
+    """
+
+    def __init__(self, max_chars: int):
+        super().__init__()
+        self.max_chars = max_chars
+
+    def filter(self, record):
+        message = record.getMessage()
+        if self.max_chars and len(message) > self.max_chars:
+            message = f"{message[:self.max_chars]}... [truncated {len(message) - self.max_chars} chars]"
+        record.msg, record.args = message, None
+        return True
+
+
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "sample"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra` fields (e.g. stage_timings) are kept as top-level keys"""
+
+    def format(self, record):
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "line": record.lineno,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and value is not None:
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+def _file_handler(path: str = None):
+    path = path or logs_file_path
+    backup_count = int(os.getenv("LOG_BACKUP_COUNT", "7"))
+    if os.getenv("LOG_ROTATION", "size").lower() == "time":
+        return logging.handlers.TimedRotatingFileHandler(path,
+                                                         when=os.getenv("LOG_ROTATE_WHEN", "midnight"),
+                                                         backupCount=backup_count,
+                                                         encoding="utf-8")
+    return logging.handlers.RotatingFileHandler(path,
+                                                maxBytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+                                                backupCount=backup_count,
+                                                encoding="utf-8")
+
+
+def configure_logging():
+    """
+    Root logger -> QueueHandler (cheap, on the request thread) -> QueueListener thread ->
+    rotating file handler (disk I/O off the request path). Safe to call more than once.
+    """
+    root = logging.getLogger()
+    if getattr(configure_logging, "listener", None) is not None:
+        return configure_logging.listener
+
+    file_handler = _file_handler()
+    if os.getenv("LOG_FORMAT", "json").lower() == "json":
+        file_handler.setFormatter(JsonFormatter())
+    else:
+        file_handler.setFormatter(logging.Formatter(
+            "[%(asctime)s ] %(lineno)d %(name)s - %(levelname)s - [%(request_id)s] %(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    configure_logging.queue_handler = queue_handler
+    queue_handler.addFilter(RequestContextFilter())
+    queue_handler.addFilter(SamplingFilter(float(os.getenv("LOG_SAMPLE_RATE", "1.0"))))
+    queue_handler.addFilter(TruncatingFilter(int(os.getenv("LOG_MAX_MESSAGE_CHARS", "500"))))
+
+    root.addHandler(queue_handler)
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
+    listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(stop_logging)
+    configure_logging.listener = listener
+    return listener
+
+
+def restart_logging_after_fork(file_name: str = None):
+    """
+    The listener thread does not survive a fork (gunicorn preload_app): give the child a fresh
+    queue and its own listener. With `file_name` the child writes its own file in LOG_DIR, so
+    processes never rotate (rename) a file another one is still writing to.
+    """
+    listener = getattr(configure_logging, "listener", None)
+    if listener is None:
+        return configure_logging()
+    handlers = listener.handlers
+    if file_name:
+        file_handler = _file_handler(os.path.join(logs_path, file_name))
+        file_handler.setFormatter(handlers[0].formatter)
+        for handler in handlers:
+            handler.close()         # the child's copy of the parent's file descriptor
+        handlers = (file_handler,)
+    log_queue = queue.SimpleQueue()
+    configure_logging.queue_handler.queue = log_queue
+    configure_logging.listener = logging.handlers.QueueListener(log_queue, *handlers,
+                                                                respect_handler_level=True)
+    configure_logging.listener.start()
+    return configure_logging.listener
+
+
+def stop_logging():
+    """Flush the queued records and stop the listener thread (registered with atexit)"""
+    listener = getattr(configure_logging, "listener", None)
+    if listener is not None and listener._thread is not None:
+        listener.stop()
+
+
+configure_logging()
 
 
 
 if __name__=="__main__":
     logging.info("Logging has started.")
-
+    sys.exit(0)
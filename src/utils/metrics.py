@@ -0,0 +1,311 @@
+import os
+import time
+import uuid
+import random
+import threading
+import contextvars
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.embeddings import Embeddings
+
+from src.utils.logger import logging
+from src.utils.profiling import enter_stage, exit_stage
+
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21)
+
+
+def _label_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: Tuple[Tuple[str, str], ...], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = ('{}="{}"'.format(k, v.replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str):
+        self.name, self.documentation = name, documentation
+        self._lock = threading.Lock()
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Gauge(Counter):
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name, self.documentation = name, documentation
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._series: Dict[tuple, Dict[str, Any]] = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            series["counts"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, series["counts"]):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, ('le', repr(float(bound))))} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', '+Inf'))} {series['count']}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {series['sum']}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series['count']}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Any] = {}
+
+    def _get_or_create(self, cls, name: str, documentation: str, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, documentation, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        return self._get_or_create(Counter, name, documentation)
+
+    def gauge(self, name: str, documentation: str) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation)
+
+    def histogram(self, name: str, documentation: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, buckets=buckets)
+
+    def render(self) -> str:
+        """Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+registry = MetricsRegistry()
+
+stage_latency = registry.histogram("chat_stage_latency_seconds", "Latency of each chat pipeline stage")
+request_latency = registry.histogram("chat_request_latency_seconds", "End-to-end latency of /chat requests")
+retrieved_documents = registry.histogram("chat_retrieved_documents", "Documents passed to the LLM per request",
+                                         buckets=COUNT_BUCKETS)
+llm_tokens = registry.counter("chat_llm_tokens_total", "Prompt and completion tokens of the LLM calls")
+cache_requests = registry.counter("chat_cache_requests_total", "Cache lookups by cache and result (hit/miss)")
+stage_errors = registry.counter("chat_stage_errors_total", "Failed chat pipeline stages")
+
+
+def record_cache(cache: str, hit: bool):
+    cache_requests.inc(cache=cache, result="hit" if hit else "miss")
+
+
+# ---------------- per-request traces ----------------
+
+class Trace:
+    def __init__(self, request_id: str, sampled: bool = True):
+        self.request_id = request_id
+        self.sampled = sampled
+        self.started = time.time()
+        self.spans: List[Dict[str, Any]] = []
+        self.attributes: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, stage: str, start: float, duration_s: float, **attributes):
+        with self._lock:
+            self.spans.append({"stage": stage,
+                               "offset_ms": round((start - self.started) * 1000, 3),
+                               "duration_ms": round(duration_s * 1000, 3),
+                               **attributes})
+
+    def stage_timings(self) -> Dict[str, float]:
+        """Total milliseconds per stage, for the structured request log"""
+        timings: Dict[str, float] = {}
+        with self._lock:
+            for s in self.spans:
+                timings[s["stage"]] = round(timings.get(s["stage"], 0.0) + s["duration_ms"], 3)
+        return timings
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"request_id": self.request_id, "started": self.started,
+                    "attributes": dict(self.attributes), "spans": list(self.spans)}
+
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("current_trace", default=None)
+recent_traces = deque(maxlen=int(os.getenv("TRACE_BUFFER_SIZE", "200")))
+trace_sample_rate = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+
+
+def start_trace(request_id: Optional[str] = None) -> Trace:
+    """
+    Start the trace of the current request. Every request collects its stage timings (for the
+    request log); only sampled ones (TRACE_SAMPLE_RATE) are kept for /debug/traces.
+    """
+    trace = Trace(request_id or uuid.uuid4().hex, sampled=random.random() < trace_sample_rate)
+    _current_trace.set(trace)
+    return trace
+
+
+def finish_trace(trace: Optional[Trace]):
+    if trace is not None and trace.sampled:
+        recent_traces.append(trace.to_dict())
+    _current_trace.set(None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(stage: str, **attributes):
+    """Time a block as a pipeline stage (histogram + span of the current trace + profiler stage tag)"""
+    start_wall, start = time.time(), time.perf_counter()
+    ident = enter_stage(stage)
+    try:
+        yield
+    except Exception:
+        stage_errors.inc(stage=stage)
+        raise
+    finally:
+        exit_stage(stage, ident)
+        duration = time.perf_counter() - start
+        stage_latency.observe(duration, stage=stage)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_span(stage, start_wall, duration, **attributes)
+
+
+# ---------------- langchain instrumentation ----------------
+
+class InstrumentedEmbeddings(Embeddings):
+    """Wraps an embedding client and times every call as the 'embed' stage"""
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+
+    def __getattr__(self, name):
+        return getattr(self.embeddings, name)
+
+    def embed_query(self, text: str) -> List[float]:
+        with span("embed"):
+            return self.embeddings.embed_query(text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with span("embed", documents=len(texts)):
+            return self.embeddings.embed_documents(texts)
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    Times the retriever, prompt and LLM runs of a chain invocation and counts retrieved
+    documents and tokens. Pass one per request: config={"callbacks": [MetricsCallbackHandler(trace)]}
+    """
+
+    def __init__(self, trace: Optional[Trace] = None):
+        self.trace = trace
+        self._starts: Dict[UUID, Tuple[str, float, float, int]] = {}
+
+    def _start(self, run_id: UUID, stage: str):
+        self._starts[run_id] = (stage, time.time(), time.perf_counter(), enter_stage(stage))
+
+    def _end(self, run_id: UUID, error: bool = False, **attributes):
+        started = self._starts.pop(run_id, None)
+        if started is None:
+            return
+        stage, start_wall, start, ident = started
+        exit_stage(stage, ident)
+        duration = time.perf_counter() - start
+        stage_latency.observe(duration, stage=stage)
+        if error:
+            stage_errors.inc(stage=stage)
+        if self.trace is not None:
+            self.trace.add_span(stage, start_wall, duration, **attributes)
+
+    def on_retriever_start(self, serialized, query, *, run_id, **kwargs):
+        self._start(run_id, "retrieve")
+
+    def on_retriever_end(self, documents, *, run_id, **kwargs):
+        retrieved_documents.observe(len(documents))
+        self._end(run_id, documents=len(documents))
+
+    def on_retriever_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=True)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name", "")
+        if str(name).endswith("PromptTemplate"):
+            self._start(run_id, "prompt")
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=True)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, "generate")
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        self._start(run_id, "generate")
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        prompt_tokens, completion_tokens = 0, 0
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        if usage:
+            prompt_tokens = usage.get("prompt_tokens", 0)
+            completion_tokens = usage.get("completion_tokens", 0)
+        else:
+            for generations in response.generations:
+                for generation in generations:
+                    metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                    prompt_tokens += metadata.get("input_tokens", 0)
+                    completion_tokens += metadata.get("output_tokens", 0)
+        llm_tokens.inc(prompt_tokens, type="prompt")
+        llm_tokens.inc(completion_tokens, type="completion")
+        self._end(run_id, prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error=True)
+        logging.error(f"LLM call failed: {str(error)}")
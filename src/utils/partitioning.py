@@ -0,0 +1,255 @@
+import os
+import re
+import sys
+import json
+import math
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from dataclasses import dataclass
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from src.utils.logger import logging
+from src.utils.exception import Custom_exception
+from src.utils.metrics import registry, span
+from src.utils.retrieval_utils import fit_context, query_with_vectors, tokenize
+
+
+@dataclass
+class PartitioningConfig:
+    enabled = os.getenv("INDEX_PARTITIONING", "true").lower() == "true"
+    key = os.getenv("INDEX_PARTITION_KEY", "Category")       # catalog column the index is split by
+    default_partition = "other"
+    min_confidence = float(os.getenv("PARTITION_MIN_CONFIDENCE", "0.8"))   # of the top partition, else search all
+    # naive bayes is overconfident on a word or two ("in black" -> 0.96 watches): shorter queries
+    # are only routed when they name a partition ("sarees")
+    min_terms = int(os.getenv("PARTITION_MIN_TERMS", "2"))
+    max_terms = 5000                                         # per partition, most frequent first
+
+
+partition_routes = registry.counter("chat_partition_routes_total",
+                                    "Queries by number of index partitions searched (1, 2, ... or all)")
+
+_SLUG_PATTERN = re.compile(r"[^a-z0-9]+")
+# raw file names are <prefix>_<category>.csv (data/hunnit_shirts.csv, data/data_sarees.csv)
+_FILE_PREFIXES = ("hunnit_", "data_")
+
+
+def partition_key(value: Any) -> str:
+    """Namespace-safe slug of a category ("Sports Bras" -> "sports-bras")"""
+    if value is None or (isinstance(value, float) and value != value):
+        return PartitioningConfig.default_partition
+    slug = _SLUG_PATTERN.sub("-", str(value).strip().lower()).strip("-")
+    return slug[:48] or PartitioningConfig.default_partition
+
+
+def category_from_path(path: str) -> str:
+    name = os.path.splitext(os.path.basename(str(path)))[0]
+    for prefix in _FILE_PREFIXES:
+        if name.startswith(prefix):
+            name = name[len(prefix):]
+    return name
+
+
+def document_partition(page_content: str, source: Optional[str] = None,
+                       config: Optional[PartitioningConfig] = None) -> str:
+    """Partition of a rendered catalog row: its category column, else the name of its source csv"""
+    config = config or PartitioningConfig()
+    prefix = f"{config.key}: "
+    for line in page_content.splitlines():
+        if line.startswith(prefix) and line[len(prefix):].strip() not in ("", "nan", "None", "na"):
+            return partition_key(line[len(prefix):])
+    return partition_key(category_from_path(source)) if source else config.default_partition
+
+
+def partition_namespace(namespace: Optional[str], partition: str) -> str:
+    return f"{namespace}--{partition}" if namespace else partition
+
+
+def _singular(term: str) -> str:
+    if len(term) > 4 and term.endswith(("ches", "shes", "xes", "sses")):
+        return term[:-2]
+    return term[:-1] if len(term) > 3 and term.endswith("s") and not term.endswith("ss") else term
+
+
+def _terms(text: str) -> List[str]:
+    # crude plural folding so "watch" finds the watches partition
+    return [_singular(t) for t in tokenize(text)]
+
+
+class PartitionRouter:
+    """
+    Cheap query -> partition classifier: multinomial naive Bayes over the words of each
+    partition's documents (and the partition name). Fitted while indexing, saved next to the
+    index pointer. `route` returns the most likely partition when its probability alone reaches
+    `min_confidence` and the query has `min_terms` known words (or names the partition), else
+    every partition: a wrong guess loses the results, searching them all only costs latency.
+    """
+
+    def __init__(self, config: Optional[PartitioningConfig] = None):
+        self.partitioning_config = config or PartitioningConfig()
+        self.counts: Dict[str, Dict[str, int]] = {}
+        self.totals: Dict[str, int] = {}
+        self.documents: Dict[str, int] = {}
+        self._vocabulary: Optional[set] = None
+
+    @property
+    def partitions(self) -> List[str]:
+        return sorted(self.documents)
+
+    def add(self, partition: str, text: str):
+        counts = self.counts.setdefault(partition, {})
+        if partition not in self.documents:
+            # the partition's own name counts as a strong hint
+            for term in _terms(partition.replace("-", " ")):
+                counts[term] = counts.get(term, 0) + 10
+                self.totals[partition] = self.totals.get(partition, 0) + 10
+        terms = _terms(text)
+        for term in terms:
+            counts[term] = counts.get(term, 0) + 1
+        self.totals[partition] = self.totals.get(partition, 0) + len(terms)
+        self.documents[partition] = self.documents.get(partition, 0) + 1
+        self._vocabulary = None
+
+    def fit(self, items: Iterable[Tuple[str, str]]) -> "PartitionRouter":
+        for partition, text in items:
+            self.add(partition, text)
+        return self
+
+    @property
+    def vocabulary(self) -> set:
+        if self._vocabulary is None:
+            self._vocabulary = {term for counts in self.counts.values() for term in counts}
+        return self._vocabulary
+
+    def known_terms(self, query: str) -> List[str]:
+        return [t for t in _terms(query) if t in self.vocabulary]
+
+    def probabilities(self, query: str) -> Dict[str, float]:
+        terms = self.known_terms(query)
+        if not terms or not self.documents:
+            return {}
+        total_docs = sum(self.documents.values())
+        vocabulary_size = len(self.vocabulary)
+        scores = {}
+        for partition, documents in self.documents.items():
+            counts, denominator = self.counts.get(partition, {}), self.totals.get(partition, 0) + vocabulary_size
+            scores[partition] = math.log(documents / total_docs) + sum(
+                math.log((counts.get(t, 0) + 1) / denominator) for t in terms)
+        top = max(scores.values())
+        exp = {p: math.exp(s - top) for p, s in scores.items()}
+        norm = sum(exp.values())
+        return {p: v / norm for p, v in exp.items()}
+
+    def route(self, query: str) -> List[str]:
+        config = self.partitioning_config
+        probabilities = self.probabilities(query)
+        if not probabilities:
+            return self.partitions
+        partition = max(probabilities, key=probabilities.get)
+        if probabilities[partition] < config.min_confidence:
+            return self.partitions
+        named = set(_terms(partition.replace("-", " "))) & set(_terms(query))
+        if len(self.known_terms(query)) < config.min_terms and not named:
+            return self.partitions
+        return [partition]
+
+    def to_dict(self) -> dict:
+        limit = self.partitioning_config.max_terms
+        return {"key": self.partitioning_config.key,
+                "partitions": {p: {"documents": self.documents[p],
+                                   "total": self.totals.get(p, 0),
+                                   "counts": dict(sorted(self.counts.get(p, {}).items(),
+                                                         key=lambda kv: kv[1], reverse=True)[:limit])}
+                               for p in self.partitions}}
+
+    @classmethod
+    def from_dict(cls, data: dict, config: Optional[PartitioningConfig] = None) -> "PartitionRouter":
+        router = cls(config)
+        for partition, model in data.get("partitions", {}).items():
+            router.documents[partition] = model["documents"]
+            router.totals[partition] = model["total"]
+            router.counts[partition] = dict(model["counts"])
+        return router
+
+    def save(self, path: str):
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f)
+            os.replace(tmp_path, path)
+            logging.info(f"Saved partition router ({len(self.documents)} partitions) to {path}")
+        except Exception as e:
+            logging.error(f"Error saving partition router: {str(e)}")
+            raise Custom_exception(e, sys)
+
+    @classmethod
+    def load(cls, path: str, config: Optional[PartitioningConfig] = None) -> "PartitionRouter":
+        try:
+            with open(path, encoding="utf-8") as f:
+                return cls.from_dict(json.load(f), config)
+        except Exception as e:
+            logging.error(f"Error loading partition router from {path}: {str(e)}")
+            raise Custom_exception(e, sys)
+
+
+class PartitionedRetriever(BaseRetriever):
+    """
+    Similarity search over a partitioned index: the query is embedded once, routed to one
+    partition namespace (all of them when the router is unsure) and the matches are merged
+    by score. Same k / score threshold / context budget semantics as ThresholdRetriever.
+    With a MultiStageRetriever, its threshold / MMR / re-rank stages run over the merged matches.
+    """
+
+    vector_store: Any
+    router: Any
+    namespaces: Dict[str, str]                  # partition -> namespace
+    k: int = 5
+    score_threshold: float = 0.7
+    max_context_tokens: int = 0
+    multi_stage: Any = None
+    include_values: bool = False
+
+    def _search(self, query_vector: List[float], namespace: str) -> List[Dict[str, Any]]:
+        if self.multi_stage is not None:
+            return query_with_vectors(self.vector_store, query_vector,
+                                      self.multi_stage.config.fetch_k, namespace=namespace)
+        return query_with_vectors(self.vector_store, query_vector, self.k, namespace=namespace,
+                                  include_values=self.include_values)
+
+    def retrieve_scored(self, query: str) -> Tuple[List[float], List[Dict[str, Any]]]:
+        with span("partition_route"):
+            partitions = [p for p in self.router.route(query) if p in self.namespaces] or list(self.namespaces)
+        searched_all = len(partitions) == len(self.namespaces)
+        partition_routes.inc(partitions="all" if searched_all and len(partitions) > 1 else str(len(partitions)))
+
+        query_vector = self.vector_store.embeddings.embed_query(query)
+        if len(partitions) == 1:
+            results = [self._search(query_vector, self.namespaces[partitions[0]])]
+        else:
+            # each search thread gets a copy of the request context (trace spans)
+            with ThreadPoolExecutor(max_workers=min(len(partitions), 8)) as executor:
+                futures = [executor.submit(contextvars.copy_context().run, self._search,
+                                           query_vector, self.namespaces[p]) for p in partitions]
+                results = [future.result() for future in futures]
+
+        matches = sorted((m for result in results for m in result), key=lambda m: m["score"], reverse=True)
+        if self.multi_stage is not None:
+            selected = self.multi_stage.select_scored(query, query_vector, matches[:self.multi_stage.config.fetch_k])
+        else:
+            selected = fit_context([m for m in matches if m["score"] >= self.score_threshold][:self.k],
+                                   self.max_context_tokens)
+        logging.info(f"Searched partitions {partitions}, kept {len(selected)} documents")
+        return query_vector, selected
+
+    def _get_relevant_documents(self, query: str, *,
+                                run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        try:
+            return [match["document"] for match in self.retrieve_scored(query)[1]]
+        except Exception as e:
+            logging.error(f"Error in partitioned retrieval: {str(e)}")
+            raise Custom_exception(e, sys)
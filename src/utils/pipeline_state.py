@@ -0,0 +1,85 @@
+import os
+import sys
+import glob
+import json
+import hashlib
+from typing import Any, Iterable, Optional
+from dataclasses import dataclass
+
+from src.utils.logger import logging
+from src.utils.exception import Custom_exception
+
+
+@dataclass
+class PipelineStateConfig:
+    is_airflow = os.getenv("IS_AIRFLOW", "false").lower() == "true"
+    if is_airflow:
+        path = "/opt/airflow/artifacts/pipeline_state"
+    else:
+        path = "artifacts/pipeline_state"
+
+
+def fingerprint_files(paths: Iterable[str], chunk_size: int = 1 << 20) -> Optional[str]:
+    """sha256 over the names and contents of the files (sorted), None when there are none"""
+    paths = sorted(p for p in paths if os.path.isfile(p))
+    if not paths:
+        return None
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(os.path.basename(path).encode("utf-8"))
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fingerprint_dir(path: str, pattern: str = "*.csv") -> Optional[str]:
+    return fingerprint_files(glob.glob(os.path.join(path, pattern)))
+
+
+def fingerprint_value(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class PipelineState:
+    """
+    Fingerprints of the inputs of the last successful pipeline stages. One small json file per
+    key, replaced atomically, so mapped Airflow tasks on different workers never clobber each other.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or PipelineStateConfig().path
+
+    def _file(self, key: str) -> str:
+        safe_key = "".join(c if c.isalnum() or c in "-_." else "_" for c in key)
+        return os.path.join(self.path, f"{safe_key}.json")
+
+    def get(self, key: str) -> Optional[dict]:
+        try:
+            with open(self._file(key), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # a corrupt state file only costs a rebuild
+            logging.error(f"Could not read pipeline state '{key}': {str(e)}")
+            return None
+
+    def get_fingerprint(self, key: str) -> Optional[str]:
+        return (self.get(key) or {}).get("fingerprint")
+
+    def set(self, key: str, fingerprint: Optional[str], **extra):
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            path = self._file(key)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"fingerprint": fingerprint, **extra}, f)
+            os.replace(tmp_path, path)
+            logging.info(f"Recorded pipeline state '{key}': {fingerprint}")
+        except Exception as e:
+            logging.error(f"Error saving pipeline state '{key}': {str(e)}")
+            raise Custom_exception(e, sys)
+
+    def changed(self, key: str, fingerprint: Optional[str]) -> bool:
+        return fingerprint is None or self.get_fingerprint(key) != fingerprint
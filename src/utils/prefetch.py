@@ -0,0 +1,227 @@
+import os
+import re
+import sys
+import time
+import uuid
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from dataclasses import dataclass
+
+import numpy as np
+from pydantic import Field
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from src.utils.logger import logging
+from src.utils.exception import Custom_exception
+from src.utils.conversation import get_session
+from src.utils.metrics import current_trace, registry, span
+from src.utils.rate_limit import TokenBucket
+from src.utils.retrieval_utils import tokenize
+from src.utils.shared_state import SharedCache, cache_key
+
+
+@dataclass
+class PrefetchConfig:
+    enabled = os.getenv("PREFETCH_ENABLED", "true").lower() == "true"
+    ttl = float(os.getenv("PREFETCH_TTL_SECONDS", "60"))                 # a speculative retrieval stays usable
+    min_chars = int(os.getenv("PREFETCH_MIN_CHARS", "8"))                # shorter partial input is not searched
+    min_similarity = float(os.getenv("PREFETCH_MIN_SIMILARITY", "0.75"))  # word overlap with the final question,
+                                                                          # which must contain every prefetched word
+    # per worker: prefetches never queue, over a limit they are dropped
+    session_rate = float(os.getenv("PREFETCH_SESSION_RATE", "1"))        # prefetches/s per session
+    session_burst = float(os.getenv("PREFETCH_SESSION_BURST", "3"))
+    max_concurrent = int(os.getenv("PREFETCH_MAX_CONCURRENT", "2"))
+    session_idle = 600
+
+
+prefetches = registry.counter("chat_prefetch_total",
+                              "Speculative retrievals by outcome (stored, cached, cancelled, rate_limited, busy, "
+                              "skipped) and their use by /chat (hit, miss)")
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+# price bounds change the results, unlike the retriever's stopwords they are compared
+_PRICE_WORDS = {"under", "below", "above"}
+
+
+def _terms(text: str) -> set:
+    return tokenize(text) | (set(_WORD_PATTERN.findall(text.lower())) & _PRICE_WORDS)
+
+
+def query_similarity(prefetched: str, question: str) -> float:
+    """
+    Word overlap (jaccard) of a prefetched input and the final question, 0 unless the question
+    contains every prefetched word: one word apart ("red" / "blue", "500" / "5000") is another
+    search. The prefetched input was typed text, its last word may be unfinished
+    ("red sar" -> "red saree"); numbers are never completed.
+    """
+    if " ".join(prefetched.lower().split()) == " ".join(question.lower().split()):
+        return 1.0
+    prefetched_terms, question_terms = _terms(prefetched), _terms(question)
+    words = _WORD_PATTERN.findall(prefetched.lower())
+    if words and words[-1].isalpha() and words[-1] in prefetched_terms and words[-1] not in question_terms:
+        completions = sorted(term for term in question_terms if term.startswith(words[-1]))
+        if completions:
+            prefetched_terms = (prefetched_terms - {words[-1]}) | {completions[0]}
+    if not prefetched_terms <= question_terms:
+        return 0.0
+    return len(prefetched_terms) / len(question_terms) if question_terms else 0.0
+
+
+class PrefetchedRetriever(BaseRetriever):
+    """
+    Serves retrievals prefetched while the user was typing: prefetch() embeds and searches a
+    session's partial input ahead of time and keeps the result in the shared cache for `ttl`;
+    when the question arrives and closely matches it, retrieve_scored returns it without an
+    embedding call or a vector search. Tied to the index version (namespace) like the
+    conversation cache. `base` is any retriever with retrieve_scored(query).
+    """
+
+    base: Any
+    namespace: Optional[str] = None
+    cache: Any = None
+    prefetch_config: PrefetchConfig = Field(default_factory=PrefetchConfig)
+
+    def model_post_init(self, __context: Any):
+        if self.cache is None:
+            self.cache = SharedCache("prefetch")
+
+    def load(self, session: str) -> Optional[dict]:
+        entry = self.cache.get(cache_key(session))
+        if entry is not None and entry["namespace"] != self.namespace:
+            return None         # prefetched from another index version
+        return entry
+
+    def prefetch(self, session: str, query: str, is_current: Callable[[], bool]) -> str:
+        """Speculative retrieval for `query`, abandoned between stages once `is_current()` is false"""
+        try:
+            # the embedding lands in the shared query embedding cache, so the search below reuses it
+            with span("prefetch_embed"):
+                self.base.vector_store.embeddings.embed_query(query)
+            if not is_current():
+                return "cancelled"
+            with span("prefetch_search"):
+                query_vector, matches = self.base.retrieve_scored(query)
+            if not is_current():
+                return "cancelled"
+            documents = [{"page_content": m["document"].page_content, "metadata": m["document"].metadata,
+                          "score": m["score"],
+                          "values": None if m.get("values") is None else np.asarray(m["values"], dtype=np.float32)}
+                         for m in matches]
+            entry = {"namespace": self.namespace, "query": query,
+                     "query_vector": np.asarray(query_vector, dtype=np.float32), "documents": documents}
+            self.cache.set(cache_key(session), entry, self.prefetch_config.ttl)
+            return "stored"
+        except Exception as e:
+            logging.error(f"Error in prefetch retrieval: {str(e)}")
+            raise Custom_exception(e, sys)
+
+    def take(self, session: str, query: str) -> Optional[Tuple[List[float], List[Dict[str, Any]]]]:
+        """The prefetched retrieval if it was for this question. Used at most once, hit or miss"""
+        entry = self.load(session)
+        if entry is None:
+            return None
+        # the question is final: the entry must not answer a later, different one of the session
+        self.cache.delete(cache_key(session))
+        similarity = query_similarity(entry["query"], query)
+        outcome = "hit" if similarity >= self.prefetch_config.min_similarity else "miss"
+        prefetches.inc(outcome=outcome)
+        trace = current_trace()
+        if trace is not None:
+            trace.attributes["prefetch"] = outcome
+        if outcome == "miss":
+            return None
+        matches = [{"document": Document(page_content=doc["page_content"], metadata=doc["metadata"]),
+                    "score": doc["score"], "values": doc["values"]} for doc in entry["documents"]]
+        return entry["query_vector"].tolist(), matches
+
+    def retrieve_scored(self, query: str) -> Tuple[List[float], List[Dict[str, Any]]]:
+        session = get_session()
+        prefetched = self.take(session, query) if session is not None else None
+        return prefetched if prefetched is not None else self.base.retrieve_scored(query)
+
+    def _get_relevant_documents(self, query: str, *,
+                                run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        try:
+            return [match["document"] for match in self.retrieve_scored(query)[1]]
+        except Exception as e:
+            logging.error(f"Error in prefetched retrieval: {str(e)}")
+            raise Custom_exception(e, sys)
+
+
+class SpeculativePrefetcher:
+    """
+    Guards the prefetch endpoint so typing can't amplify load:
+      - a token bucket per client (a debounced widget sends about one prefetch per pause)
+      - at most `max_concurrent` prefetches per worker, extra ones are dropped, never queued,
+        and none while `overloaded()` (e.g. /chat requests are waiting for the LLM)
+      - input that won't reach the retriever (`skip(text)`: router answers, follow-ups) is ignored
+      - the same input twice is answered from the cache
+      - a newer prefetch or the session's /chat cancels the older one between its stages
+        (latest prefetch id per session in the shared cache, so it works across workers)
+    `retriever` returns the PrefetchedRetriever of the chain currently served (None: disabled).
+    """
+
+    def __init__(self, retriever: Callable[[], Optional[PrefetchedRetriever]],
+                 skip: Optional[Callable[[str], bool]] = None, overloaded: Optional[Callable[[], bool]] = None,
+                 config: Optional[PrefetchConfig] = None):
+        self.retriever = retriever
+        self.skip = skip or (lambda text: False)
+        self.overloaded = overloaded or (lambda: False)
+        self.prefetch_config = config or PrefetchConfig()
+        self.latest = SharedCache("prefetch_latest")
+        self._slots = threading.BoundedSemaphore(max(self.prefetch_config.max_concurrent, 1))
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, list] = {}         # client -> [bucket, last seen]
+        self._checks = 0
+
+    def _allow(self, client: str) -> bool:
+        config = self.prefetch_config
+        if config.session_rate <= 0:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            entry = self._buckets.get(client)
+            if entry is None:
+                entry = self._buckets[client] = [TokenBucket(config.session_rate, config.session_burst), now]
+            entry[1] = now
+            self._checks += 1
+            if self._checks % 1000 == 0:
+                idle = [s for s, (_, seen) in self._buckets.items() if now - seen > config.session_idle]
+                for s in idle:
+                    del self._buckets[s]
+        return entry[0].try_acquire()
+
+    def cancel(self, session: str):
+        """Abandon the session's prefetch in flight (the question was sent)"""
+        if self.prefetch_config.enabled:
+            self.latest.set(cache_key(session), None, self.prefetch_config.ttl)
+
+    def prefetch(self, session: str, text: str, client: Optional[str] = None) -> str:
+        """Speculative retrieval of a session's partial input, rate limited per `client` (default: the session)"""
+        config = self.prefetch_config
+        retriever = self.retriever() if config.enabled else None
+        text = " ".join(text.split())
+        if retriever is None:
+            outcome = "disabled"
+        elif len(text) < config.min_chars or self.skip(text):
+            outcome = "skipped"
+        else:
+            entry = retriever.load(session)
+            if entry is not None and " ".join(entry["query"].lower().split()) == text.lower():
+                outcome = "cached"
+            elif not self._allow(client or session):
+                outcome = "rate_limited"
+            elif self.overloaded() or not self._slots.acquire(blocking=False):
+                outcome = "busy"
+            else:
+                try:
+                    token = uuid.uuid4().hex
+                    key = cache_key(session)
+                    self.latest.set(key, token, config.ttl)
+                    outcome = retriever.prefetch(session, text, lambda: self.latest.get(key) == token)
+                finally:
+                    self._slots.release()
+        prefetches.inc(outcome=outcome)
+        return outcome
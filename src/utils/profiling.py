@@ -0,0 +1,333 @@
+import os
+import sys
+import hmac
+import json
+import time
+import threading
+import functools
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from dataclasses import dataclass
+
+from src.utils.logger import logging
+from src.utils.exception import Custom_exception
+
+
+@dataclass
+class ProfilingConfig:
+    is_airflow = os.getenv("IS_AIRFLOW", "false").lower() == "true"
+    if is_airflow:
+        output_dir = os.getenv("PROFILE_DIR", "/opt/airflow/artifacts/profiles")
+    else:
+        output_dir = os.getenv("PROFILE_DIR", "artifacts/profiles")
+    interval_ms = float(os.getenv("PROFILE_INTERVAL_MS", "10"))          # wall clock sampling period
+    memory = os.getenv("PROFILE_MEMORY", "false").lower() == "true"      # tracemalloc snapshots, opt-in: ~5x slower code
+    tracemalloc_frames = int(os.getenv("PROFILE_TRACEMALLOC_FRAMES", "1"))
+    token = os.getenv("PROFILER_TOKEN")                                  # admin endpoint is off without it
+    max_requests = 1000
+    max_seconds = float(os.getenv("PROFILE_MAX_SECONDS", "600"))         # a request profile never runs longer
+    tasks = [t.strip() for t in os.getenv("PROFILE_TASKS", "").split(",") if t.strip()]   # DAG task ids or "all"
+    top = 25
+    max_depth = 128
+
+
+# ---------------- stage tags ----------------
+# thread id -> stages it is in (outermost first); kept up to date by span() and the chain callbacks
+# all the time (one list append / pop), so a profile started mid-request still sees its stages
+_stages: Dict[int, List[str]] = {}
+
+
+def enter_stage(stage: str) -> int:
+    ident = threading.get_ident()
+    _stages.setdefault(ident, []).append(stage)
+    return ident
+
+
+def exit_stage(stage: str, ident: Optional[int] = None):
+    """Leave `stage` on the thread it was entered on (callbacks may end a run on another thread)"""
+    ident = threading.get_ident() if ident is None else ident
+    stack = _stages.get(ident)
+    if not stack:
+        return
+    for i in range(len(stack) - 1, -1, -1):
+        if stack[i] == stage:
+            del stack[i]
+            break
+    if not stack:
+        _stages.pop(ident, None)
+
+
+@contextmanager
+def stage(name: str):
+    """Tag the samples of a block with a pipeline stage (scrape, clean, load, embed, upsert, ...)"""
+    ident = enter_stage(name)
+    try:
+        yield
+    finally:
+        exit_stage(name, ident)
+
+
+def in_stage(name: str, func: Callable) -> Callable:
+    """`func` tagged with a stage wherever it runs, e.g. as the target of a pipeline thread"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with stage(name):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+# ---------------- sampling profiler ----------------
+
+class SamplingProfiler:
+    """
+    Wall clock sampling profiler: a background thread reads every thread's stack
+    (sys._current_frames) each `interval_ms` and counts collapsed stacks, prefixed with the
+    thread's stage tags ("[chat];[retrieve];[embed];app.py:chat;..."), the flamegraph.pl /
+    speedscope input format. Apart from the stage tags nothing runs in the profiled code, the
+    overhead is the sampler's own time (reported) and stops with it. Optionally tracemalloc
+    snapshots of the top allocation sites. Untagged daemon threads (log writer, watchers) are
+    left out; `tagged_only` samples only threads inside a stage (the app's request threads).
+    """
+
+    def __init__(self, label: str, tagged_only: bool = False, interval_ms: Optional[float] = None,
+                 memory: Optional[bool] = None, config: Optional[ProfilingConfig] = None):
+        self.profiling_config = config or ProfilingConfig()
+        self.label = label
+        self.tagged_only = tagged_only
+        self.interval = (interval_ms or self.profiling_config.interval_ms) / 1000
+        self.memory = self.profiling_config.memory if memory is None else memory
+        self.stacks: Counter = Counter()
+        self.stage_samples: Counter = Counter()
+        self.samples = 0
+        self.sampling_time = 0.0
+        self._labels: Dict[Any, str] = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._started_tracemalloc = False
+        self._baseline = None
+        self.started = None
+        self.duration = 0.0
+
+    def _frame_label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            path = code.co_filename
+            if "site-packages" in path:
+                path = path.split("site-packages" + os.sep, 1)[-1]
+            elif path.startswith(os.getcwd()):
+                path = os.path.relpath(path)
+            label = self._labels[code] = f"{code.co_name} ({path}:{code.co_firstlineno})".replace(";", ",")
+        return label
+
+    def _sample(self, own: int):
+        daemons = None
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stages = list(_stages.get(ident) or ())
+            if not stages:
+                if self.tagged_only:
+                    continue
+                if daemons is None:
+                    daemons = {t.ident for t in threading.enumerate() if t.daemon}
+                if ident in daemons:
+                    continue
+            stack = []
+            while frame is not None and len(stack) < self.profiling_config.max_depth:
+                stack.append(self._frame_label(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            self.stacks[";".join([f"[{s}]" for s in stages or ["untagged"]] + stack)] += 1
+            self.stage_samples[stages[-1] if stages else "untagged"] += 1
+        self.samples += 1
+
+    def _run(self):
+        own = threading.get_ident()
+        next_sample = time.perf_counter()
+        while not self._stop.wait(max(next_sample - time.perf_counter(), 0)):
+            start = time.perf_counter()
+            self._sample(own)
+            self.sampling_time += time.perf_counter() - start
+            next_sample = max(next_sample + self.interval, time.perf_counter())
+
+    def start(self) -> "SamplingProfiler":
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.profiling_config.tracemalloc_frames)
+                self._started_tracemalloc = True
+            self._baseline = tracemalloc.take_snapshot()
+        self.started = datetime.now()
+        self._start = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        logging.info(f"Profiling {self.label} every {self.interval * 1000:g} ms")
+        return self
+
+    def _memory_report(self) -> Dict[str, Any]:
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)])
+        top = self.profiling_config.top
+        current = snapshot.statistics("lineno")[:top]
+        growth = snapshot.compare_to(self._baseline, "lineno")[:top]
+        traced, peak = tracemalloc.get_traced_memory()
+        return {
+            "traced_mb": round(traced / 1e6, 2), "peak_mb": round(peak / 1e6, 2),
+            "top": [{"site": str(s.traceback), "size_kb": round(s.size / 1024, 1), "count": s.count} for s in current],
+            "growth": [{"site": str(s.traceback), "size_diff_kb": round(s.size_diff / 1024, 1),
+                        "count_diff": s.count_diff} for s in growth if s.size_diff > 0],
+        }
+
+    def stop(self) -> Dict[str, Any]:
+        """Stop sampling and write <label>-<timestamp>.{collapsed,json,memory.txt} to the output dir"""
+        try:
+            self._stop.set()
+            if self._thread is not None:
+                self._thread.join()
+            self.duration = time.perf_counter() - self._start
+            memory = None
+            if self.memory:
+                memory = self._memory_report()
+                if self._started_tracemalloc:
+                    tracemalloc.stop()
+            return self.write(memory)
+        except Exception as e:
+            logging.error(f"Error stopping the profiler: {str(e)}")
+            raise Custom_exception(e, sys)
+
+    def summary(self, memory: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        total = sum(self.stacks.values()) or 1
+        own, inclusive = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = [f for f in stack.split(";") if not f.startswith("[")]
+            if frames:
+                own[frames[-1]] += count
+            for frame in set(frames):
+                inclusive[frame] += count
+        top = self.profiling_config.top
+        return {
+            "label": self.label,
+            "started": self.started.isoformat(timespec="seconds"),
+            "duration_s": round(self.duration, 3),
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "thread_samples": total,
+            "overhead_pct": round(100 * self.sampling_time / max(self.duration, 1e-9), 2),
+            "stages": {s: {"samples": c, "share": round(c / total, 3)} for s, c in self.stage_samples.most_common()},
+            "top_self": [{"frame": f, "share": round(c / total, 3)} for f, c in own.most_common(top)],
+            "top_inclusive": [{"frame": f, "share": round(c / total, 3)} for f, c in inclusive.most_common(top)],
+            "memory": memory,
+        }
+
+    def write(self, memory: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        output_dir = self.profiling_config.output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        base = os.path.join(output_dir, f"{self.label}-{self.started:%Y%m%d-%H%M%S}-{os.getpid()}")
+        summary = self.summary(memory)
+        summary["files"] = {"collapsed": f"{base}.collapsed", "summary": f"{base}.json"}
+
+        with open(f"{base}.collapsed", "w") as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+        if memory is not None:
+            summary["files"]["memory"] = f"{base}.memory.txt"
+            with open(f"{base}.memory.txt", "w") as f:
+                f.write(f"traced {memory['traced_mb']} MB, peak {memory['peak_mb']} MB\n\ntop allocation sites:\n")
+                f.writelines(f"{m['size_kb']:>12} KB {m['count']:>9}  {m['site']}\n" for m in memory["top"])
+                f.write("\ngrowth since the profile started:\n")
+                f.writelines(f"{m['size_diff_kb']:>+12} KB {m['count_diff']:>+9}  {m['site']}\n" for m in memory["growth"])
+        with open(f"{base}.json", "w") as f:
+            json.dump(summary, f, indent=2)
+
+        stages = ", ".join(f"{s} {v['share']:.0%}" for s, v in summary["stages"].items())
+        logging.info(f"Profile {self.label}: {self.samples} samples in {summary['duration_s']} s "
+                     f"(overhead {summary['overhead_pct']}%), stages: {stages}, written to {base}.*")
+        return summary
+
+
+@contextmanager
+def profile_run(label: str, enabled: bool = True, **kwargs):
+    """Profile a whole block (one src/main.py run, one DAG task)"""
+    if not enabled:
+        yield None
+        return
+    profiler = SamplingProfiler(label, **kwargs).start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+
+
+def profiled(func: Callable, task_id: str) -> Callable:
+    """DAG task callable, profiled when its task id (or "all") is in PROFILE_TASKS"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        tasks = ProfilingConfig().tasks
+        with profile_run(f"task-{task_id}", enabled=task_id in tasks or "all" in tasks):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+class RequestProfiler:
+    """
+    Profiles the next `requests` requests of this worker process (admin endpoint), then writes
+    the profile in the background. One profile at a time, stopped after `max_seconds` at the latest.
+    """
+
+    def __init__(self, config: Optional[ProfilingConfig] = None):
+        self.profiling_config = config or ProfilingConfig()
+        self._lock = threading.Lock()
+        self._profiler: Optional[SamplingProfiler] = None
+        self._remaining = 0
+        self._timer = None
+        self.last: Optional[Dict[str, Any]] = None
+
+    def authorized(self, token: Optional[str]) -> bool:
+        expected = self.profiling_config.token
+        return bool(expected and token and hmac.compare_digest(expected.encode(), token.encode()))
+
+    def start(self, requests: int, max_seconds: Optional[float] = None, interval_ms: Optional[float] = None,
+              memory: Optional[bool] = None) -> Dict[str, Any]:
+        config = self.profiling_config
+        requests = max(1, min(int(requests), config.max_requests))
+        max_seconds = min(float(max_seconds or config.max_seconds), config.max_seconds)
+        with self._lock:
+            if self._profiler is not None:
+                raise RuntimeError("A profile is already running")
+            self._profiler = SamplingProfiler(f"requests-{requests}", tagged_only=True,
+                                              interval_ms=interval_ms, memory=memory, config=config).start()
+            self._remaining = requests
+            self._timer = threading.Timer(max_seconds, self.finish)
+            self._timer.daemon = True
+            self._timer.start()
+        return self.status()
+
+    def request_done(self):
+        if self._profiler is None:
+            return
+        with self._lock:
+            self._remaining -= 1
+            done = self._remaining == 0
+        if done:
+            # writing the snapshot takes a moment, not on the request thread
+            threading.Thread(target=self.finish, name="profile-writer", daemon=True).start()
+
+    def finish(self):
+        with self._lock:
+            profiler, self._profiler = self._profiler, None
+            if self._timer is not None:
+                self._timer.cancel()
+        if profiler is not None:
+            try:
+                self.last = profiler.stop()
+            except Exception as e:
+                logging.error(f"Request profile failed: {str(e)}")
+
+    def status(self) -> Dict[str, Any]:
+        running = self._profiler
+        return {"running": running is not None,
+                "remaining_requests": self._remaining if running is not None else 0,
+                "samples": running.samples if running is not None else 0,
+                "last": self.last}
@@ -0,0 +1,52 @@
+import time
+import threading
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens are added per second up to `capacity`.
+    A rate of 0 (or less) means unlimited.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """Take tokens if available, never blocks"""
+        if self.rate <= 0:
+            return True
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Seconds until `tokens` would be available (0 if they are available now)"""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            return max(tokens - self._tokens, 0.0) / self.rate
+
+    def acquire(self, tokens: float = 1.0, timeout: Optional[float] = None) -> bool:
+        """Block until tokens are available or `timeout` seconds have passed"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.try_acquire(tokens):
+            delay = self.wait_time(tokens)
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or delay > remaining:
+                    return False
+            time.sleep(max(delay, 0.001))
+        return True
@@ -0,0 +1,322 @@
+import os
+import re
+import sys
+import json
+import math
+from typing import Any, Dict, List, Optional, Tuple
+from dataclasses import asdict, dataclass, field, fields
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import Field
+
+from src.utils.logger import logging
+from src.utils.exception import Custom_exception
+from src.utils.metrics import span
+
+
+@dataclass
+class RetrievalConfig:
+    """
+    Settings of the multi-stage retriever:
+      over-fetch `fetch_k` candidates -> drop the ones under `score_threshold` (relevance score)
+      -> MMR down to `mmr_k` -> (optional) local re-rank -> pass `k` documents on
+    """
+    k: int = 4
+    fetch_k: int = 25
+    mmr_k: int = 8
+    lambda_mult: float = 0.6
+    score_threshold: float = 0.7
+    rerank: bool = True
+    relevance_weight: float = 0.6
+    lexical_weight: float = 0.3
+    prior_weight: float = 0.1
+    max_context_tokens: int = 0      # budget of the documents passed to the LLM, 0 = no budget
+
+
+RETRIEVAL_CONFIG_PATH = os.getenv("RETRIEVAL_CONFIG_PATH", os.path.join("config", "retrieval.json"))
+
+
+@dataclass
+class RetrievalProfile:
+    """
+    Retrieval settings the app serves with: strategy ("threshold" = top k over the score
+    threshold, "multi_stage" = MultiStageRetriever) and its RetrievalConfig. Tuned offline by
+    benchmarks/retrieval_tuning.py and exported to config/retrieval.json with a version number
+    and the evaluation it was picked from; without the file the old hard-coded settings are used.
+    """
+    version: int = 0
+    strategy: str = "threshold"
+    config: RetrievalConfig = field(default_factory=lambda: RetrievalConfig(k=5))
+    evaluation: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def multi_stage(self) -> bool:
+        return self.strategy == "multi_stage"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"version": self.version, "strategy": self.strategy,
+                "retrieval": asdict(self.config), "evaluation": self.evaluation}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RetrievalProfile":
+        known = {f.name for f in fields(RetrievalConfig)}
+        config = RetrievalConfig(**{key: value for key, value in data.get("retrieval", {}).items() if key in known})
+        return cls(version=int(data.get("version", 0)), strategy=data.get("strategy", "threshold"),
+                   config=config, evaluation=data.get("evaluation", {}))
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "RetrievalProfile":
+        path = path or RETRIEVAL_CONFIG_PATH
+        try:
+            with open(path, encoding="utf-8") as f:
+                profile = cls.from_dict(json.load(f))
+            logging.info(f"Loaded retrieval config v{profile.version} ({profile.strategy}) from {path}")
+            return profile
+        except FileNotFoundError:
+            logging.info(f"No retrieval config at {path}, using the default settings")
+            return cls()
+        except Exception as e:
+            logging.error(f"Error loading retrieval config: {str(e)}")
+            raise Custom_exception(e, sys)
+
+    def save(self, path: Optional[str] = None):
+        path = path or RETRIEVAL_CONFIG_PATH
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.to_dict(), f, indent=2)
+                f.write("\n")
+            logging.info(f"Saved retrieval config v{self.version} to {path}")
+        except Exception as e:
+            logging.error(f"Error saving retrieval config: {str(e)}")
+            raise Custom_exception(e, sys)
+
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+_RATING_PATTERN = re.compile(r"Rating:\s*([0-9.]+)")
+_RATING_COUNT_PATTERN = re.compile(r"Rating Count:\s*([0-9,]+)")
+
+# words that carry no signal for lexical overlap between a question and a product row
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "for", "of", "in", "on", "to", "with", "me", "my", "i",
+    "is", "are", "do", "you", "have", "any", "some", "show", "want", "need", "under",
+    "below", "above", "what", "which", "can", "please", "give", "suggest", "recommend",
+}
+
+
+def tokenize(text: str) -> set:
+    """Lower-cased word tokens of a text without stopwords"""
+    return {tok for tok in _TOKEN_PATTERN.findall(str(text).lower()) if tok not in _STOPWORDS}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count of a text (~4 characters per token)"""
+    return max(1, len(str(text)) // 4)
+
+
+def fit_context(matches: List[Dict[str, Any]], max_tokens: int) -> List[Dict[str, Any]]:
+    """Best matches first, until the documents' tokens reach `max_tokens` (always keeps the first)"""
+    if max_tokens <= 0:
+        return matches
+    kept, used = [], 0
+    for match in matches:
+        tokens = estimate_tokens(match["document"].page_content)
+        if kept and used + tokens > max_tokens:
+            break
+        kept.append(match)
+        used += tokens
+    return kept
+
+
+def maximal_marginal_relevance(query_vector: np.ndarray, doc_vectors: np.ndarray,
+                               k: int, lambda_mult: float = 0.5) -> List[int]:
+    """
+    Select `k` indices of `doc_vectors` that are relevant to the query but not redundant
+    with each other. Similarities are computed once as matrices; each selection step only
+    updates a running max-similarity vector instead of re-scoring every pair.
+    """
+    doc_vectors = np.asarray(doc_vectors, dtype=np.float32)
+    if doc_vectors.ndim != 2 or doc_vectors.shape[0] == 0 or k <= 0:
+        return []
+
+    k = min(k, doc_vectors.shape[0])
+    query_vector = np.asarray(query_vector, dtype=np.float32).reshape(-1)
+
+    # cosine similarity = dot product of l2 normalized vectors
+    doc_norms = np.linalg.norm(doc_vectors, axis=1, keepdims=True)
+    doc_unit = doc_vectors / np.where(doc_norms == 0, 1.0, doc_norms)
+    query_norm = np.linalg.norm(query_vector)
+    query_unit = query_vector / (query_norm if query_norm else 1.0)
+
+    relevance = doc_unit @ query_unit            # (n,)
+    pairwise = doc_unit @ doc_unit.T             # (n, n)
+
+    selected = [int(np.argmax(relevance))]
+    max_redundancy = pairwise[selected[0]].copy()
+    available = np.ones(doc_vectors.shape[0], dtype=bool)
+    available[selected[0]] = False
+
+    while len(selected) < k:
+        mmr_scores = lambda_mult * relevance - (1 - lambda_mult) * max_redundancy
+        mmr_scores[~available] = -np.inf
+        idx = int(np.argmax(mmr_scores))
+        selected.append(idx)
+        available[idx] = False
+        np.maximum(max_redundancy, pairwise[idx], out=max_redundancy)
+
+    return selected
+
+
+def popularity_prior(text: str) -> float:
+    """Prior in [0, 1] from the rating and rating count written in a product row"""
+    rating_match = _RATING_PATTERN.search(text)
+    count_match = _RATING_COUNT_PATTERN.search(text)
+    try:
+        rating = float(rating_match.group(1)) / 5.0 if rating_match else 0.0
+    except ValueError:
+        rating = 0.0
+    try:
+        count = float(count_match.group(1).replace(",", "")) if count_match else 0.0
+    except ValueError:
+        count = 0.0
+    # log damped count, saturating around 100k ratings
+    confidence = min(math.log1p(count) / math.log1p(100000), 1.0)
+    return rating * (0.5 + 0.5 * confidence)
+
+
+def local_rerank(query: str, candidates: List[Tuple[Document, float]],
+                 config: RetrievalConfig) -> List[Tuple[Document, float]]:
+    """
+    Cheap local re-ranking: weighted sum of vector relevance, lexical overlap between the
+    question and the product row, and a rating/popularity prior.
+    """
+    query_tokens = tokenize(query)
+    rescored = []
+    for doc, relevance in candidates:
+        doc_tokens = tokenize(doc.page_content)
+        overlap = len(query_tokens & doc_tokens) / len(query_tokens) if query_tokens else 0.0
+        score = (config.relevance_weight * relevance
+                 + config.lexical_weight * overlap
+                 + config.prior_weight * popularity_prior(doc.page_content))
+        rescored.append((doc, score))
+    rescored.sort(key=lambda pair: pair[1], reverse=True)
+    return rescored
+
+
+def query_with_vectors(vector_store: Any, query_vector: List[float],
+                       top_k: int, namespace: Optional[str] = None,
+                       include_values: bool = True) -> List[Dict[str, Any]]:
+    """
+    Query the pinecone index behind a langchain vector store and return the matches
+    together with their stored vectors (the langchain search methods drop the vectors).
+    Scores are relevance scores of the vector store (cosine s -> (s + 1) / 2), the scale every
+    score_threshold is given in, like as_retriever(search_type="similarity_score_threshold").
+    """
+    index = vector_store._index
+    text_key = vector_store._text_key
+    namespace = namespace if namespace is not None else getattr(vector_store, "_namespace", None)
+    relevance = vector_store._select_relevance_score_fn()
+
+    with span("search", top_k=top_k):
+        results = index.query(vector=list(query_vector),
+                              top_k=top_k,
+                              include_values=include_values,
+                              include_metadata=True,
+                              namespace=namespace)
+
+    matches = []
+    for match in results["matches"]:
+        metadata = dict(match.get("metadata") or {})
+        text = metadata.pop(text_key, None)
+        if text is None:
+            logging.warning(f"Found match without '{text_key}' key in metadata: {match.get('id')}")
+            continue
+        matches.append({
+            "id": match.get("id"),
+            "score": relevance(float(match["score"])),
+            "values": match.get("values"),
+            "document": Document(page_content=text, metadata=metadata),
+        })
+    return matches
+
+
+class ThresholdRetriever(BaseRetriever):
+    """
+    as_retriever(search_type="similarity_score_threshold"): the top `k` matches with a relevance
+    score of at least `score_threshold` (cut to `max_context_tokens`), but `retrieve_scored` also
+    hands out the scores (and with include_values the stored vectors) for conversation reuse.
+    """
+
+    vector_store: Any
+    k: int = 5
+    score_threshold: float = 0.7
+    max_context_tokens: int = 0
+    include_values: bool = False
+
+    def retrieve_scored(self, query: str) -> Tuple[List[float], List[Dict[str, Any]]]:
+        query_vector = self.vector_store.embeddings.embed_query(query)
+        matches = query_with_vectors(self.vector_store, query_vector, self.k, include_values=self.include_values)
+        kept = [m for m in matches if m["score"] >= self.score_threshold]
+        return query_vector, fit_context(kept, self.max_context_tokens)
+
+    def _get_relevant_documents(self, query: str, *,
+                                run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        try:
+            return [match["document"] for match in self.retrieve_scored(query)[1]]
+        except Exception as e:
+            logging.error(f"Error in similarity retrieval: {str(e)}")
+            raise Custom_exception(e, sys)
+
+
+class MultiStageRetriever(BaseRetriever):
+    """Over-fetch -> MMR diversification -> local re-rank -> top `k` documents"""
+
+    vector_store: Any
+    config: RetrievalConfig = Field(default_factory=RetrievalConfig)
+
+    def select(self, query: str, query_vector: List[float],
+               matches: List[Dict[str, Any]]) -> List[Tuple[Document, float]]:
+        """Run the local stages (threshold, MMR, re-rank) over already fetched matches"""
+        config = self.config
+        matches = [m for m in matches if m["score"] >= config.score_threshold and m["values"]]
+        if not matches:
+            return []
+
+        doc_vectors = np.asarray([m["values"] for m in matches], dtype=np.float32)
+        picked = maximal_marginal_relevance(np.asarray(query_vector, dtype=np.float32),
+                                            doc_vectors,
+                                            k=max(config.mmr_k, config.k),
+                                            lambda_mult=config.lambda_mult)
+        candidates = [(matches[i]["document"], matches[i]["score"]) for i in picked]
+
+        if config.rerank:
+            candidates = local_rerank(query, candidates, config)
+
+        return candidates[:config.k]
+
+    def select_scored(self, query: str, query_vector: List[float],
+                      matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """select, keeping each kept document's match (id, stored vector) with its final score"""
+        with span("rerank", candidates=len(matches)):
+            selected = self.select(query, query_vector, matches)
+        by_document = {id(m["document"]): m for m in matches}
+        return fit_context([dict(by_document[id(doc)], score=score) for doc, score in selected],
+                           self.config.max_context_tokens)
+
+    def retrieve_scored(self, query: str) -> Tuple[List[float], List[Dict[str, Any]]]:
+        query_vector = self.vector_store.embeddings.embed_query(query)
+        matches = query_with_vectors(self.vector_store, query_vector, self.config.fetch_k)
+        selected = self.select_scored(query, query_vector, matches)
+        logging.info(f"Multi-stage retrieval kept {len(selected)} of {len(matches)} candidates")
+        return query_vector, selected
+
+    def _get_relevant_documents(self, query: str, *,
+                                run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        try:
+            return [match["document"] for match in self.retrieve_scored(query)[1]]
+        except Exception as e:
+            logging.error(f"Error in multi-stage retrieval: {str(e)}")
+            raise Custom_exception(e, sys)
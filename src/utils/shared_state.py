@@ -0,0 +1,176 @@
+import os
+import sys
+import time
+import stat
+import pickle
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from typing import Any, Callable, List, Optional
+from dataclasses import dataclass
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.utils.logger import logging
+from src.utils.exception import Custom_exception
+from src.utils.metrics import record_cache
+
+
+def _default_shared_dir() -> str:
+    # /dev/shm is RAM backed on linux: files there are shared page cache, not disk
+    base = "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else tempfile.gettempdir()
+    return os.path.join(base, f"ecommerce_chatbot-{os.getuid()}")
+
+
+def private_dir(path: str) -> str:
+    """
+    Create the shared state directory readable by this user only, or check an existing one.
+    The cache unpickles what it reads: a directory another user owns or can write to is refused.
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if stat.S_ISLNK(info.st_mode) or not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid():
+        raise PermissionError(f"Shared state dir {path} is not a directory owned by this user")
+    if info.st_mode & 0o077:
+        os.chmod(path, 0o700)
+    return path
+
+
+@dataclass
+class SharedStateConfig:
+    path = os.getenv("SHARED_STATE_DIR", _default_shared_dir())
+    cache_file = "cache.sqlite3"
+    embedding_cache_ttl = float(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", "86400"))
+    answer_cache_ttl = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "300"))      # 0 disables the answer cache
+    max_entries = int(os.getenv("SHARED_CACHE_MAX_ENTRIES", "100000"))
+
+
+def cache_key(*parts: Any) -> str:
+    return hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+
+
+def shared_array(name: str, fingerprint: str, build: Callable[[], np.ndarray],
+                 config: Optional[SharedStateConfig] = None) -> np.ndarray:
+    """
+    Read-only matrix memory-mapped from <shared dir>/<name>-<fingerprint>.npy. The first process
+    builds and writes it, every other worker (and the next restart) maps the same pages.
+    """
+    try:
+        config = config or SharedStateConfig()
+        private_dir(config.path)
+        path = os.path.join(config.path, f"{name}-{fingerprint[:16]}.npy")
+        if not os.path.exists(path):
+            array = np.ascontiguousarray(build())
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp_path, path)
+            logging.info(f"Wrote shared array {path} {array.shape}")
+        return np.load(path, mmap_mode="r")
+    except Exception as e:
+        logging.error(f"Error loading shared array {name}: {str(e)}")
+        raise Custom_exception(e, sys)
+
+
+class SharedCache:
+    """
+    Small key/value cache shared by all worker processes of a box: a sqlite database in
+    /dev/shm (WAL mode, one connection per thread and process). Values are pickled, so the
+    directory must be private to this user (private_dir), otherwise the cache stays off. Entries
+    expire after their ttl and the oldest are dropped above `max_entries`.
+    A broken cache never fails a request, it just misses.
+    """
+
+    def __init__(self, name: str, config: Optional[SharedStateConfig] = None):
+        self.name = name
+        self.shared_state_config = config or SharedStateConfig()
+        self.path = None
+        try:
+            private_dir(self.shared_state_config.path)
+            self.path = os.path.join(self.shared_state_config.path, self.shared_state_config.cache_file)
+        except Exception as e:
+            logging.error(f"Shared cache {name} disabled: {str(e)}")
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # connections must not cross a fork, reopen when the pid changed
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=OFF")
+            connection.execute("CREATE TABLE IF NOT EXISTS cache "
+                               "(key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL NOT NULL)")
+            self._local.connection, self._local.pid = connection, os.getpid()
+        return connection
+
+    def get(self, key: str) -> Any:
+        if self.path is None:
+            return None
+        try:
+            row = self._connection().execute("SELECT value, expires FROM cache WHERE key = ?",
+                                             (f"{self.name}:{key}",)).fetchone()
+            hit = row is not None and row[1] > time.time()
+            record_cache(self.name, hit)
+            return pickle.loads(row[0]) if hit else None
+        except Exception as e:
+            logging.error(f"Shared cache {self.name} read failed: {str(e)}")
+            return None
+
+    def set(self, key: str, value: Any, ttl: float):
+        if ttl <= 0 or self.path is None:
+            return
+        try:
+            connection = self._connection()
+            connection.execute("INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                               (f"{self.name}:{key}", pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL),
+                                time.time() + ttl))
+            self._writes += 1
+            if self._writes % 1000 == 0:
+                self.evict(connection)
+        except Exception as e:
+            logging.error(f"Shared cache {self.name} write failed: {str(e)}")
+
+    def delete(self, key: str):
+        if self.path is None:
+            return
+        try:
+            self._connection().execute("DELETE FROM cache WHERE key = ?", (f"{self.name}:{key}",))
+        except Exception as e:
+            logging.error(f"Shared cache {self.name} delete failed: {str(e)}")
+
+    def evict(self, connection: sqlite3.Connection):
+        connection.execute("DELETE FROM cache WHERE expires <= ?", (time.time(),))
+        connection.execute("DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires "
+                           "LIMIT max(0, (SELECT count(*) FROM cache) - ?))",
+                           (self.shared_state_config.max_entries,))
+
+
+class CachedEmbeddings(Embeddings):
+    """Query embeddings served from the shared cache; document embeddings (ingestion) pass through"""
+
+    def __init__(self, embeddings: Embeddings, cache: Optional[SharedCache] = None, namespace: str = ""):
+        self.embeddings = embeddings
+        self.cache = cache or SharedCache("query_embeddings")
+        # the model name keeps vectors of different embedders apart
+        self.namespace = namespace or getattr(embeddings, "model", None) or type(embeddings).__name__
+
+    def __getattr__(self, name):
+        if name == "embeddings":
+            raise AttributeError(name)
+        return getattr(self.embeddings, name)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = cache_key(self.namespace, text)
+        vector = self.cache.get(key)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.set(key, np.asarray(vector, dtype=np.float32), self.cache.shared_state_config.embedding_cache_ttl)
+            return vector
+        return vector.tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
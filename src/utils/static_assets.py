@@ -0,0 +1,243 @@
+import os
+import sys
+import gzip
+import json
+import shutil
+import hashlib
+import argparse
+import mimetypes
+from typing import Any, Dict, List, Optional
+from dataclasses import dataclass
+
+from markupsafe import Markup, escape
+
+from src.utils.logger import logging
+from src.utils.exception import Custom_exception
+
+
+@dataclass
+class StaticAssetsConfig:
+    static_path = "static"
+    dist_path = os.path.join("static", "dist")              # build output, not committed
+    manifest_path = os.path.join("static", "dist", "manifest.json")
+    url_prefix = "/assets"
+    image_widths = (320, 640, 960, 1440)
+    image_formats = ("avif", "webp")                        # preferred first
+    image_quality = {"avif": 50, "webp": 75}
+    compress_extensions = (".css", ".js", ".svg", ".json")
+    min_compress_bytes = 1024
+    immutable_max_age = 31536000                            # fingerprinted urls never change content
+
+
+def _fingerprint(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def _fingerprinted_name(relative_path: str, digest: str, suffix: str = "", extension: str = None) -> str:
+    root, ext = os.path.splitext(relative_path)
+    return f"{root}{suffix}.{digest}{extension or ext}"
+
+
+class AssetBuilder:
+    """
+    Build step for the storefront's static files (python -m src.utils.static_assets build):
+      images -> resized AVIF / WebP variants for srcset + a fingerprinted original
+      css / js -> fingerprinted copies with .gz / .br siblings
+    and a manifest mapping "images/home2.webp" to the generated files, read by the app.
+    """
+
+    def __init__(self, config: Optional[StaticAssetsConfig] = None):
+        self.static_assets_config = config or StaticAssetsConfig()
+
+    def _write(self, relative_path: str, data: bytes) -> str:
+        path = os.path.join(self.static_assets_config.dist_path, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        return relative_path.replace(os.sep, "/")
+
+    def precompress(self, relative_path: str, data: bytes):
+        if len(data) < self.static_assets_config.min_compress_bytes:
+            return
+        self._write(relative_path + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+        try:
+            import brotli
+        except ImportError:
+            logging.info("brotli is not installed, only gzip variants are written")
+            return
+        self._write(relative_path + ".br", brotli.compress(data, quality=11))
+
+    def build_image(self, relative_path: str, data: bytes) -> Dict[str, Any]:
+        from io import BytesIO
+        from PIL import Image, features
+
+        digest = _fingerprint(data)
+        entry = {"src": self._write(_fingerprinted_name(relative_path, digest), data), "srcset": {}}
+        with Image.open(BytesIO(data)) as image:
+            image.load()
+            entry["width"], entry["height"] = image.size
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+            widths = [w for w in self.static_assets_config.image_widths if w < image.width] + [image.width]
+            for image_format in self.static_assets_config.image_formats:
+                if not features.check(image_format):
+                    logging.info(f"Pillow has no {image_format} support, skipping those variants")
+                    continue
+                candidates = []
+                for width in widths:
+                    height = round(image.height * width / image.width)
+                    resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+                    buffer = BytesIO()
+                    resized.save(buffer, image_format.upper(),
+                                 quality=self.static_assets_config.image_quality[image_format])
+                    variant = buffer.getvalue()
+                    name = _fingerprinted_name(relative_path, _fingerprint(variant), f"-{width}w", f".{image_format}")
+                    candidates.append(f"{self._write(name, variant)} {width}w")
+                entry["srcset"][image_format] = candidates
+        return entry
+
+    def build(self) -> Dict[str, Any]:
+        try:
+            config = self.static_assets_config
+            if os.path.exists(config.dist_path):
+                shutil.rmtree(config.dist_path)
+
+            manifest = {}
+            for directory, _, files in os.walk(config.static_path):
+                if os.path.abspath(directory).startswith(os.path.abspath(config.dist_path)):
+                    continue
+                for file_name in sorted(files):
+                    path = os.path.join(directory, file_name)
+                    relative_path = os.path.relpath(path, config.static_path).replace(os.sep, "/")
+                    with open(path, "rb") as f:
+                        data = f.read()
+
+                    mimetype = mimetypes.guess_type(file_name)[0] or ""
+                    if mimetype.startswith("image/") and not file_name.endswith(".svg"):
+                        manifest[relative_path] = self.build_image(relative_path, data)
+                    else:
+                        name = self._write(_fingerprinted_name(relative_path, _fingerprint(data)), data)
+                        if file_name.endswith(config.compress_extensions):
+                            self.precompress(name, data)
+                        manifest[relative_path] = {"src": name}
+                    logging.info(f"Built static asset {relative_path}")
+
+            self._write("manifest.json", json.dumps(manifest, indent=2).encode("utf-8"))
+            return manifest
+        except Exception as e:
+            logging.error(f"Error building static assets: {str(e)}")
+            raise Custom_exception(e, sys)
+
+
+class StaticAssets:
+    """
+    Serving side: fingerprinted urls for templates (asset_url / responsive_image), immutable
+    cache headers + ETag + precompressed gzip/brotli for /assets/, and on-the-fly gzip of
+    html / json / text responses. Without a built manifest the plain static files are used.
+    """
+
+    def __init__(self, app: Any = None, config: Optional[StaticAssetsConfig] = None):
+        self.static_assets_config = config or StaticAssetsConfig()
+        self.manifest: Dict[str, Any] = {}
+        if app is not None:
+            self.init_app(app)
+
+    def load_manifest(self, root: str):
+        path = os.path.join(root, self.static_assets_config.manifest_path)
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.manifest = json.load(f)
+            logging.info(f"Loaded {len(self.manifest)} built static assets")
+        except FileNotFoundError:
+            logging.info("No static asset manifest, serving the original files")
+            self.manifest = {}
+
+    def init_app(self, app: Any):
+        from flask import request, send_from_directory, url_for
+
+        self.load_manifest(app.root_path)
+        dist_root = os.path.join(app.root_path, self.static_assets_config.dist_path)
+        max_age = self.static_assets_config.immutable_max_age
+
+        def asset_url(relative_path: str) -> str:
+            entry = self.manifest.get(relative_path)
+            if entry is None:
+                return url_for("static", filename=relative_path)
+            return f"{self.static_assets_config.url_prefix}/{entry['src']}"
+
+        def responsive_image(relative_path: str, alt: str, sizes: str = "100vw", eager: bool = False) -> Markup:
+            """<picture> with avif / webp srcsets, intrinsic size (no layout shift) and lazy loading"""
+            entry = self.manifest.get(relative_path)
+            loading = 'fetchpriority="high"' if eager else 'loading="lazy"'
+            if entry is None:
+                return Markup(f'<img src="{escape(asset_url(relative_path))}" alt="{escape(alt)}" '
+                              f'{loading} decoding="async">')
+            prefix = self.static_assets_config.url_prefix
+            sources = []
+            for image_format, candidates in entry.get("srcset", {}).items():
+                srcset = ", ".join(f"{prefix}/{candidate}" for candidate in candidates)
+                sources.append(f'<source type="image/{image_format}" srcset="{escape(srcset)}" sizes="{escape(sizes)}">')
+            img = (f'<img src="{escape(asset_url(relative_path))}" alt="{escape(alt)}" '
+                   f'width="{entry["width"]}" height="{entry["height"]}" {loading} decoding="async">')
+            return Markup(f"<picture>{''.join(sources)}{img}</picture>")
+
+        app.jinja_env.globals.update(asset_url=asset_url, responsive_image=responsive_image)
+
+        @app.route(f"{self.static_assets_config.url_prefix}/<path:filename>")
+        def built_asset(filename):
+            accepted = request.headers.get("Accept-Encoding", "")
+            encoding, served = None, filename
+            for name, extension in (("br", ".br"), ("gzip", ".gz")):
+                if name in accepted and os.path.exists(os.path.join(dist_root, filename + extension)):
+                    encoding, served = name, filename + extension
+                    break
+
+            response = send_from_directory(dist_root, served, max_age=max_age, etag=False)
+            response.mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            if encoding:
+                response.headers["Content-Encoding"] = encoding
+            response.headers["Vary"] = "Accept-Encoding"
+            response.headers["Cache-Control"] = f"public, max-age={max_age}, immutable"
+            # the fingerprint is the content hash: a strong etag per encoding
+            response.set_etag(f"{filename}-{encoding or 'identity'}")
+            return response.make_conditional(request)
+
+        @app.after_request
+        def compress_response(response):
+            return self.compress(request, response)
+
+    def compress(self, request: Any, response: Any) -> Any:
+        """gzip dynamic text responses (the page, json answers, metrics) for clients that accept it"""
+        if (response.direct_passthrough or response.is_streamed
+                or response.status_code < 200 or response.status_code >= 300
+                or "Content-Encoding" in response.headers
+                or "gzip" not in request.headers.get("Accept-Encoding", "")
+                or response.mimetype not in ("text/html", "text/plain", "text/css",
+                                             "application/json", "application/javascript")):
+            return response
+        data = response.get_data()
+        if len(data) < self.static_assets_config.min_compress_bytes:
+            return response
+        if response.mimetype == "text/html" and not response.headers.get("ETag"):
+            # weak etag of the uncompressed page (same for every encoding), revalidates with a 304
+            response.add_etag(weak=True)
+            response.make_conditional(request)
+            if response.status_code == 304:
+                return response
+        response.set_data(gzip.compress(data, compresslevel=6))
+        response.headers["Content-Encoding"] = "gzip"
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build fingerprinted, compressed static assets")
+    parser.add_argument("command", choices=["build"])
+    parser.parse_args()
+    manifest = AssetBuilder().build()
+    print(f"Built {len(manifest)} assets into {StaticAssetsConfig.dist_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+// -------------------------
+// DOM Elements
+// -------------------------
+const chatToggle = document.getElementById('chatToggle');
+const chatWidget = document.getElementById('chatWidget');
+const chatSend = document.getElementById('chatSend');
+const chatInput = document.getElementById('chatInput');
+const chatBody = document.getElementById('chatBody');
+
+// one id per browser tab, used by the server for per-session rate limits and fair queuing
+let sessionId = sessionStorage.getItem('chatSessionId');
+if (!sessionId) {
+  sessionId = (crypto.randomUUID ? crypto.randomUUID() : String(Date.now()) + Math.random().toString(16).slice(2));
+  sessionStorage.setItem('chatSessionId', sessionId);
+}
+
+// -------------------------
+// Toggle Chat Widget
+// -------------------------
+chatToggle.addEventListener('click', () => {
+  chatWidget.classList.toggle('closed');
+});
+
+// -------------------------
+// Speculative Prefetch
+// -------------------------
+// when typing pauses, the server starts retrieving products for the partial input, so a
+// matching question goes straight to answer generation
+const PREFETCH_DEBOUNCE_MS = 400;
+const PREFETCH_MIN_CHARS = 8;
+let prefetchTimer = null;
+let prefetchController = null;
+let lastPrefetched = '';
+let prefetchPausedUntil = 0;
+
+function cancelPrefetch() {
+  clearTimeout(prefetchTimer);
+  if (prefetchController) prefetchController.abort();
+  prefetchController = null;
+}
+
+async function prefetch() {
+  const text = chatInput.value.trim();
+  if (text.length < PREFETCH_MIN_CHARS || text === lastPrefetched || Date.now() < prefetchPausedUntil) return;
+  lastPrefetched = text;
+  prefetchController = new AbortController();
+  try {
+    const response = await fetch('/chat/prefetch', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', 'X-Session-ID': sessionId },
+      body: JSON.stringify({ input: text }),
+      signal: prefetchController.signal
+    });
+    // rate limited: stay quiet for a while, /chat works the same without a prefetch
+    if (response.status === 429) prefetchPausedUntil = Date.now() + 5000;
+  } catch (error) {
+    // aborted by newer input or by sending, nothing to do
+  }
+}
+
+chatInput.addEventListener('input', () => {
+  cancelPrefetch();
+  prefetchTimer = setTimeout(prefetch, PREFETCH_DEBOUNCE_MS);
+});
+
+// -------------------------
+// Send Message Function
+// -------------------------
+chatSend.addEventListener('click', sendMessage);
+chatInput.addEventListener('keydown', (e) => {
+  if (e.key === 'Enter' && !e.shiftKey) {
+    e.preventDefault();
+    sendMessage();
+  }
+});
+
+async function sendMessage() {
+  const msg = chatInput.value.trim();
+  if (!msg) return;
+  cancelPrefetch();
+  lastPrefetched = '';
+
+  // Add user message
+  const userDiv = document.createElement('div');
+  userDiv.className = 'user-msg';
+  userDiv.textContent = msg;
+  chatBody.appendChild(userDiv);
+
+  chatInput.value = '';
+  chatBody.scrollTop = chatBody.scrollHeight;
+
+  // Greetings, FAQs and price/size lookups are answered by the server-side router,
+  // everything else goes through the RAG chain
+  let reply;
+  try {
+    const response = await fetch('/chat', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', 'X-Session-ID': sessionId },
+      body: JSON.stringify({ input: msg })
+    });
+    // 429 / 503: over capacity, the server says when to try again
+    if (response.status === 429 || response.status === 503) {
+      const data = await response.json();
+      reply = data.response + ' (retry in ' + (response.headers.get('Retry-After') || data.retry_after) + 's)';
+    } else {
+      if (!response.ok) throw new Error('Network response was not ok');
+      const data = await response.json();
+      reply = data.response;
+    }
+  } catch (error) {
+    console.error('Error:', error);
+    reply = "Sorry, I am unable to process your request right now.";
+  }
+
+  // Add bot message
+  const botDiv = document.createElement('div');
+  botDiv.className = 'bot-msg';
+  botDiv.textContent = reply;
+  chatBody.appendChild(botDiv);
+
+  chatBody.scrollTop = chatBody.scrollHeight;
+}
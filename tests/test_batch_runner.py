@@ -0,0 +1,103 @@
+import time
+import threading
+
+import pytest
+
+from src.utils.admission import AdmissionConfig, AdmissionController
+from src.utils.batch_runner import BatchConfig, BatchRunner, read_questions
+
+
+class SlowChain:
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, inputs, config=None):
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(self.seconds)
+        with self._lock:
+            self.running -= 1
+        return {"answer": inputs["input"].upper()}
+
+
+def _admission(**overrides):
+    config = AdmissionConfig()
+    config.enabled, config.max_concurrent, config.max_queue_per_session = True, 4, 2
+    config.session_rate, config.session_burst, config.batch_share = 1, 5, 0.5
+    for key, value in overrides.items():
+        setattr(config, key, value)
+    return AdmissionController(config)
+
+
+def _runner(chain, admission=None, rate=20.0, concurrency=8):
+    config = BatchConfig()
+    config.max_concurrency, config.requests_per_second, config.burst = concurrency, rate, None
+    return BatchRunner(chain, config, admission=admission)
+
+
+def test_batch_runs_at_the_quota_in_its_own_admission_class():
+    chain, admission = SlowChain(0.2), _admission()
+    start = time.perf_counter()
+    results = list(_runner(chain, admission).run([f"q{i}" for i in range(20)]))
+    elapsed = time.perf_counter() - start
+
+    assert [r.answer for r in results] == [f"Q{i}" for i in range(20)]
+    assert not any(r.error for r in results)
+    # 2 batch slots of 4, not the 1/s per-client /chat rate limit (20 questions would take ~15 s)
+    assert chain.peak <= admission.batch_slots == 2
+    assert elapsed < 4
+
+
+def test_batch_leaves_chat_slots_free():
+    chain, admission = SlowChain(0.3), _admission()
+    runner = _runner(chain, admission)
+    thread = threading.Thread(target=lambda: list(runner.run([f"q{i}" for i in range(6)])))
+    thread.start()
+    time.sleep(0.1)
+    with admission.slot("ip:1.2.3.4") as waited:
+        assert waited == 0.0
+    thread.join()
+
+
+def test_batch_waits_out_a_full_queue_instead_of_failing():
+    chain = SlowChain(0.1)
+    admission = _admission(max_concurrent=1, batch_share=1.0, max_queue=1)
+    results = list(_runner(chain, admission, concurrency=4).run([f"q{i}" for i in range(5)]))
+    assert not any(r.error for r in results)
+
+
+def test_caller_rate_can_only_lower_the_quota():
+    runner = _runner(SlowChain(0.0), rate=10.0)
+    start = time.perf_counter()
+    # a burst of `concurrency` (8) questions, then 2/s
+    list(runner.run([f"q{i}" for i in range(12)], requests_per_second=2.0))
+    assert time.perf_counter() - start > 1.5
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"max_concurrency": 0}, {"max_concurrency": "4"}, {"max_concurrency": True},
+    {"requests_per_second": 0}, {"requests_per_second": -1.0}, {"requests_per_second": "fast"},
+])
+def test_validate_rejects_bad_parameters(kwargs):
+    with pytest.raises(ValueError):
+        _runner(SlowChain(0.0)).validate(["q"], **kwargs)
+
+
+def test_validate_rejects_too_many_questions():
+    runner = _runner(SlowChain(0.0))
+    runner.batch_config.max_questions = 3
+    with pytest.raises(ValueError):
+        runner.validate(["q"] * 4)
+    runner.validate(["q"] * 3)
+
+
+def test_read_questions_raises_on_a_bad_line():
+    assert list(read_questions(['"a"', '', '{"input": "b"}'])) == ["a", "b"]
+    with pytest.raises(ValueError):
+        list(read_questions(['"a"', '{"input": 1}']))
+    with pytest.raises(ValueError):
+        list(read_questions(['not json']))
@@ -0,0 +1,47 @@
+from src.utils.conversation import FollowUpDetector
+
+
+def _entry(query, documents):
+    return {"query": query, "documents": [{"page_content": text} for text in documents]}
+
+
+SHIRTS = _entry("cotton shirts for men", [
+    "Product Name: Slim Fit Cotton Shirt\nColour: Blue",
+    "Product Name: Regular Fit Cotton Shirt\nColour: Blue",
+    "Product Name: Checked Cotton Shirt\nColour: White",
+    "Product Name: Oxford Cotton Shirt\nColour: Blue",
+    "Product Name: Linen Blend Shirt\nColour: Black",
+])
+
+
+def decide(message, entry=SHIRTS):
+    return FollowUpDetector().decide(message, entry)[0]
+
+
+def test_reference_back_reuses_documents():
+    assert decide("is the second one cheaper?") == "reuse"
+
+
+def test_follow_up_word_in_most_documents_reranks():
+    assert decide("what about in blue?") == "rerank"
+
+
+def test_follow_up_word_in_few_documents_searches():
+    assert decide("in black") == "search"
+
+
+def test_other_product_kind_is_new():
+    assert decide("any silk sarees?") == "new"
+    assert decide("do you have that in a saree") == "new"
+
+
+def test_two_new_words_without_reference_is_new():
+    assert decide("with pockets and collar") == "new"
+
+
+def test_same_kind_is_not_new():
+    assert decide("any shirts in blue?") == "rerank"
+
+
+def test_without_cached_retrieval_is_new():
+    assert decide("is the second one cheaper?", None) == "new"
@@ -0,0 +1,72 @@
+import os
+import glob
+
+import pandas as pd
+import pytest
+
+from src.utils.intent_router import IntentRouter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def router():
+    return IntentRouter(catalog=None)
+
+
+@pytest.mark.parametrize("question, intent", [
+    ("do you ship to pune?", "faq_shipping"),
+    ("how long does delivery take", "faq_shipping"),
+    ("what's trending this month", "faq_trending"),
+    ("show me new arrivals", "faq_new_arrivals"),
+    ("what is the fabric of zen flare pants", "lookup_fabric"),
+    ("what material is the zen halo dress made of?", "lookup_fabric"),
+])
+def test_direct_answers(router, question, intent):
+    result = router.classify(question)
+    assert result.intent == intent
+    assert result.answer
+
+
+@pytest.mark.parametrize("question", [
+    "show me trending watches under 5000",
+    "sarees with free shipping",
+    "new arrivals in silk sarees under 2000",
+    "which shirts deliver the best fit",
+])
+def test_product_questions_go_to_the_chain(router, question):
+    assert router.classify(question).answer is None
+
+
+@pytest.fixture(scope="module")
+def catalog_router():
+    files = sorted(glob.glob(os.path.join(ROOT, "data", "*.csv")))
+    return IntentRouter(catalog=pd.concat([pd.read_csv(f) for f in files], ignore_index=True))
+
+
+@pytest.mark.parametrize("question", [
+    "what is the price of a women saree with blouse",     # "Women Saree" is sold by several sellers
+    "casual shirt for man under 500",
+    "price of women silk saree in red",
+    "how much is a men s cotton slim fit shirt",          # listed 16 times at different prices
+])
+def test_generic_or_duplicate_names_go_to_the_chain(catalog_router, question):
+    assert catalog_router.classify(question).answer is None
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("price of titan karishma analog black dial men's watch nm1639sm02/nn1639sm02", "₹1,695"),
+    ("how much is the casio vintage a-158wa-1q digital grey dial unisex watch silver metal strap", "Casio"),
+    ("price of zen flare pants", "₹1,799"),
+])
+def test_specific_names_are_looked_up(catalog_router, question, expected):
+    result = catalog_router.classify(question)
+    assert result.intent == "lookup_price"
+    assert expected in result.answer
+
+
+def test_names_match_on_word_boundaries():
+    catalog = pd.DataFrame({"Product Name": ["Aurora Lumen Kestrel Watch"], "Selling Price": ["₹999"]})
+    router = IntentRouter(catalog=catalog)
+    assert router.classify("price of aurora lumen kestrel watch").intent == "lookup_price"
+    assert router.classify("price of aurora lumen kestrel watches").answer is None
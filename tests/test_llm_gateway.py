@@ -0,0 +1,107 @@
+import time
+import itertools
+import threading
+
+import pytest
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_groq import ChatGroq
+
+from src.utils.fake_services import FakeGroqServer, FaultProfile, constant_latency
+from src.utils.llm_gateway import LLMGateway, LLMGatewayConfig, LLMGatewayError
+
+
+def _llm(server: FakeGroqServer) -> ChatGroq:
+    return ChatGroq(model_name="fake", groq_api_key="fake", base_url=server.url, max_retries=0)
+
+
+def _config(**overrides) -> LLMGatewayConfig:
+    config = LLMGatewayConfig()
+    config.deadline_s = 5.0
+    config.hedge_min_delay_s = 0.1
+    config.min_samples = 1
+    for key, value in overrides.items():
+        setattr(config, key, value)
+    return config
+
+
+@pytest.fixture
+def servers():
+    primary = FakeGroqServer(answer="primary").start()
+    fallback = FakeGroqServer(answer="fallback").start()
+    yield primary, fallback
+    primary.stop()
+    fallback.stop()
+
+
+def _gateway(servers, **overrides) -> LLMGateway:
+    primary, fallback = servers
+    return LLMGateway([("primary", _llm(primary)), ("fallback", _llm(fallback))], _config(**overrides))
+
+
+class _CountingHandler(BaseCallbackHandler):
+    def __init__(self):
+        self.ends = 0
+
+    def on_llm_end(self, response, **kwargs):
+        self.ends += 1
+
+
+def test_slow_primary_falls_back_within_the_deadline(servers):
+    primary, _ = servers
+    primary.default_profile = FaultProfile(latency=constant_latency(2.0), error_rate=1.0, error_status=504)
+    gateway = _gateway(servers, deadline_s=1.0, hedge_min_delay_s=5.0)
+
+    start = time.monotonic()
+    assert gateway.invoke("hi").content == "fallback"
+    assert time.monotonic() - start < 1.5
+    # the abandoned call still lands in the primary's latency window once it fails
+    time.sleep(1.5)
+    assert gateway.tiers[0].latency.percentile(0.95) >= 2.0
+
+
+def test_every_tier_missing_the_deadline_raises(servers):
+    for server in servers:
+        server.default_profile = FaultProfile(latency=constant_latency(1.0))
+    gateway = _gateway(servers, deadline_s=0.5, hedge_min_delay_s=5.0)
+
+    start = time.monotonic()
+    with pytest.raises(LLMGatewayError):
+        gateway.invoke("hi")
+    assert time.monotonic() - start < 0.9
+
+
+def test_slow_call_is_hedged_and_callbacks_see_one_call(servers):
+    primary, _ = servers
+    delays = itertools.chain([1.0], itertools.repeat(0.01))
+    lock = threading.Lock()
+
+    def latency():
+        with lock:
+            return next(delays)
+
+    primary.default_profile = FaultProfile(latency=latency)
+    gateway = _gateway(servers)
+    gateway.tiers[0].latency.record(0.05)
+    handler = _CountingHandler()
+
+    start = time.monotonic()
+    assert gateway.invoke("hi", {"callbacks": [handler]}).content == "primary"
+    assert time.monotonic() - start < 0.8
+    time.sleep(1.0)                 # let the slow original finish
+    assert primary.requests == 2
+    assert handler.ends == 1
+
+
+def test_failing_tier_opens_its_circuit(servers):
+    primary, fallback = servers
+    primary.default_profile = FaultProfile(error_rate=1.0)
+    gateway = _gateway(servers, failure_threshold=2)
+
+    for _ in range(2):
+        assert gateway.invoke("hi").content == "fallback"
+    assert gateway.tiers[0].breaker.state == "open"
+
+    calls = primary.requests
+    assert gateway.invoke("hi").content == "fallback"
+    assert primary.requests == calls
+    assert fallback.requests == 3
@@ -0,0 +1,32 @@
+import pytest
+
+from src.utils.partitioning import PartitionRouter
+
+CATALOG = {
+    "sarees": ["Red silk saree with zari border, party wear", "Blue cotton saree for daily wear",
+               "Banarasi silk saree for weddings and parties"],
+    "shirts": ["Slim fit checked casual shirt for men, blue", "Formal white cotton shirt for office",
+               "Black linen shirt, regular fit"],
+    "watches": ["Titan analog watch for men with black dial", "Digital sports watch, black strap",
+                "Fastrack analog watch for women, blue dial"],
+}
+
+
+@pytest.fixture(scope="module")
+def router():
+    return PartitionRouter().fit((partition, text) for partition, texts in CATALOG.items() for text in texts)
+
+
+@pytest.mark.parametrize("query, partition", [
+    ("red silk saree", "sarees"),
+    ("titan analog watch for men", "watches"),
+    ("slim fit checked casual shirt", "shirts"),
+    ("watch", "watches"),
+])
+def test_clear_queries_go_to_one_partition(router, query, partition):
+    assert router.route(query) == [partition]
+
+
+@pytest.mark.parametrize("query", ["blue one", "in black", "something for a party", "anything cheaper"])
+def test_vague_queries_search_every_partition(router, query):
+    assert router.route(query) == router.partitions
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from src.utils.prefetch import PrefetchedRetriever, query_similarity
+from src.utils.shared_state import SharedCache, SharedStateConfig, cache_key
+
+
+@pytest.mark.parametrize("prefetched, question", [
+    ("red saree", "blue saree"),
+    ("red silk saree under 500", "blue silk saree under 500"),
+    ("silk saree under 500", "silk saree under 5000"),
+    ("silk saree under 5000", "silk saree above 5000"),
+    ("red silk saree with zari border", "red silk saree with gota border"),
+])
+def test_one_word_apart_is_another_search(prefetched, question):
+    assert query_similarity(prefetched, question) == 0.0
+
+
+@pytest.mark.parametrize("prefetched, question", [
+    ("red silk saree", "red silk saree"),
+    ("red silk sar", "red silk saree"),
+    ("red silk saree", "show me a red silk saree"),
+])
+def test_same_search_matches(prefetched, question):
+    assert query_similarity(prefetched, question) >= 0.75
+
+
+@pytest.fixture
+def retriever(tmp_path):
+    config = SharedStateConfig()
+    config.path = str(tmp_path)
+    retriever = PrefetchedRetriever(base=None, cache=SharedCache("prefetch", config))
+    retriever.cache.set(cache_key("session"), {
+        "namespace": None, "query": "red silk saree", "query_vector": np.ones(4, dtype=np.float32),
+        "documents": [{"page_content": "Red silk saree", "metadata": {}, "score": 0.9, "values": None}],
+    }, ttl=60)
+    return retriever
+
+
+def test_prefetch_is_used_once(retriever):
+    query_vector, matches = retriever.take("session", "red silk saree")
+    assert query_vector == [1.0] * 4
+    assert matches[0]["document"].page_content == "Red silk saree"
+    assert retriever.take("session", "red silk saree") is None
+
+
+def test_miss_drops_the_prefetch(retriever):
+    assert retriever.take("session", "blue silk saree") is None
+    assert retriever.take("session", "red silk saree") is None
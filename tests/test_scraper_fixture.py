@@ -0,0 +1,50 @@
+"""
+Full vs lean browser mode of the scraper on the local fixture shop (benchmarks/scraper_benchmark.py),
+in headless Chromium. Skipped without selenium, a Chrome / Chromium binary and chromedriver.
+"""
+import os
+import shutil
+import threading
+
+import pytest
+
+pytest.importorskip("selenium")
+
+CHROMEDRIVER = os.getenv("CHROMEDRIVER_PATH") or shutil.which("chromedriver")
+CHROME = os.getenv("CHROME_BINARY") or next(
+    (path for path in map(shutil.which, ("chromium", "chromium-browser", "google-chrome", "chrome")) if path), None)
+
+pytestmark = pytest.mark.skipif(not (CHROMEDRIVER and CHROME), reason="headless Chromium / chromedriver not available")
+
+PRODUCTS = 4
+
+
+@pytest.fixture(scope="module")
+def shop():
+    from benchmarks.scraper_benchmark import FixtureShop
+
+    shop = FixtureShop(PRODUCTS)
+    threading.Thread(target=shop.serve_forever, daemon=True).start()
+    yield shop
+    shop.shutdown()
+
+
+@pytest.fixture(autouse=True)
+def browser(monkeypatch):
+    from src.components import scraper
+
+    monkeypatch.setattr(scraper.ScraperConfig, "chromedriver_path", CHROMEDRIVER)
+    monkeypatch.setattr(scraper.ScraperConfig, "chrome_binary", CHROME)
+
+
+def test_lean_mode_scrapes_the_same_rows_as_the_full_browser(shop):
+    from benchmarks.scraper_benchmark import run_mode
+
+    full = run_mode(shop, lean=False, products=PRODUCTS)
+    lean = run_mode(shop, lean=True, products=PRODUCTS)
+
+    assert full["rows"] > 0
+    assert lean["_rows"] == full["_rows"]
+    # the fixture pages are heavy, lean mode must not fetch any of it
+    assert full["served"].get("image")
+    assert not {"image", "font", "css", "tracker"} & set(lean["served"])
@@ -0,0 +1,35 @@
+import os
+import stat
+
+from src.utils.shared_state import SharedCache, SharedStateConfig
+
+
+def _config(path):
+    config = SharedStateConfig()
+    config.path = str(path)
+    return config
+
+
+def test_cache_dir_is_private(tmp_path):
+    cache = SharedCache("test", _config(tmp_path / "state"))
+    cache.set("key", {"answer": "ok"}, ttl=60)
+    assert cache.get("key") == {"answer": "ok"}
+    assert stat.S_IMODE(os.stat(tmp_path / "state").st_mode) == 0o700
+
+
+def test_open_cache_dir_is_tightened(tmp_path):
+    path = tmp_path / "state"
+    path.mkdir()
+    path.chmod(0o777)
+    SharedCache("test", _config(path))
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o700
+
+
+def test_symlinked_cache_dir_disables_the_cache(tmp_path):
+    target = tmp_path / "elsewhere"
+    target.mkdir()
+    os.symlink(target, tmp_path / "state")
+    cache = SharedCache("test", _config(tmp_path / "state"))
+    cache.set("key", "value", ttl=60)
+    assert cache.get("key") is None
+    assert not os.listdir(target)
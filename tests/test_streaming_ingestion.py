@@ -0,0 +1,74 @@
+import os
+import json
+
+import pandas as pd
+import pytest
+
+from src.components.index_manager import IndexManager, IndexManagerConfig
+from src.components.streaming_ingestion import StreamingIngestion, StreamingIngestionConfig
+from src.utils.fake_services import FakeEmbeddings, FakeIndex
+from src.utils.partitioning import PartitioningConfig
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CATALOG = ("data_sarees.csv", "data_shirts.csv", "data_watches.csv")
+ROWS = 20
+
+SCRAPED = [
+    {"Title": "Zen Halo Dress", "Price": "2299", "Category": "dresses", "Vendor": "Hunnit"},
+    {"Title": "Zen Nova Dress", "Price": "2499", "Category": "dresses", "Vendor": "Hunnit"},
+]
+
+
+@pytest.fixture
+def ingestion(tmp_path, monkeypatch):
+    monkeypatch.setenv("USE_FAKE_SERVICES", "true")
+    monkeypatch.setenv("FAKE_EMBED_LATENCY_MS", "0")
+    monkeypatch.setenv("FAKE_SEARCH_LATENCY_MS", "0")
+    raw = tmp_path / "data"
+    raw.mkdir()
+    for name in CATALOG:
+        pd.read_csv(os.path.join(ROOT, "data", name)).head(ROWS).to_csv(raw / name, index=False)
+
+    config = StreamingIngestionConfig()
+    config.raw_path = str(raw)
+    config.cleaned_path = str(tmp_path / "data_cleaned_stream.csv")
+    config.max_batch_wait = 0.1
+    ingestion = StreamingIngestion(config=config, embeddings=FakeEmbeddings(), index=FakeIndex())
+    ingestion.cleaner.data_cleaner_config.modes_path = str(tmp_path / "column_modes.json")
+    manager_config = IndexManagerConfig()
+    manager_config.pointer_path = str(tmp_path / "index_pointer.json")
+    manager_config.validation_timeout = 5
+    ingestion.manager = IndexManager(manager_config)
+    return ingestion
+
+
+def _pointer(ingestion):
+    with open(ingestion.manager.index_manager_config.pointer_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_new_partitioned_version_keeps_the_catalog_that_was_not_streamed(ingestion, monkeypatch):
+    monkeypatch.setattr(PartitioningConfig, "enabled", True)
+    raw = {name: open(os.path.join(ingestion.streaming_config.raw_path, name), encoding="utf-8").read()
+           for name in CATALOG}
+
+    result = ingestion.run({"hunnit_dresses.csv": iter(SCRAPED)})
+
+    partitions = _pointer(ingestion)["partitions"]
+    assert {name: p["documents"] for name, p in partitions.items()} == {
+        "sarees": ROWS, "shirts": ROWS, "watches": ROWS, "dresses": len(SCRAPED)}
+    assert result["upserted"] == 3 * ROWS + len(SCRAPED)
+    # the seeded csvs are read, not rewritten by the raw side output
+    for name, text in raw.items():
+        assert open(os.path.join(ingestion.streaming_config.raw_path, name), encoding="utf-8").read() == text
+
+
+def test_new_version_keeps_the_catalog_that_was_not_streamed(ingestion, monkeypatch):
+    monkeypatch.setattr(PartitioningConfig, "enabled", False)
+    ingestion.run({"hunnit_dresses.csv": iter(SCRAPED)})
+
+    pointer = _pointer(ingestion)
+    assert pointer["documents"] == 3 * ROWS + len(SCRAPED)
+    sources = {os.path.basename(metadata["source"])
+               for metadata in ingestion.index._namespace(pointer["namespace"])["metadata"]}
+    assert sources == set(CATALOG) | {"hunnit_dresses.csv"}